@@ -0,0 +1,182 @@
+"""
+Admin API Routes
+管理接口: 市场演练冲击注入, 模拟引擎重新加载, 持久化和 tick 时钟指标
+"""
+from typing import Optional
+from fastapi import APIRouter, Header
+
+from api.schemas import ShockRequest, create_success_response, create_error_response
+from config import settings
+from lib.market_arena import get_market_arena
+from lib.market_feed import CONTROL_CHANNEL, CONTROL_CLEAR_SHOCKS, CONTROL_RELOAD, CONTROL_SHOCK
+from lib.persistence_writer import get_persistence_writer
+from lib.redis_pubsub import get_redis_pubsub
+from lib.shock_injector import TARGET_SECTOR, TARGET_SYMBOLS, get_shock_injector
+from lib.simulation_engine import get_simulation_engine
+from scheduler.jobs import get_tick_clock
+
+
+router = APIRouter()
+arena = get_market_arena()
+shock_injector = get_shock_injector()
+
+
+def _authorized(token: Optional[str]) -> bool:
+    """
+    校验管理令牌
+
+    未配置 ADMIN_TOKEN 时拒绝全部请求, 只有显式设置 ADMIN_ALLOW_UNAUTHENTICATED 才开放
+    """
+    if settings.ADMIN_TOKEN is None:
+        return settings.ADMIN_ALLOW_UNAUTHENTICATED
+    return token == settings.ADMIN_TOKEN
+
+
+def _forbidden():
+    """拒绝访问的响应"""
+    if settings.ADMIN_TOKEN is None:
+        return create_error_response("FORBIDDEN", "Admin API disabled: ADMIN_TOKEN not configured")
+    return create_error_response("FORBIDDEN", "Invalid admin token")
+
+
+@router.post("/admin/shocks", response_model=None)
+async def create_shock(
+    request: ShockRequest,
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    排队一个冲击事件
+
+    在下一个tick作为数组掩码叠加到对数收益上, 之后按 decay 逐tick衰减:
+    - MARKET: 全市场
+    - SECTOR: codes 为板块代码
+    - SYMBOLS: codes 为股票代码
+    """
+    if not _authorized(x_admin_token):
+        return _forbidden()
+
+    try:
+        # 内存状态已加载时校验代码 (未知代码会被忽略, 提前提示)
+        if arena.loaded:
+            target_type = request.target_type.upper()
+            if target_type == TARGET_SECTOR:
+                known = arena.sector_ids
+            elif target_type == TARGET_SYMBOLS:
+                known = arena.symbol_ids
+            else:
+                known = None
+            unknown = [c for c in request.codes if known is not None and c not in known]
+            if unknown:
+                return create_error_response("NOT_FOUND", f"Unknown codes: {', '.join(unknown)}")
+
+        event = shock_injector.submit(
+            target_type=request.target_type,
+            magnitude=request.magnitude,
+            decay=request.decay,
+            codes=request.codes,
+            description=request.description,
+        )
+
+        # 独立模拟器模式: 转发给模拟器进程 (本地队列只用于校验, 随即清空),
+        # 模拟器沿用同一个 event_id, 返回的编号可在模拟器进程中找到
+        if not settings.EMBEDDED_SIMULATOR:
+            shock_injector.clear()
+            pubsub = await get_redis_pubsub()
+            await pubsub.publish(CONTROL_CHANNEL, {
+                "type": CONTROL_SHOCK,
+                "event_id": event.event_id,
+                "target_type": event.target_type,
+                "magnitude": event.magnitude,
+                "decay": event.decay,
+                "codes": event.codes,
+                "description": event.description,
+            })
+
+        return create_success_response(event.to_dict())
+
+    except ValueError as e:
+        return create_error_response("INVALID_PARAMETER", str(e))
+    except Exception as e:
+        print(f"[-] Error in create_shock: {e}")
+        return create_error_response("INTERNAL_ERROR", str(e))
+
+
+@router.get("/admin/shocks", response_model=None)
+async def list_shocks(x_admin_token: Optional[str] = Header(None)):
+    """列出本进程排队和活跃的冲击事件 (独立模拟器模式下事件在模拟器进程中)"""
+    if not _authorized(x_admin_token):
+        return _forbidden()
+
+    return create_success_response(shock_injector.list_events())
+
+
+@router.delete("/admin/shocks", response_model=None)
+async def clear_shocks(x_admin_token: Optional[str] = Header(None)):
+    """取消全部冲击事件"""
+    if not _authorized(x_admin_token):
+        return _forbidden()
+
+    if not settings.EMBEDDED_SIMULATOR:
+        pubsub = await get_redis_pubsub()
+        await pubsub.publish(CONTROL_CHANNEL, {"type": CONTROL_CLEAR_SHOCKS})
+        return create_success_response({'forwarded': True})
+
+    return create_success_response({'cleared': shock_injector.clear()})
+
+
+@router.get("/admin/persistence", response_model=None)
+async def get_persistence_metrics(x_admin_token: Optional[str] = Header(None)):
+    """本进程持久化写入器指标 (队列深度、写入延迟、丢弃数量; 独立模拟器模式下见模拟器日志)"""
+    if not _authorized(x_admin_token):
+        return _forbidden()
+
+    return create_success_response(get_persistence_writer().metrics())
+
+
+@router.get("/admin/tick-clock", response_model=None)
+async def get_tick_clock_metrics(x_admin_token: Optional[str] = Header(None)):
+    """
+    tick 时钟指标 (序号、超时次数、跳过/合并/补算步数)
+
+    时钟只在运行模拟器的进程中存在; 独立模拟器模式下本进程没有运行中的时钟, 返回错误
+    """
+    if not _authorized(x_admin_token):
+        return _forbidden()
+
+    if not settings.EMBEDDED_SIMULATOR:
+        return create_error_response(
+            "NOT_AVAILABLE",
+            "Tick clock metrics are not available in this process: simulator runs standalone (see simulator logs)",
+        )
+
+    return create_success_response(get_tick_clock().metrics())
+
+
+@router.post("/admin/engine/reload", response_model=None)
+async def reload_engine(x_admin_token: Optional[str] = Header(None)):
+    """
+    配置表 (板块、股票元数据、指数成分股、市场状态) 变化后重新加载模拟引擎
+    
+    独立模拟器模式下转发给模拟器进程; 各 API 进程的内存状态在模拟器重新加载并
+    写入后由 ArenaFeedSubscriber 根据 universe_key 的变化重新加载
+    """
+    if not _authorized(x_admin_token):
+        return _forbidden()
+
+    try:
+        if not settings.EMBEDDED_SIMULATOR:
+            pubsub = await get_redis_pubsub()
+            await pubsub.publish(CONTROL_CHANNEL, {"type": CONTROL_RELOAD})
+            return create_success_response({'forwarded': True})
+
+        engine = get_simulation_engine()
+        engine.reload()
+        return create_success_response({
+            'reloads': engine.reloads,
+            'stocks': engine.arena.size,
+            'indices': engine.index_engine.num_indices,
+        })
+
+    except Exception as e:
+        print(f"[-] Error in reload_engine: {e}")
+        return create_error_response("INTERNAL_ERROR", str(e))
@@ -7,10 +7,12 @@ from typing import Optional
 
 from api.schemas import create_success_response, create_error_response
 from lib.db_manager_sqlite import get_db_manager
+from lib.market_arena import get_market_arena
 
 
 router = APIRouter()
 db_manager = get_db_manager()
+arena = get_market_arena()
 
 
 @router.get("/indices", response_model=None)
@@ -46,6 +48,10 @@ async def get_indices(
         # 执行查询
         indices = db_manager.execute_query(query, tuple(params))
 
+        # 实时点位以内存状态为准
+        if arena.loaded:
+            arena.overlay_index_rows(indices)
+
         return create_success_response(
             indices,
             total=len(indices)
@@ -89,6 +95,12 @@ async def get_index_detail(code: str):
 
         # 组合结果
         result = dict(index)
+        if arena.loaded:
+            arena.overlay_index_rows([result])
+            for constituent in constituents:
+                live = arena.get_stock(constituent['stock_symbol'])
+                if live:
+                    constituent['current_price'] = live['current_price']
         result['constituents'] = constituents
         result['constituent_count'] = len(constituents)
 
@@ -7,10 +7,14 @@ from typing import Optional
 
 from api.schemas import create_success_response, create_error_response
 from lib.db_manager_sqlite import get_db_manager
+from lib.market_arena import get_market_arena
+from lib.market_state_manager import get_market_state_manager
 
 
 router = APIRouter()
 db_manager = get_db_manager()
+arena = get_market_arena()
+market_state_manager = get_market_state_manager()
 
 
 @router.get("/market/state", response_model=None)
@@ -85,7 +89,7 @@ async def get_market_overview():
     - 成交量/成交额
     """
     try:
-        # 统计股票数量
+        # 统计股票数量 (内存状态已加载时直接统计数组)
         stats_query = """
             SELECT
                 COUNT(*) as total_stocks,
@@ -100,17 +104,13 @@ async def get_market_overview():
             WHERE is_active = 1
         """
 
-        stats = db_manager.execute_query(stats_query, fetch_one=True)
+        if arena.loaded:
+            stats = arena.market_overview()
+        else:
+            stats = db_manager.execute_query(stats_query, fetch_one=True)
 
-        # 获取当前市场状态
-        market_state_query = """
-            SELECT state, daily_trend
-            FROM market_states
-            ORDER BY start_time DESC
-            LIMIT 1
-        """
-
-        market_state = db_manager.execute_query(market_state_query, fetch_one=True)
+        # 获取当前市场状态 (内存缓存)
+        market_state = market_state_manager.get_current_state()
 
         # 组合结果
         result = dict(stats) if stats else {}
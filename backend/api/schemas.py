@@ -212,6 +212,19 @@ class KlineListResponse(BaseModel):
     symbol: str = Field(..., description="股票/指数代码")
 
 
+# ============================================================================
+# Admin Schemas
+# ============================================================================
+
+class ShockRequest(BaseModel):
+    """冲击事件请求"""
+    target_type: str = Field(..., description="冲击目标: MARKET / SECTOR / SYMBOLS", examples=["SECTOR"])
+    codes: List[str] = Field(default_factory=list, description="板块代码或股票代码列表", examples=[["TECH"]])
+    magnitude: float = Field(..., ge=-0.2, le=0.2, description="首个tick叠加的对数收益", examples=[-0.05])
+    decay: float = Field(0.0, ge=0.0, lt=1.0, description="每个tick保留的比例 (0表示只作用一个tick)", examples=[0.9])
+    description: Optional[str] = Field(None, description="说明", examples=["科技板块暴跌演练"])
+
+
 # ============================================================================
 # Utility Functions
 # ============================================================================
@@ -6,10 +6,53 @@ from fastapi import APIRouter
 
 from api.schemas import create_success_response, create_error_response
 from lib.db_manager_sqlite import get_db_manager
+from lib.market_arena import get_market_arena
 
 
 router = APIRouter()
 db_manager = get_db_manager()
+arena = get_market_arena()
+
+
+def _query_sector_stats(sector_code: str) -> dict:
+    """从数据库统计板块股票数量、平均涨跌幅和总市值 (内存状态未加载时使用)"""
+    # 计算该板块的股票数量
+    count_query = """
+        SELECT COUNT(*) as stock_count
+        FROM stocks
+        WHERE sector_code = ? AND is_active = 1
+    """
+    count_result = db_manager.execute_query(
+        count_query, (sector_code,), fetch_one=True
+    )
+
+    # 计算该板块的平均涨跌幅
+    avg_query = """
+        SELECT AVG(change_pct) as avg_change_pct
+        FROM stocks
+        WHERE sector_code = ? AND is_active = 1
+    """
+    avg_result = db_manager.execute_query(
+        avg_query, (sector_code,), fetch_one=True
+    )
+    avg_change = avg_result['avg_change_pct'] if avg_result and avg_result['avg_change_pct'] else 0.0
+
+    # 计算板块总市值
+    cap_query = """
+        SELECT SUM(sm.market_cap) as total_market_cap
+        FROM stocks s
+        JOIN stock_metadata sm ON s.symbol = sm.symbol
+        WHERE s.sector_code = ? AND s.is_active = 1
+    """
+    cap_result = db_manager.execute_query(
+        cap_query, (sector_code,), fetch_one=True
+    )
+
+    return {
+        'stock_count': count_result['stock_count'] if count_result else 0,
+        'avg_change_pct': round(float(avg_change), 2),
+        'total_market_cap': cap_result['total_market_cap'] if cap_result and cap_result['total_market_cap'] else 0,
+    }
 
 
 @router.get("/sectors", response_model=None)
@@ -29,44 +72,19 @@ async def get_sectors():
 
         sectors = db_manager.execute_query(query)
 
+        # 内存状态已加载时, 数量、平均涨跌幅和总市值 (随价格增量维护) 直接从数组读取
+        live_stats = arena.sector_stats() if arena.loaded else {}
+
         # 为每个板块计算统计信息
         for sector in sectors:
             sector_code = sector['code']
 
-            # 计算该板块的股票数量
-            count_query = """
-                SELECT COUNT(*) as stock_count
-                FROM stocks
-                WHERE sector_code = ? AND is_active = 1
-            """
-            count_result = db_manager.execute_query(
-                count_query, (sector_code,), fetch_one=True
-            )
-            sector['stock_count'] = count_result['stock_count'] if count_result else 0
-
-            # 计算该板块的平均涨跌幅
-            avg_query = """
-                SELECT AVG(change_pct) as avg_change_pct
-                FROM stocks
-                WHERE sector_code = ? AND is_active = 1
-            """
-            avg_result = db_manager.execute_query(
-                avg_query, (sector_code,), fetch_one=True
-            )
-            avg_change = avg_result['avg_change_pct'] if avg_result and avg_result['avg_change_pct'] else 0.0
-            sector['avg_change_pct'] = round(float(avg_change), 2)
-
-            # 计算板块总市值
-            cap_query = """
-                SELECT SUM(sm.market_cap) as total_market_cap
-                FROM stocks s
-                JOIN stock_metadata sm ON s.symbol = sm.symbol
-                WHERE s.sector_code = ? AND s.is_active = 1
-            """
-            cap_result = db_manager.execute_query(
-                cap_query, (sector_code,), fetch_one=True
-            )
-            sector['total_market_cap'] = cap_result['total_market_cap'] if cap_result and cap_result['total_market_cap'] else 0
+            if sector_code in live_stats:
+                sector['stock_count'] = live_stats[sector_code]['stock_count']
+                sector['avg_change_pct'] = round(live_stats[sector_code]['avg_change_pct'], 2)
+                sector['total_market_cap'] = live_stats[sector_code]['total_market_cap']
+            else:
+                sector.update(_query_sector_stats(sector_code))
 
         return create_success_response(
             sectors,
@@ -108,6 +126,10 @@ async def get_sector_detail(code: str):
         """
 
         stocks = db_manager.execute_query(stocks_query, (code,))
+        if arena.loaded:
+            arena.overlay_rows(stocks)
+            # 按实时市值重新排序
+            stocks.sort(key=lambda row: row.get('market_cap') or 0, reverse=True)
 
         # 组合结果
         result = dict(sector)
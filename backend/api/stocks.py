@@ -16,10 +16,12 @@ from api.schemas import (
     create_error_response
 )
 from lib.db_manager_sqlite import get_db_manager
+from lib.market_arena import get_market_arena
 
 
 router = APIRouter()
 db_manager = get_db_manager()
+arena = get_market_arena()
 
 
 @router.get("/stocks", response_model=None)
@@ -45,27 +47,37 @@ async def get_stocks(
             WHERE s.is_active = 1
         """
 
-        count_query = """
-            SELECT COUNT(*) as total
-            FROM stocks s
-            WHERE s.is_active = 1
-        """
-
-        params = []
-
-        # 添加板块筛选
-        if sector:
-            base_query += " AND s.sector_code = ?"
-            count_query += " AND s.sector_code = ?"
-            params.append(sector)
-
-        # 添加排序和分页
-        base_query += " ORDER BY sm.market_cap DESC LIMIT ? OFFSET ?"
-        params_with_pagination = params + [page_size, offset]
-
-        # 执行查询
-        stocks = db_manager.execute_query(base_query, tuple(params_with_pagination))
-        total = db_manager.execute_query(count_query, tuple(params), fetch_one=True)
+        if arena.loaded:
+            # 内存状态已加载时按实时市值排序分页, 只查询本页股票的静态字段
+            symbols, total_count = arena.symbols_by_market_cap(sector, offset, page_size)
+            stocks = []
+            if symbols:
+                base_query += f" AND s.symbol IN ({','.join('?' for _ in symbols)})"
+                rows = {row['symbol']: row for row in db_manager.execute_query(base_query, tuple(symbols))}
+                stocks = arena.overlay_rows([rows[symbol] for symbol in symbols if symbol in rows])
+            total = {'total': total_count}
+        else:
+            count_query = """
+                SELECT COUNT(*) as total
+                FROM stocks s
+                WHERE s.is_active = 1
+            """
+
+            params = []
+
+            # 添加板块筛选
+            if sector:
+                base_query += " AND s.sector_code = ?"
+                count_query += " AND s.sector_code = ?"
+                params.append(sector)
+
+            # 添加排序和分页
+            base_query += " ORDER BY sm.market_cap DESC LIMIT ? OFFSET ?"
+            params_with_pagination = params + [page_size, offset]
+
+            # 执行查询
+            stocks = db_manager.execute_query(base_query, tuple(params_with_pagination))
+            total = db_manager.execute_query(count_query, tuple(params), fetch_one=True)
 
         return create_success_response(
             stocks,
@@ -142,6 +154,8 @@ async def get_stock_detail(symbol: str):
         
         # 构建返回数据
         result = dict(stock)
+        if arena.loaded:
+            arena.overlay_rows([result])
         result['is_happy300'] = is_happy300
         result['weight_in_happy300'] = weight_in_happy300
         result['indices'] = indices
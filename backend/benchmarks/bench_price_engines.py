@@ -0,0 +1,253 @@
+"""
+价格生成引擎基准测试
+Price Engine Benchmarks
+
+在临时 SQLite 数据库中生成 N 只合成股票, 测量每个引擎的
+ticks/秒 以及单tick延迟的 p50/p99, 结果以 JSON 输出, 便于比较多次运行。
+
+- price_v2:    PriceGeneratorV2.generate_market_tick (全市场向量化)
+- three_layer: ThreeLayerPriceGenerator.generate_next_price (逐只股票)
+- price_gbm:   PriceGenerator.generate_next_klines + MarketRegimeEngine.step
+
+用法:
+    python benchmarks/bench_price_engines.py
+    python benchmarks/bench_price_engines.py --sizes 100,1000 --engines price_v2 --output bench.json
+"""
+import argparse
+import contextlib
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.db_manager_sqlite import DatabaseManager
+from lib.market_arena import MarketArena
+from lib.market_state_manager import MarketStateManager
+from lib.price_generator import PriceGenerator, MarketRegimeEngine, STATE_CODES, MarketState
+from lib.price_generator_v2 import PriceGeneratorV2
+from lib.rng import init_rng_service
+from lib.synthetic_market import load_synthetic_market
+from lib.three_layer_price_generator import ThreeLayerPriceGenerator
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+ENGINES = ["price_v2", "three_layer", "price_gbm"]
+
+
+def create_synthetic_db(db_path: str, num_stocks: int, seed: int = 0):
+    """
+    创建临时数据库并写入 num_stocks 只合成股票 (见 lib.synthetic_market)
+
+    Args:
+        db_path: 数据库文件路径
+        num_stocks: 股票数量
+        seed: 合成数据的随机种子
+    """
+    load_synthetic_market(db_path, num_stocks, rng=np.random.default_rng(seed))
+
+
+def make_price_v2_tick(db_manager: DatabaseManager) -> Callable[[], None]:
+    """PriceGeneratorV2: 一个tick = 一次 generate_market_tick"""
+    arena = MarketArena(db_manager)
+    arena.load()
+    generator = PriceGeneratorV2(db_manager, market_state_manager=MarketStateManager(db_manager))
+
+    def tick():
+        result = generator.generate_market_tick(
+            current_prices=arena.prices,
+            previous_closes=arena.previous_closes,
+            betas=arena.betas,
+            sector_indices=arena.stock_sector_ids,
+            volatilities=arena.volatilities,
+        )
+        arena.apply_tick(result)
+
+    return tick
+
+
+def make_three_layer_tick(db_manager: DatabaseManager) -> Callable[[], None]:
+    """ThreeLayerPriceGenerator: 一个tick = 每只股票一次 generate_next_price"""
+    generator = ThreeLayerPriceGenerator(db_manager, MarketStateManager(db_manager))
+    conn = db_manager.get_connection()
+    try:
+        symbols = [row[0] for row in conn.execute("SELECT symbol FROM stocks ORDER BY symbol")]
+    finally:
+        conn.close()
+
+    def tick():
+        for symbol in symbols:
+            generator.generate_next_price(symbol)
+
+    return tick
+
+
+def make_price_gbm_tick(db_manager: DatabaseManager) -> Callable[[], None]:
+    """PriceGenerator: 一个tick = 状态转换 + 全市场一根1分钟K线"""
+    arena = MarketArena(db_manager)
+    arena.load()
+    generator = PriceGenerator()
+    regimes = MarketRegimeEngine(np.full(arena.size, STATE_CODES[MarketState.SIDEWAYS]))
+    base_volatilities = np.full(arena.size, generator.base_volatility)
+    state = {"prices": arena.prices.copy()}
+
+    def tick():
+        regimes.step(minutes_elapsed=1)
+        klines = generator.generate_next_klines(state["prices"], regimes.states, base_volatilities)
+        state["prices"] = klines["close"]
+
+    return tick
+
+
+ENGINE_FACTORIES: Dict[str, Callable[[DatabaseManager], Callable[[], None]]] = {
+    "price_v2": make_price_v2_tick,
+    "three_layer": make_three_layer_tick,
+    "price_gbm": make_price_gbm_tick,
+}
+
+
+def run_case(
+    engine: str,
+    db_manager: DatabaseManager,
+    num_stocks: int,
+    ticks: int,
+    warmup: int,
+    max_seconds: float,
+) -> Dict:
+    """
+    运行一个 (引擎, 规模) 组合
+
+    至少测量1个tick; 达到 ticks 或累计耗时超过 max_seconds 时停止。
+    预热同样受 max_seconds 限制 (慢引擎在大规模下只预热一次)。
+    """
+    tick = ENGINE_FACTORIES[engine](db_manager)
+
+    warmup_started = time.perf_counter()
+    for _ in range(warmup):
+        tick()
+        if time.perf_counter() - warmup_started >= max_seconds:
+            break
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    while len(latencies) < ticks:
+        t0 = time.perf_counter()
+        tick()
+        latencies.append(time.perf_counter() - t0)
+        if time.perf_counter() - started >= max_seconds:
+            break
+    total = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "engine": engine,
+        "symbols": num_stocks,
+        "ticks": len(latencies),
+        "total_seconds": round(total, 6),
+        "ticks_per_second": round(len(latencies) / total, 3) if total > 0 else None,
+        "symbols_per_second": round(len(latencies) * num_stocks / total, 1) if total > 0 else None,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    engines: List[str],
+    ticks: int = 50,
+    warmup: int = 2,
+    max_seconds: float = 10.0,
+    seed: int = 42,
+) -> Dict:
+    """
+    运行全部基准测试
+
+    Returns:
+        JSON 可序列化的结果字典
+    """
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="happystock_bench_")
+    try:
+        for num_stocks in sizes:
+            db_path = str(Path(work_dir) / f"bench_{num_stocks}.db")
+            create_synthetic_db(db_path, num_stocks, seed=seed)
+            db_manager = DatabaseManager(db_path)
+
+            for engine in engines:
+                init_rng_service(seed)
+                print(f"[*] {engine} @ {num_stocks} symbols...", file=sys.stderr)
+                result = run_case(engine, db_manager, num_stocks, ticks, warmup, max_seconds)
+                print(
+                    f"    {result['ticks_per_second']} ticks/s, "
+                    f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms",
+                    file=sys.stderr,
+                )
+                results.append(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "benchmark": "price_engines",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "config": {
+            "sizes": sizes,
+            "engines": engines,
+            "ticks": ticks,
+            "warmup": warmup,
+            "max_seconds": max_seconds,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark price generation engines")
+    parser.add_argument(
+        "--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="逗号分隔的股票数量 (默认 100,1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--engines", default=",".join(ENGINES),
+        help=f"逗号分隔的引擎 (默认 {','.join(ENGINES)})",
+    )
+    parser.add_argument("--ticks", type=int, default=50, help="每个组合最多测量的tick数")
+    parser.add_argument("--warmup", type=int, default=2, help="预热tick数")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="每个组合的时间上限(秒)")
+    parser.add_argument("--seed", type=int, default=42, help="随机数根种子")
+    parser.add_argument("--output", help="JSON 输出文件 (默认输出到 stdout)")
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINE_FACTORIES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+
+    # 引擎自身的日志输出转到 stderr, stdout 只保留 JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(
+            sizes=[int(s) for s in args.sizes.split(",") if s.strip()],
+            engines=engines,
+            ticks=args.ticks,
+            warmup=args.warmup,
+            max_seconds=args.max_seconds,
+            seed=args.seed,
+        )
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+        print(f"[+] Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
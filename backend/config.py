@@ -69,6 +69,22 @@ class Settings(BaseSettings):
 
     # 虚拟市场配置
     PRICE_GENERATION_ENABLED: bool = True  # 是否启用价格生成
+    EMBEDDED_SIMULATOR: bool = True  # API 进程内运行调度器; False 时由 start_market_simulator.py 独立运行, API 经 Redis 接收行情
+    TICK_INTERVAL_SECONDS: float = 3.0  # 价格 tick 间隔(秒)
+    TICK_CATCHUP_POLICY: str = "coalesce"  # tick 超时后的追赶策略: skip / coalesce / burst
+    TICK_MAX_CATCHUP_STEPS: int = 20  # burst 策略单次最多补算的步数
+    MARKET_ARENA_FLUSH_INTERVAL: int = 15  # 内存市场状态写回数据库的间隔(秒)
+    MARKET_RNG_SEED: Optional[int] = None  # 随机数根种子 (设置后整个会话可复现)
+    PRICE_BRIDGE_POINTS: int = 8  # 布朗桥中间点数量 (越多影线越真实)
+    INDEX_FULL_RECOMPUTE_TICKS: int = 200  # 增量指数引擎每隔多少个tick完整重算一次 (消除浮点累积误差)
+    INDEX_REBALANCE_INTERVAL_MINUTES: int = 1440  # 按实时市值调整指数成分股的间隔(分钟), 0 表示不调整
+    PERSISTENCE_QUEUE_SIZE: int = 256  # 持久化队列容量 (满时丢弃并计数, tick 不阻塞)
+    PERSISTENCE_BATCH_SECONDS: float = 1.0  # 写入线程收集一批数据的最长等待时间(秒)
+    PERSISTENCE_MAX_BATCH: int = 64  # 每个事务最多写入的队列项数
+    PERSISTENCE_MAX_RETRIES: int = 5  # 一批数据写入失败后的最多重试次数 (用尽后才丢弃K线)
+    PERSISTENCE_RETRY_BACKOFF_SECONDS: float = 0.5  # 第一次重试前的等待时间(秒), 之后每次加倍
+    ADMIN_TOKEN: Optional[str] = None  # 管理接口令牌 (请求需携带 X-Admin-Token; 未设置时管理接口拒绝全部请求)
+    ADMIN_ALLOW_UNAUTHENTICATED: bool = False  # 未设置 ADMIN_TOKEN 时是否开放管理接口 (仅限本地开发)
 
     class Config:
         env_file = ".env"
@@ -17,12 +17,15 @@ import time
 from datetime import datetime, timedelta
 from typing import List, Dict
 
+import numpy as np
+
 # Add backend directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lib.price_generator import PriceGenerator, MarketState
+from lib.price_generator import MarketState, STATE_LIST, generate_kline_matrix
 from lib.db_models import get_db_manager, init_db_manager, StockMetadata
 from lib.data_aggregator import DataAggregator
+from lib.rng import get_rng_service
 
 # Configure logging
 logging.basicConfig(
@@ -50,10 +53,13 @@ class HistoricalDataGenerator:
     # Minutes per trading day
     MINUTES_PER_DAY = 240  # 120 (morning) + 120 (afternoon)
 
+    # Stocks generated per (stocks x bars) matrix
+    STOCK_BATCH_SIZE = 50
+
     def __init__(self, db_manager=None):
         """Initialize historical data generator"""
         self.db = db_manager or get_db_manager()
-        self.generators: Dict[str, PriceGenerator] = {}
+        self.rng = get_rng_service().get("price_generator")
 
     def generate_trading_timestamps(
         self,
@@ -96,61 +102,80 @@ class HistoricalDataGenerator:
 
         return timestamps
 
-    def generate_stock_history(
+    def generate_batch_history(
         self,
-        stock: StockMetadata,
+        stocks: List[StockMetadata],
         timestamps: List[int],
-    ) -> List[Dict]:
+    ) -> List[List[Dict]]:
         """
-        Generate historical K-line data for a stock.
+        Generate historical K-line data for a batch of stocks at once.
 
         Args:
-            stock: Stock metadata
+            stocks: Stock metadata list
             timestamps: List of timestamps to generate data for
 
         Returns:
-            List of K-line dictionaries
+            One list of K-line dictionaries per stock
         """
-        symbol = stock.symbol
-        base_price = float(stock.base_price)
-        base_volatility = float(stock.base_volatility)
-
-        # Initialize generator for this stock
-        if symbol not in self.generators:
-            self.generators[symbol] = PriceGenerator(base_volatility=base_volatility)
+        if not timestamps:
+            return [[] for _ in stocks]
 
-        generator = self.generators[symbol]
-
-        # Generate sequence
-        klines, final_state = generator.generate_kline_sequence(
-            initial_price=base_price,
+        klines = generate_kline_matrix(
+            initial_prices=np.array([float(s.base_price) for s in stocks]),
             num_bars=len(timestamps),
+            base_volatilities=np.array([float(s.base_volatility) for s in stocks]),
             base_volume=1000000,  # Base volume
+            rng=self.rng,
         )
 
-        # Attach timestamps
-        historical_data = []
-        for i, kline in enumerate(klines):
-            historical_data.append(
+        histories = []
+        for i, stock in enumerate(stocks):
+            historical_data = [
                 {
-                    "symbol": symbol,
+                    "symbol": stock.symbol,
                     "interval": "1m",
-                    "time": timestamps[i],
-                    "open": kline["open"],
-                    "high": kline["high"],
-                    "low": kline["low"],
-                    "close": kline["close"],
-                    "volume": kline["volume"],
+                    "time": ts,
+                    "open": o,
+                    "high": h,
+                    "low": l,
+                    "close": c,
+                    "volume": v,
                 }
+                for ts, o, h, l, c, v in zip(
+                    timestamps,
+                    klines["open"][i].tolist(),
+                    klines["high"][i].tolist(),
+                    klines["low"][i].tolist(),
+                    klines["close"][i].tolist(),
+                    klines["volume"][i].tolist(),
+                )
+            ]
+
+            logger.info(
+                f"{stock.symbol}: Generated {len(historical_data)} bars, "
+                f"final price: ${klines['close'][i, -1]:.2f}, "
+                f"final state: {STATE_LIST[klines['final_state'][i]].value}"
             )
+            histories.append(historical_data)
 
-        logger.info(
-            f"{symbol}: Generated {len(historical_data)} bars, "
-            f"final price: ${klines[-1]['close']:.2f}, "
-            f"final state: {final_state.value}"
-        )
+        return histories
 
-        return historical_data
+    def generate_stock_history(
+        self,
+        stock: StockMetadata,
+        timestamps: List[int],
+    ) -> List[Dict]:
+        """
+        Generate historical K-line data for a stock.
+
+        Args:
+            stock: Stock metadata
+            timestamps: List of timestamps to generate data for
+
+        Returns:
+            List of K-line dictionaries
+        """
+        return self.generate_batch_history([stock], timestamps)[0]
 
     def initialize_all_stocks(
         self,
@@ -191,40 +216,64 @@ class HistoricalDataGenerator:
             f"({num_days} trading days, {len(timestamps) / 240:.1f} actual days)"
         )
 
-        # Generate data for each stock
-        total_bars = 0
-        for stock in stocks:
-            logger.info(f"Generating history for {stock.symbol} ({stock.name})...")
+        if not timestamps:
+            logger.error("No trading timestamps generated!")
+            return
 
+        # Generate data in (stocks x bars) batches
+        total_bars = 0
+        for b in range(0, len(stocks), self.STOCK_BATCH_SIZE):
+            batch_stocks = stocks[b : b + self.STOCK_BATCH_SIZE]
+            logger.info(
+                f"Generating history for {len(batch_stocks)} stocks "
+                f"({batch_stocks[0].symbol} .. {batch_stocks[-1].symbol})..."
+            )
             try:
-                historical_data = self.generate_stock_history(
-                    stock=stock,
-                    timestamps=timestamps,
-                )
-
-                # Insert into database in batches
-                batch_size = 1000
-                for i in range(0, len(historical_data), batch_size):
-                    batch = historical_data[i : i + batch_size]
-                    self.db.bulk_insert_klines(batch)
-
-                total_bars += len(historical_data)
-
-                # Update stock state with final price
-                last_kline = historical_data[-1]
-                self.db.update_stock_state(
-                    symbol=stock.symbol,
-                    current_price=last_kline["close"],
-                    volatility=stock.base_volatility,
-                    trend=0.0,
-                    market_state="sideways",
-                    timestamp=last_kline["time"],
-                )
-
-                logger.info(f"{stock.symbol}: ✓ {len(historical_data)} bars inserted")
-
+                histories = self.generate_batch_history(batch_stocks, timestamps)
             except Exception as e:
-                logger.error(f"Error generating {stock.symbol}: {e}", exc_info=True)
+                logger.error(
+                    f"Error generating batch {batch_stocks[0].symbol} .. {batch_stocks[-1].symbol}: {e}",
+                    exc_info=True,
+                )
+                histories = None
+
+            # Fall back to one stock at a time so a bad row only skips that symbol
+            if histories is None:
+                histories = []
+                for stock in batch_stocks:
+                    try:
+                        histories.append(self.generate_stock_history(stock, timestamps))
+                    except Exception as e:
+                        logger.error(f"Error generating {stock.symbol}: {e}", exc_info=True)
+                        histories.append([])
+
+            for stock, historical_data in zip(batch_stocks, histories):
+                if not historical_data:
+                    continue
+                try:
+                    # Insert into database in batches
+                    batch_size = 1000
+                    for i in range(0, len(historical_data), batch_size):
+                        batch = historical_data[i : i + batch_size]
+                        self.db.bulk_insert_klines(batch)
+
+                    total_bars += len(historical_data)
+
+                    # Update stock state with final price
+                    last_kline = historical_data[-1]
+                    self.db.update_stock_state(
+                        symbol=stock.symbol,
+                        current_price=last_kline["close"],
+                        volatility=stock.base_volatility,
+                        trend=0.0,
+                        market_state="sideways",
+                        timestamp=last_kline["time"],
+                    )
+
+                    logger.info(f"{stock.symbol}: ✓ {len(historical_data)} bars inserted")
+
+                except Exception as e:
+                    logger.error(f"Error generating {stock.symbol}: {e}", exc_info=True)
 
         logger.info(f"Historical data initialization complete! Total bars: {total_bars}")
 
@@ -0,0 +1,218 @@
+"""
+按时间点选择成分股版本 (Constituent History)
+
+index_constituent_snapshots 中每个版本在 [effective_from, effective_to) 内生效
+(见 lib.index_rebalance)。全部版本的起止时间构成一组断点, 相邻断点之间的区间内
+成分股不变; 每个区间的权重矩阵 (IndexWeightMatrix) 在第一次使用时构建并缓存。
+
+全部区间的矩阵共享同一组列 (所有版本出现过的股票), 历史重建时对同一个
+时间 × 股票价格矩阵按区间分段做 P @ Wᵀ, 每个时间点使用当时生效的成分股和除数。
+早于第一个断点的时间点使用最早的版本。
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.index_rebalance import ensure_snapshot_table
+from lib.index_weights import IndexWeightMatrix, _fill_missing, index_coefficients
+
+
+class ConstituentHistory:
+    """成分股版本的区间缓存"""
+
+    def __init__(
+        self,
+        index_codes: List[str],
+        symbols: List[str],
+        index_ids: np.ndarray,
+        stock_ids: np.ndarray,
+        weights: np.ndarray,
+        shares: np.ndarray,
+        divisors: np.ndarray,
+        effective_from: np.ndarray,
+        effective_to: np.ndarray,
+        version: int = 0,
+    ):
+        """
+        Args:
+            index_codes / symbols: 矩阵的行和列
+            index_ids / stock_ids / weights / shares / divisors: (R,) 版本记录 (缺失为 nan)
+            effective_from / effective_to: (R,) 生效区间 (当前版本的 effective_to 为 inf)
+            version: 版本表的最大 id (用于判断缓存是否过期)
+        """
+        self.index_codes = list(index_codes)
+        self.symbols = list(symbols)
+        self.index_ids = np.asarray(index_ids, dtype=np.int64)
+        self.stock_ids = np.asarray(stock_ids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.shares = np.asarray(shares, dtype=np.float64)
+        self.divisors = np.asarray(divisors, dtype=np.float64)
+        self.effective_from = np.asarray(effective_from, dtype=np.float64)
+        self.effective_to = np.asarray(effective_to, dtype=np.float64)
+        self.version = version
+
+        ends = self.effective_to[np.isfinite(self.effective_to)]
+        self.breakpoints: List[float] = np.unique(np.concatenate([self.effective_from, ends])).tolist()
+        self._matrices: Dict[int, IndexWeightMatrix] = {}
+
+    @classmethod
+    def from_db(cls, db_manager, index_codes: Optional[List[str]] = None) -> "ConstituentHistory":
+        """
+        加载版本表 (不存在时创建, 并以当前成分股作为初始版本)
+
+        Args:
+            db_manager: 数据库管理器
+            index_codes: 只包含这些指数 (None 表示全部)
+        """
+        conn = db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            if ensure_snapshot_table(cursor):
+                conn.commit()
+            query = """
+                SELECT index_code, stock_symbol, weight, index_shares, divisor,
+                       effective_from, effective_to
+                FROM index_constituent_snapshots
+            """
+            params: tuple = ()
+            if index_codes:
+                query += f" WHERE index_code IN ({','.join('?' for _ in index_codes)})"
+                params = tuple(index_codes)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.execute("SELECT MAX(id) FROM index_constituent_snapshots")
+            version = cursor.fetchone()[0] or 0
+        finally:
+            conn.close()
+
+        codes = list(index_codes) if index_codes else sorted({row[0] for row in rows})
+        symbols = sorted({row[1] for row in rows})
+        code_ids = {code: k for k, code in enumerate(codes)}
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+        rows = [row for row in rows if row[0] in code_ids]
+
+        def column(j, missing=np.nan):
+            return np.array([missing if row[j] is None else row[j] for row in rows], dtype=np.float64)
+
+        return cls(
+            codes,
+            symbols,
+            np.array([code_ids[row[0]] for row in rows], dtype=np.int64),
+            np.array([symbol_ids[row[1]] for row in rows], dtype=np.int64),
+            column(2),
+            column(3),
+            column(4),
+            column(5),
+            column(6, np.inf),
+            version,
+        )
+
+    # ------------------------------------------------------------------
+    # 区间
+    # ------------------------------------------------------------------
+
+    def interval(self, timestamp: float) -> int:
+        """时间点所在的区间序号 (早于第一个断点时为 0)"""
+        return max(bisect_right(self.breakpoints, timestamp) - 1, 0)
+
+    def matrix_at(self, timestamp: float) -> IndexWeightMatrix:
+        """时间点生效的权重矩阵 (按区间缓存)"""
+        return self._interval_matrix(self.interval(timestamp))
+
+    def _interval_matrix(self, interval: int) -> IndexWeightMatrix:
+        matrix = self._matrices.get(interval)
+        if matrix is not None:
+            return matrix
+
+        start = self.breakpoints[interval] if self.breakpoints else 0.0
+        active = (self.effective_from <= start) & (self.effective_to > start)
+        index_ids = self.index_ids[active]
+
+        # 同一版本的记录除数相同, 取任意一条
+        divisors = np.full(len(self.index_codes), np.nan)
+        divisors[index_ids] = self.divisors[active]
+        coefficients, divisors = index_coefficients(
+            index_ids, self.weights[active], self.shares[active], divisors
+        )
+        matrix = IndexWeightMatrix.from_coo(
+            self.index_codes, self.symbols, index_ids, self.stock_ids[active], coefficients, divisors
+        )
+        self._matrices[interval] = matrix
+        return matrix
+
+    def segments(self, timestamps: np.ndarray) -> List[Tuple[int, int, IndexWeightMatrix]]:
+        """
+        把升序时间点按区间切分
+
+        Returns:
+            [(起始行, 结束行, 权重矩阵)]: 行 [起始行, 结束行) 使用该矩阵
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps) == 0:
+            return []
+        intervals = np.maximum(
+            np.searchsorted(np.asarray(self.breakpoints), timestamps, side='right') - 1, 0
+        )
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(intervals)) + 1, [len(timestamps)]])
+        return [
+            (int(start), int(end), self._interval_matrix(int(intervals[start])))
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+    # ------------------------------------------------------------------
+    # 计算
+    # ------------------------------------------------------------------
+
+    @property
+    def nnz(self) -> int:
+        return len(self.weights)
+
+    def historical_values(self, prices: np.ndarray, timestamps: np.ndarray):
+        """
+        历史价格矩阵的指数点位, 每个时间点使用当时生效的成分股
+
+        Args:
+            prices: (T, N) 与 symbols 对齐的价格, 缺失为 nan
+            timestamps: (T,) 升序时间戳
+
+        Returns:
+            (values, coverage): 同 IndexWeightMatrix.historical_values
+        """
+        present = ~np.isnan(prices)
+        filled = _fill_missing(prices, present)
+        values = np.full((prices.shape[0], len(self.index_codes)), np.nan)
+        coverage = np.zeros((prices.shape[0], len(self.index_codes)))
+        for start, end, matrix in self.segments(timestamps):
+            values[start:end], coverage[start:end] = matrix.filled_values(
+                filled[start:end], present[start:end]
+            )
+        return values, coverage
+
+
+# 全局缓存: (数据库, 指数列表) -> 版本缓存
+_history_cache: Dict[tuple, ConstituentHistory] = {}
+
+
+def load_constituent_history(db_manager, index_codes: Optional[List[str]] = None) -> ConstituentHistory:
+    """
+    获取成分股版本缓存 (版本表没有新记录时复用已加载的缓存)
+
+    Args:
+        db_manager: 数据库管理器
+        index_codes: 只包含这些指数 (None 表示全部)
+    """
+    key = (id(db_manager), tuple(index_codes) if index_codes else None)
+    cached = _history_cache.get(key)
+    if cached is not None:
+        row = db_manager.execute_query(
+            "SELECT MAX(id) AS version FROM index_constituent_snapshots", fetch_one=True
+        )
+        if row and (row['version'] or 0) == cached.version:
+            return cached
+    history = ConstituentHistory.from_db(db_manager, index_codes)
+    _history_cache[key] = history
+    return history
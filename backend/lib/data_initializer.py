@@ -20,6 +20,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from lib.db_manager import get_db_manager
 from models.stock import Stock, StockMetadata, get_market_cap_tier
 from models.market import SECTOR_BETA_MAP
+from lib.rng import get_rng_service
+
+
+def _rng():
+    """初始化数据使用的随机流 (由 settings.MARKET_RNG_SEED 决定, 可复现)"""
+    return get_rng_service().get("data_initializer")
 
 
 # ============================================================================
@@ -231,11 +237,11 @@ def insert_stocks_to_db(db_manager):
         for symbol, name, market_cap, beta, volatility in stocks:
             # 根据市值确定初始价格
             if market_cap >= 100_0000_0000:  # >= 100亿
-                initial_price = np.random.uniform(50, 200)
+                initial_price = _rng().uniform(50, 200)
             elif market_cap >= 30_0000_0000:  # 30-100亿
-                initial_price = np.random.uniform(20, 80)
+                initial_price = _rng().uniform(20, 80)
             else:  # < 30亿
-                initial_price = np.random.uniform(10, 40)
+                initial_price = _rng().uniform(10, 40)
 
             stock, metadata = create_stock_data(
                 sector_code, symbol, name, market_cap, beta, volatility, initial_price
@@ -302,18 +308,18 @@ def generate_price_with_gbm(initial_price: float, beta: float, sector_beta: floa
     market_drift = 0.30 * market_return * beta * sector_beta
 
     # 板块影响 (30%) - 板块自身波动
-    sector_return = np.random.normal(0, 0.01)  # 板块日均波动±1%
+    sector_return = _rng().normal(0, 0.01)  # 板块日均波动±1%
     sector_drift = 0.30 * sector_return * sector_beta
 
     # 个股影响 (40%) - 个股特有波动
-    individual_drift = 0.40 * np.random.normal(0, volatility)
+    individual_drift = 0.40 * _rng().normal(0, volatility)
 
     # 总漂移
     total_drift = market_drift + sector_drift + individual_drift
 
     # GBM公式: S(t+dt) = S(t) * exp((μ - 0.5σ²)dt + σ√dt * Z)
     # 简化版本（已包含漂移）
-    shock = volatility * np.sqrt(dt) * np.random.normal(0, 1)
+    shock = volatility * np.sqrt(dt) * _rng().normal(0, 1)
     new_price = initial_price * np.exp(total_drift + shock)
 
     return new_price
@@ -333,11 +339,11 @@ def generate_ohlc_from_close(open_price: float, close_price: float, volatility:
     """
     # 最高价：在开盘和收盘之间的较大值基础上，加上一个正向波动
     base_high = max(open_price, close_price)
-    high = base_high * (1 + abs(np.random.normal(0, volatility * 0.5)))
+    high = base_high * (1 + abs(_rng().normal(0, volatility * 0.5)))
 
     # 最低价：在开盘和收盘之间的较小值基础上，减去一个负向波动
     base_low = min(open_price, close_price)
-    low = base_low * (1 - abs(np.random.normal(0, volatility * 0.5)))
+    low = base_low * (1 - abs(_rng().normal(0, volatility * 0.5)))
 
     # 确保 low <= min(open, close) <= max(open, close) <= high
     low = min(low, base_low)
@@ -391,7 +397,7 @@ def generate_historical_klines(db_manager, days: int = HISTORY_DAYS):
             continue
 
         # 生成当天的市场整体收益率（小幅波动）
-        day_market_return = np.random.normal(daily_market_return, 0.005)  # ±0.5%
+        day_market_return = _rng().normal(daily_market_return, 0.005)  # ±0.5%
 
         # 为每只股票生成当天的K线
         for stock in stocks:
@@ -409,7 +415,7 @@ def generate_historical_klines(db_manager, days: int = HISTORY_DAYS):
                 open_price = current_price
             else:
                 # 开盘价 = 收盘价 * (1 + 小幅跳空)
-                gap = np.random.normal(0, 0.002)  # ±0.2% 跳空
+                gap = _rng().normal(0, 0.002)  # ±0.2% 跳空
                 open_price = current_price * (1 + gap)
 
             # 使用GBM生成收盘价
@@ -424,7 +430,7 @@ def generate_historical_klines(db_manager, days: int = HISTORY_DAYS):
             market_cap_billion = stock.get('market_cap', 100_0000_0000) / 100_0000_0000
             amplitude = abs((high - low) / open_price)
             base_volume = int(market_cap_billion * 1000000 * (1 + amplitude * 10))
-            volume = int(np.random.uniform(base_volume * 0.5, base_volume * 1.5))
+            volume = int(_rng().uniform(base_volume * 0.5, base_volume * 1.5))
 
             # 成交额 = 成交量 × 平均价格
             avg_price = (open_price + close_price + high + low) / 4
@@ -14,6 +14,14 @@ import numpy as np
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from lib.rng import get_rng_service
+
+
+def _rng():
+    """初始化数据使用的随机流 (由 settings.MARKET_RNG_SEED 决定, 可复现)"""
+    return get_rng_service().get("data_initializer_sqlite")
+
+
 # 板块Beta映射
 SECTOR_BETA_MAP = {
     'TECH': Decimal('1.25'),
@@ -216,11 +224,11 @@ def create_stock_data(sector_code, symbol, name, market_cap, beta, volatility, i
 def generate_price_with_gbm(initial_price, beta, sector_beta, market_return, volatility, dt=1.0):
     """GBM价格生成算法"""
     market_drift = 0.30 * market_return * beta * sector_beta
-    sector_return = np.random.normal(0, 0.01)
+    sector_return = _rng().normal(0, 0.01)
     sector_drift = 0.30 * sector_return * sector_beta
-    individual_drift = 0.40 * np.random.normal(0, volatility)
+    individual_drift = 0.40 * _rng().normal(0, volatility)
     total_drift = market_drift + sector_drift + individual_drift
-    shock = volatility * np.sqrt(dt) * np.random.normal(0, 1)
+    shock = volatility * np.sqrt(dt) * _rng().normal(0, 1)
     new_price = initial_price * np.exp(total_drift + shock)
     return new_price
 
@@ -228,9 +236,9 @@ def generate_price_with_gbm(initial_price, beta, sector_beta, market_return, vol
 def generate_ohlc_from_close(open_price, close_price, volatility):
     """生成OHLC"""
     base_high = max(open_price, close_price)
-    high = base_high * (1 + abs(np.random.normal(0, volatility * 0.5)))
+    high = base_high * (1 + abs(_rng().normal(0, volatility * 0.5)))
     base_low = min(open_price, close_price)
-    low = base_low * (1 - abs(np.random.normal(0, volatility * 0.5)))
+    low = base_low * (1 - abs(_rng().normal(0, volatility * 0.5)))
     low = min(low, base_low)
     high = max(high, base_high)
     return high, low
@@ -261,11 +269,11 @@ def insert_stocks_to_db():
             for symbol, name, market_cap, beta, volatility in stocks:
                 # 根据市值确定初始价格
                 if market_cap >= 100_0000_0000:  # >= 100亿
-                    initial_price = np.random.uniform(50, 200)
+                    initial_price = _rng().uniform(50, 200)
                 elif market_cap >= 30_0000_0000:  # 30-100亿
-                    initial_price = np.random.uniform(20, 80)
+                    initial_price = _rng().uniform(20, 80)
                 else:  # < 30亿
-                    initial_price = np.random.uniform(10, 40)
+                    initial_price = _rng().uniform(10, 40)
 
                 stock, metadata = create_stock_data(
                     sector_code, symbol, name, market_cap, beta, volatility, initial_price
@@ -350,7 +358,7 @@ def generate_historical_klines(days: int = HISTORY_DAYS):
                 continue
 
             # 生成当天的市场整体收益率
-            day_market_return = np.random.normal(daily_market_return, 0.005)
+            day_market_return = _rng().normal(daily_market_return, 0.005)
 
             # 为每只股票生成当天的K线
             for stock in stocks:
@@ -363,7 +371,7 @@ def generate_historical_klines(days: int = HISTORY_DAYS):
                 if day_offset == 0:
                     open_price = float(current_price)
                 else:
-                    gap = np.random.normal(0, 0.002)
+                    gap = _rng().normal(0, 0.002)
                     open_price = float(current_price) * (1 + gap)
 
                 # 使用GBM生成收盘价
@@ -378,7 +386,7 @@ def generate_historical_klines(days: int = HISTORY_DAYS):
                 market_cap_billion = market_cap / 100_0000_0000
                 amplitude = abs((high - low) / open_price)
                 base_volume = int(market_cap_billion * 1000000 * (1 + amplitude * 10))
-                volume = int(np.random.uniform(base_volume * 0.5, base_volume * 1.5))
+                volume = int(_rng().uniform(base_volume * 0.5, base_volume * 1.5))
 
                 # 成交额
                 avg_price = (open_price + close_price + high + low) / 4
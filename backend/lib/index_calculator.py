@@ -1,14 +1,19 @@
 """
 指数计算引擎
-实现市值加权指数计算逻辑
+实现市值加权指数计算逻辑 (除数法, 见 lib.index_divisor)
 
 T040-T043: 指数计算和历史数据生成
 """
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
+import numpy as np
 
+from .constituent_history import load_constituent_history
 from .db_manager_sqlite import get_db_manager
+from .index_divisor import ensure_divisor_columns
+from .index_weights import IndexWeightMatrix
+from .market_arena import get_market_arena
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +24,14 @@ class IndexCalculator:
     def __init__(self, index_code: str):
         self.index_code = index_code
         self.db = get_db_manager()
+        with self.db.get_cursor() as cursor:
+            ensure_divisor_columns(cursor)
         self._load_index_info()
     
     def _load_index_info(self):
         """加载指数基本信息"""
         query = """
-            SELECT code, name, base_point, index_type, calculation_method
+            SELECT code, name, base_point, index_type, calculation_method, divisor
             FROM indices
             WHERE code = ?
         """
@@ -37,6 +44,7 @@ class IndexCalculator:
         self.base_point = result['base_point']
         self.index_type = result['index_type']
         self.calculation_method = result['calculation_method']
+        self.divisor = result['divisor']
     
     def get_constituents(self) -> List[Dict]:
         """获取指数成分股及权重"""
@@ -44,6 +52,7 @@ class IndexCalculator:
             SELECT 
                 ic.stock_symbol,
                 ic.weight,
+                ic.index_shares,
                 ic.rank,
                 s.name as stock_name,
                 s.current_price
@@ -64,42 +73,72 @@ class IndexCalculator:
         Returns:
             指数点位
         """
+        # 内存状态已加载时直接使用内存中的价格和成分股
+        arena = get_market_arena()
+        if price_data is None and arena.loaded and self.index_code in arena.index_ids:
+            stock_ids, weights, shares = arena.index_members(self.index_code)
+            if len(stock_ids) == 0:
+                logger.warning(f"No constituents found for index {self.index_code}")
+                return self.base_point
+            return self._index_value(
+                arena.prices[stock_ids], weights, shares, arena.get_index_divisor(self.index_code)
+            )
+        
         constituents = self.get_constituents()
         
         if not constituents:
             logger.warning(f"No constituents found for index {self.index_code}")
             return self.base_point
         
-        # 计算加权价格总和
-        weighted_sum = 0.0
-        total_weight = 0.0
-        
-        for constituent in constituents:
-            symbol = constituent['stock_symbol']
-            weight = constituent['weight']
-            
-            # 获取价格
-            if price_data and symbol in price_data:
-                price = price_data[symbol]
-            else:
-                price = constituent['current_price']
-            
-            weighted_sum += price * weight
-            total_weight += weight
-        
-        # 归一化权重
+        prices = np.array([
+            price_data[c['stock_symbol']] if price_data and c['stock_symbol'] in price_data
+            else c['current_price']
+            for c in constituents
+        ], dtype=np.float64)
+        weights = np.array([c['weight'] for c in constituents], dtype=np.float64)
+        shares = np.array(
+            [np.nan if c['index_shares'] is None else c['index_shares'] for c in constituents],
+            dtype=np.float64,
+        )
+        return self._index_value(prices, weights, shares, self.divisor)
+
+    @staticmethod
+    def _index_value(prices: np.ndarray, weights: np.ndarray, shares: np.ndarray,
+                     divisor: Optional[float]) -> float:
+        """
+        指数点位 = Σ(价格 × 指数份额) / 除数
+
+        尚未编制除数 (或有成分股缺少份额) 时沿用旧算法: 加权平均价 × 10
+        """
+        if divisor and divisor > 0 and not np.isnan(shares).any():
+            return round(float(prices @ shares) / divisor, 2)
+
+        total_weight = weights.sum()
         if total_weight > 0:
-            normalized_value = weighted_sum / total_weight
+            normalized_value = float(prices @ weights / total_weight)
         else:
             normalized_value = 0
-        
-        # 指数点位 = 加权价格 / 除数 × 基点
-        # 简化计算：假设除数已经包含在基点中
-        # 这里我们使用基点作为参考，实际值按比例调整
-        index_value = normalized_value * 10  # 简化的比例因子
-        
-        return round(index_value, 2)
+        return round(normalized_value * IndexWeightMatrix.SCALE, 2)
     
+    def get_weight_matrix(self) -> IndexWeightMatrix:
+        """本指数的单行权重矩阵 (列为成分股)"""
+        constituents = self.get_constituents()
+        rows = [
+            {
+                'index_code': self.index_code,
+                'stock_symbol': c['stock_symbol'],
+                'weight': c['weight'],
+                'index_shares': c['index_shares'],
+            }
+            for c in constituents
+        ]
+        return IndexWeightMatrix.from_constituents(
+            rows,
+            index_codes=[self.index_code],
+            symbols=[c['stock_symbol'] for c in constituents],
+            divisors={self.index_code: self.divisor},
+        )
+
     def calculate_index_from_historical_prices(
         self, 
         timestamp: int,
@@ -115,205 +154,81 @@ class IndexCalculator:
         Returns:
             包含OHLC的字典，如果数据不足则返回None
         """
-        constituents = self.get_constituents()
-        
-        if not constituents:
-            return None
-        
-        # 获取所有成分股在该时间点的价格数据
-        symbols = [c['stock_symbol'] for c in constituents]
-        placeholders = ','.join(['?' for _ in symbols])
-        
-        query = f"""
-            SELECT target_code, open, high, low, close
-            FROM price_data
-            WHERE target_type = 'STOCK'
-                AND target_code IN ({placeholders})
-                AND timestamp = ?
+        klines = self.calculate_klines_from_historical_prices([timestamp], [datetime_str])
+        return klines[0] if klines else None
+
+    def calculate_klines_from_historical_prices(
+        self,
+        timestamps: List[int],
+        datetimes: List[str],
+        min_coverage: float = 0.8,
+    ) -> List[Dict]:
         """
-        
-        stock_prices = self.db.execute_query(
-            query, 
-            tuple(symbols) + (timestamp,)
-        )
-        
-        # 检查是否所有成分股都有数据
-        if len(stock_prices) < len(symbols) * 0.8:  # 至少80%的成分股有数据
-            logger.warning(
-                f"Insufficient data for index {self.index_code} at {datetime_str}: "
-                f"got {len(stock_prices)}/{len(symbols)} stocks"
-            )
-            return None
-        
-        # 创建价格映射
-        price_map = {
-            row['target_code']: {
-                'open': row['open'],
-                'high': row['high'],
-                'low': row['low'],
-                'close': row['close']
-            }
-            for row in stock_prices
-        }
-        
-        # 计算OHLC
-        ohlc = {
-            'open': 0.0,
-            'high': 0.0,
-            'low': 0.0,
-            'close': 0.0
-        }
-        
-        for price_type in ['open', 'high', 'low', 'close']:
-            weighted_sum = 0.0
-            total_weight = 0.0
-            
-            for constituent in constituents:
-                symbol = constituent['stock_symbol']
-                weight = constituent['weight']
-                
-                if symbol in price_map:
-                    price = price_map[symbol][price_type]
-                    weighted_sum += price * weight
-                    total_weight += weight
-            
-            if total_weight > 0:
-                ohlc[price_type] = round((weighted_sum / total_weight) * 10, 2)
-        
-        return {
-            'target_type': 'INDEX',
-            'target_code': self.index_code,
-            'timestamp': timestamp,
-            'datetime': datetime_str,
-            'open': ohlc['open'],
-            'high': ohlc['high'],
-            'low': ohlc['low'],
-            'close': ohlc['close'],
-            'volume': 0,  # 指数没有成交量
-            'turnover': 0.0,
-            'change_pct': 0.0  # 稍后计算
-        }
+        根据历史价格批量计算一段时间的指数K线
+
+        一次查询取出全部成分股在这些时间点的价格, 整理为 T×N 价格矩阵,
+        每个价格字段按成分股版本分段做矩阵乘法, 每个时间点使用当时生效的成分股。
+
+        Args:
+            timestamps: Unix时间戳列表 (升序)
+            datetimes: 对应的日期时间字符串
+            min_coverage: 有数据的成分股最低比例, 不足的时间点被跳过
+
+        Returns:
+            K线字典列表 (change_pct 为0, 由调用方计算)
+        """
+        history = load_constituent_history(self.db, [self.index_code])
+        if history.nnz == 0 or not timestamps:
+            return []
+
+        prices = load_stock_price_matrix(self.db, history.symbols, timestamps)
+        values = {}
+        coverage = None
+        for field in ('open', 'high', 'low', 'close'):
+            field_values, field_coverage = history.historical_values(prices[field], timestamps)
+            values[field] = field_values[:, 0]
+            if coverage is None:
+                coverage = field_coverage[:, 0]
+
+        klines = []
+        for t, (timestamp, datetime_str) in enumerate(zip(timestamps, datetimes)):
+            # 检查是否足够多的成分股有数据
+            if coverage[t] < min_coverage:
+                logger.warning(
+                    f"Insufficient data for index {self.index_code} at {datetime_str}: "
+                    f"got {coverage[t]:.0%} of constituents"
+                )
+                continue
+
+            klines.append({
+                'target_type': 'INDEX',
+                'target_code': self.index_code,
+                'timestamp': timestamp,
+                'datetime': datetime_str,
+                'open': float(values['open'][t]),
+                'high': float(values['high'][t]),
+                'low': float(values['low'][t]),
+                'close': float(values['close'][t]),
+                'volume': 0,  # 指数没有成交量
+                'turnover': 0.0,
+                'change_pct': 0.0  # 稍后计算
+            })
+
+        return klines
     
     def generate_historical_klines(self, days: int = 90) -> int:
         """
         生成指数的历史K线数据
         
         Args:
-            days: 生成天数
+            days: 生成天数 (按时间范围, 以最新的股票K线为终点)
         
         Returns:
             生成的K线数量
         """
         logger.info(f"Generating {days} days of historical K-lines for {self.index_code}")
-        
-        # 获取股票K线的时间范围
-        query = """
-            SELECT DISTINCT timestamp, datetime
-            FROM price_data
-            WHERE target_type = 'STOCK'
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """
-        
-        timestamps = self.db.execute_query(query, (days,))
-        
-        if not timestamps:
-            logger.warning("No stock price data found")
-            return 0
-        
-        # 反转顺序，从旧到新
-        timestamps.reverse()
-        
-        # 计算每个时间点的指数值
-        klines = []
-        previous_close = None
-        
-        for ts_row in timestamps:
-            timestamp = ts_row['timestamp']
-            datetime_str = ts_row['datetime']
-            
-            kline = self.calculate_index_from_historical_prices(
-                timestamp, 
-                datetime_str
-            )
-            
-            if kline:
-                # 计算涨跌幅
-                if previous_close:
-                    change_pct = ((kline['close'] - previous_close) / previous_close) * 100
-                    kline['change_pct'] = round(change_pct, 2)
-                
-                klines.append(kline)
-                previous_close = kline['close']
-        
-        # 批量插入数据库
-        if klines:
-            # 先删除已有数据
-            delete_query = """
-                DELETE FROM price_data 
-                WHERE target_type = 'INDEX' AND target_code = ?
-            """
-            self.db.execute_update(delete_query, (self.index_code,))
-            
-            # 插入新数据
-            insert_query = """
-                INSERT INTO price_data 
-                (target_type, target_code, timestamp, datetime, 
-                 open, high, low, close, volume, turnover, change_pct)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            for kline in klines:
-                self.db.execute_update(
-                    insert_query,
-                    (
-                        kline['target_type'],
-                        kline['target_code'],
-                        kline['timestamp'],
-                        kline['datetime'],
-                        kline['open'],
-                        kline['high'],
-                        kline['low'],
-                        kline['close'],
-                        kline['volume'],
-                        kline['turnover'],
-                        kline['change_pct']
-                    )
-                )
-            
-            # 更新指数表的当前值
-            latest_kline = klines[-1]
-            update_index_query = """
-                UPDATE indices
-                SET current_value = ?,
-                    previous_close = ?,
-                    change_value = ?,
-                    change_pct = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE code = ?
-            """
-            
-            previous = klines[-2]['close'] if len(klines) > 1 else latest_kline['close']
-            change_value = latest_kline['close'] - previous
-            change_pct = ((latest_kline['close'] - previous) / previous * 100) if previous > 0 else 0
-            
-            self.db.execute_update(
-                update_index_query,
-                (
-                    latest_kline['close'],
-                    previous,
-                    round(change_value, 2),
-                    round(change_pct, 2),
-                    self.index_code
-                )
-            )
-            
-            logger.info(
-                f"Generated {len(klines)} K-lines for {self.index_code}, "
-                f"current value: {latest_kline['close']:.2f}"
-            )
-        
-        return len(klines)
+        counts = rebuild_index_history(self.db, [self.index_code], days)
+        return counts.get(self.index_code, 0)
     
     def update_current_value(self):
         """更新指数当前值"""
@@ -359,26 +274,281 @@ class IndexCalculator:
         return current_value
 
 
+def load_stock_price_matrix(db, symbols: List[str], timestamps: List[int]) -> Dict[str, np.ndarray]:
+    """
+    把股票历史价格整理为 T×N 价格矩阵
+
+    Args:
+        db: 数据库管理器
+        symbols: 列顺序 (股票代码)
+        timestamps: 行顺序 (Unix时间戳)
+
+    Returns:
+        {'open'/'high'/'low'/'close': (T, N) 数组}, 缺失数据为 nan
+    """
+    fields = ('open', 'high', 'low', 'close')
+    matrices = {field: np.full((len(timestamps), len(symbols)), np.nan) for field in fields}
+    if not symbols or not timestamps:
+        return matrices
+
+    row_ids = {ts: t for t, ts in enumerate(timestamps)}
+    col_ids = {symbol: i for i, symbol in enumerate(symbols)}
+
+    # 按时间范围查询, 再按请求的时间点过滤 (避免超长 IN 列表);
+    # 成分股较少时同时按代码过滤
+    query = """
+        SELECT timestamp, target_code, open, high, low, close
+        FROM price_data
+        WHERE target_type = 'STOCK'
+            AND timestamp BETWEEN ? AND ?
+    """
+    params = (min(timestamps), max(timestamps))
+    if len(symbols) <= 500:
+        query += f" AND target_code IN ({','.join('?' for _ in symbols)})"
+        params += tuple(symbols)
+    rows = db.execute_query(query, params)
+    for row in rows:
+        t = row_ids.get(row['timestamp'])
+        i = col_ids.get(row['target_code'])
+        if t is None or i is None:
+            continue
+        for field in fields:
+            matrices[field][t, i] = row[field]
+    return matrices
+
+
+def _scan_stock_prices(cursor, symbols: List[str], start_timestamp: int, end_timestamp: int):
+    """
+    一次扫描范围内成分股的K线, 整理为 T×N 价格矩阵
+
+    股票代码在 SQLite 内通过临时表映射为列下标, 结果按块取出后直接转为 numpy 数组,
+    再按时间戳排序去重得到行下标 (不逐行执行 Python 代码)。
+
+    Returns:
+        (timestamps, datetimes, {'open'/'high'/'low'/'close': (T, N) 数组}), 缺失为 nan
+    """
+    cursor.execute("DROP TABLE IF EXISTS temp.rebuild_symbols")
+    cursor.execute("CREATE TEMP TABLE rebuild_symbols (symbol TEXT PRIMARY KEY, col INTEGER)")
+    cursor.executemany(
+        "INSERT INTO temp.rebuild_symbols (symbol, col) VALUES (?, ?)",
+        [(symbol, i) for i, symbol in enumerate(symbols)],
+    )
+    # "+" 关闭 target_type/timestamp 上的索引: 顺序扫描表比按索引回表快得多
+    cursor.execute(
+        """
+            SELECT p.timestamp, p.datetime, r.col, p.open, p.high, p.low, p.close
+            FROM price_data p
+            JOIN temp.rebuild_symbols r ON r.symbol = p.target_code
+            WHERE +p.target_type = 'STOCK'
+                AND +p.timestamp BETWEEN ? AND ?
+        """,
+        (start_timestamp, end_timestamp),
+    )
+
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(200000)
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        chunks.append((
+            np.array(columns[0], dtype=np.int64),
+            columns[1],
+            np.array(columns[2], dtype=np.int64),
+            np.array(columns[3:], dtype=np.float64),
+        ))
+    cursor.execute("DROP TABLE IF EXISTS temp.rebuild_symbols")
+
+    if not chunks:
+        shape = (0, len(symbols))
+        return [], [], {field: np.full(shape, np.nan) for field in ('open', 'high', 'low', 'close')}
+
+    row_timestamps = np.concatenate([chunk[0] for chunk in chunks])
+    stock_ids = np.concatenate([chunk[2] for chunk in chunks])
+    values = np.concatenate([chunk[3] for chunk in chunks], axis=1)
+
+    timestamps, first, row_ids = np.unique(row_timestamps, return_index=True, return_inverse=True)
+    offsets = np.cumsum([0] + [len(chunk[0]) for chunk in chunks])
+    datetimes = []
+    for position in first:
+        c = int(np.searchsorted(offsets, position, side='right')) - 1
+        datetimes.append(chunks[c][1][position - offsets[c]])
+
+    shape = (len(timestamps), len(symbols))
+    matrices = {}
+    for j, field in enumerate(('open', 'high', 'low', 'close')):
+        matrix = np.full(shape, np.nan)
+        matrix[row_ids, stock_ids] = values[j]
+        matrices[field] = matrix
+    return timestamps.tolist(), datetimes, matrices
+
+
+def rebuild_index_history(
+    db,
+    index_codes: Optional[List[str]] = None,
+    days: int = 90,
+    min_coverage: float = 0.8,
+) -> Dict[str, int]:
+    """
+    批量重建指数历史K线
+
+    1. 一次扫描范围内全部成分股 (所有版本) K线, 按时间戳整理为 时间 × 股票 价格矩阵
+    2. 每个价格字段按成分股版本分段做 P @ Wᵀ, 得到全部指数全部时间点的 OHLC
+       (每个时间点使用当时生效的成分股和除数, 见 lib.constituent_history)
+    3. 在一个事务内删除范围内的旧指数K线, executemany 写入新K线并更新 indices 表
+
+    Args:
+        db: 数据库管理器
+        index_codes: 要重建的指数 (None 表示全部)
+        days: 重建天数 (以最新的股票K线时间为终点)
+        min_coverage: 有数据的成分股最低比例, 不足的时间点被跳过
+
+    Returns:
+        {指数代码: 生成的K线数量}
+    """
+    history = load_constituent_history(db, index_codes)
+    if history.nnz == 0:
+        logger.warning("No index constituents found")
+        return {}
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        # 按时间戳索引倒序取最新一条 (避免在 target_type 索引上扫描全部股票K线)
+        cursor.execute("""
+            SELECT timestamp FROM price_data
+            WHERE +target_type = 'STOCK'
+            ORDER BY timestamp DESC
+            LIMIT 1
+        """)
+        latest_row = cursor.fetchone()
+        if latest_row is None:
+            logger.warning("No stock price data found")
+            return {}
+        end_timestamp = latest_row[0]
+        start_timestamp = end_timestamp - days * 86400 + 1
+
+        timestamps, datetimes, prices = _scan_stock_prices(
+            cursor, history.symbols, start_timestamp, end_timestamp
+        )
+        if not timestamps:
+            logger.warning("No stock price data found in range")
+            return {}
+
+        # 全部指数、全部时间点一次矩阵计算
+        values = {}
+        coverage = None
+        for field in ('open', 'high', 'low', 'close'):
+            values[field], field_coverage = history.historical_values(prices[field], timestamps)
+            if coverage is None:
+                coverage = field_coverage
+
+        rows = []
+        latest = []
+        counts: Dict[str, int] = {}
+        for k, index_code in enumerate(history.index_codes):
+            valid = np.flatnonzero(coverage[:, k] >= min_coverage)
+            if len(valid) < len(timestamps):
+                logger.warning(
+                    f"Insufficient data for index {index_code} at "
+                    f"{len(timestamps) - len(valid)}/{len(timestamps)} timestamps"
+                )
+            counts[index_code] = len(valid)
+            if len(valid) == 0:
+                continue
+
+            closes = values['close'][valid, k]
+            previous = np.concatenate([[closes[0]], closes[:-1]])
+            change_pcts = np.round((closes - previous) / previous * 100, 2)
+            change_pcts[0] = 0.0
+            rows.extend(
+                ('INDEX', index_code, timestamps[t], datetimes[t],
+                 float(values['open'][t, k]), float(values['high'][t, k]),
+                 float(values['low'][t, k]), float(closes[j]), 0, 0.0, float(change_pcts[j]))
+                for j, t in enumerate(valid)
+            )
+
+            # 更新指数表的当前值
+            previous_close = float(previous[-1])
+            change_value = float(closes[-1]) - previous_close
+            latest.append((
+                float(closes[-1]),
+                previous_close,
+                round(change_value, 2),
+                round(change_value / previous_close * 100, 2) if previous_close > 0 else 0,
+                index_code,
+            ))
+
+        rebuilt = [code for code, count in counts.items() if count]
+        if rebuilt:
+            cursor.execute(
+                f"""
+                    DELETE FROM price_data
+                    WHERE target_type = 'INDEX'
+                        AND target_code IN ({','.join('?' for _ in rebuilt)})
+                        AND timestamp BETWEEN ? AND ?
+                """,
+                (*rebuilt, start_timestamp, end_timestamp),
+            )
+            cursor.executemany(
+                """
+                    INSERT INTO price_data
+                    (target_type, target_code, timestamp, datetime,
+                     open, high, low, close, volume, turnover, change_pct)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            cursor.executemany(
+                """
+                    UPDATE indices
+                    SET current_value = ?,
+                        previous_close = ?,
+                        change_value = ?,
+                        change_pct = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE code = ?
+                """,
+                latest,
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logger.info(
+        f"Rebuilt {len(rows)} index K-lines for {len(rebuilt)} indices "
+        f"over {len(timestamps)} timestamps"
+    )
+    return counts
+
+
 def generate_all_indices_historical_data(days: int = 90):
     """
-    为所有核心指数生成历史数据
+    为所有核心指数生成历史数据 (一次扫描、一次矩阵计算、一个事务)
     
     Args:
         days: 生成天数
     """
     core_indices = ['HAPPY300', 'HAPPY50', 'GROW100']
     
-    total_klines = 0
+    try:
+        counts = rebuild_index_history(get_db_manager(), core_indices, days)
+    except Exception as e:
+        print(f"❌ 生成失败 - {e}")
+        logger.error("Failed to generate index history", exc_info=True)
+        return 0
+
     for index_code in core_indices:
-        try:
-            calculator = IndexCalculator(index_code)
-            count = calculator.generate_historical_klines(days)
-            total_klines += count
+        count = counts.get(index_code, 0)
+        if count:
             print(f"✅ {index_code}: 生成 {count} 条K线")
-        except Exception as e:
-            print(f"❌ {index_code}: 生成失败 - {e}")
-            logger.error(f"Failed to generate data for {index_code}", exc_info=True)
+        else:
+            print(f"❌ {index_code}: 没有生成K线")
     
+    total_klines = sum(counts.values())
     print(f"\n📊 总计生成 {total_klines} 条指数K线数据")
     return total_klines
 
@@ -0,0 +1,217 @@
+"""
+除数法指数编制 (Index Divisor)
+
+市值加权指数点位 = Σ(价格 × 指数份额) / 除数:
+- 指数份额在调整 (新建、成分股或权重变化) 时按权重折算:
+  q_i = w_i × S / p_i, S 为权重和为1时的组合市值 (INDEX_SHARE_SCALE)
+- 除数在调整时选取, 使调整前后点位连续: D = Σ(p_i × q_i) / 调整前点位
+- 首次编制时以基日 (price_data 中最早的时间点) 价格对应基点 base_point
+
+份额和除数持久化在 index_constituents.index_shares 和 indices.divisor,
+tick 中只需一次 Σ p×q 再除以除数, 没有逐tick的权重归一化。
+每次编制或调整都经 lib.index_rebalance.apply_rebalance 写入新的成分股版本,
+历史K线在调整前后分别使用当时的份额和除数。
+
+修改成分股或权重后调用 rebalance_indices (或把相关成分股的 index_shares 置为 NULL,
+模拟引擎启动/重新加载时由 ensure_index_divisors 补齐)。
+"""
+
+import sqlite3
+from typing import Iterable, List, Optional
+import numpy as np
+
+# 权重和为1时的组合市值 S
+INDEX_SHARE_SCALE = 1_000_000.0
+
+
+def ensure_divisor_columns(cursor) -> bool:
+    """
+    为旧数据库补充 indices.divisor 和 index_constituents.index_shares 列
+
+    Returns:
+        是否新增了列
+    """
+    added = False
+    for table, column in (('indices', 'divisor'), ('index_constituents', 'index_shares')):
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = {row[1] for row in cursor.fetchall()}
+        if columns and column not in columns:
+            try:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} REAL")
+                added = True
+            except sqlite3.OperationalError as e:
+                # 其他进程已经添加
+                if 'duplicate column' not in str(e):
+                    raise
+    return added
+
+
+def compute_index_shares(weights: np.ndarray, prices: np.ndarray, scale: float = INDEX_SHARE_SCALE) -> np.ndarray:
+    """
+    按权重折算指数份额 q_i = w_i × S / p_i
+
+    Args:
+        weights: 成分权重
+        prices: 调整时的价格
+        scale: 组合市值 S
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(prices > 0, weights * scale / prices, 0.0)
+
+
+def continuity_divisor(shares: np.ndarray, prices: np.ndarray, value: float) -> Optional[float]:
+    """
+    使 Σ(p × q) / D 等于 value 的除数
+
+    Returns:
+        除数 (value 或组合市值不为正时为 None)
+    """
+    market_value = float(np.dot(prices, shares))
+    if value <= 0 or market_value <= 0:
+        return None
+    return market_value / value
+
+
+def _base_prices(cursor, symbols: List[str]) -> dict:
+    """成分股在基日 (price_data 中最早的股票时间点) 的收盘价"""
+    cursor.execute("SELECT MIN(timestamp) FROM price_data WHERE target_type = 'STOCK'")
+    row = cursor.fetchone()
+    if not row or row[0] is None:
+        return {}
+    placeholders = ','.join('?' for _ in symbols)
+    cursor.execute(
+        f"""
+            SELECT target_code, close FROM price_data
+            WHERE target_type = 'STOCK' AND timestamp = ? AND target_code IN ({placeholders})
+        """,
+        (row[0], *symbols),
+    )
+    return {code: close for code, close in cursor.fetchall()}
+
+
+def rebalance_index(cursor, index_code: str) -> Optional[float]:
+    """
+    按当前权重和价格重新计算指数份额和除数 (在调用方的事务内执行)
+
+    已有除数的指数保持当前点位连续; 首次编制的指数令基日点位等于 base_point
+    (没有历史价格时令当前点位等于 base_point)。结果作为新的成分股版本写入:
+    首次编制的版本覆盖全部历史, 调整的版本从当前时间起生效。
+
+    Args:
+        cursor: 数据库游标
+        index_code: 指数代码
+
+    Returns:
+        新除数 (指数不存在或没有有效成分股时为 None)
+    """
+    cursor.execute(
+        "SELECT current_value, base_point, divisor FROM indices WHERE code = ?",
+        (index_code,),
+    )
+    index_row = cursor.fetchone()
+    if index_row is None:
+        return None
+    current_value, base_point, old_divisor = index_row
+
+    cursor.execute(
+        """
+            SELECT ic.stock_symbol, ic.weight, s.current_price
+            FROM index_constituents ic
+            JOIN stocks s ON ic.stock_symbol = s.symbol
+            WHERE ic.index_code = ? AND ic.is_active = 1
+            ORDER BY ic.rank, ic.stock_symbol
+        """,
+        (index_code,),
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    symbols = [row[0] for row in rows]
+    weights = np.array([row[1] for row in rows], dtype=np.float64)
+    prices = np.array([row[2] or 0.0 for row in rows], dtype=np.float64)
+    shares = compute_index_shares(weights, prices)
+
+    if old_divisor and current_value and current_value > 0:
+        # 调整: 按当前点位保持连续, 新版本从现在起生效
+        divisor = continuity_divisor(shares, prices, current_value)
+        new_value = current_value
+        effective_from = None
+    else:
+        # 首次编制: 基日点位 = base_point, 版本覆盖全部历史
+        base = _base_prices(cursor, symbols)
+        base_prices = np.array([base.get(s) or p for s, p in zip(symbols, prices)], dtype=np.float64)
+        divisor = continuity_divisor(shares, base_prices, base_point)
+        new_value = float(np.dot(prices, shares)) / divisor if divisor else None
+        effective_from = 0
+
+    if divisor is None:
+        return None
+
+    # 份额和除数只通过成分股版本写入 (避免就地修改后历史K线仍使用旧除数)
+    from lib.index_rebalance import apply_rebalance
+    counts = apply_rebalance(
+        cursor,
+        {index_code: list(range(len(symbols)))},
+        symbols,
+        prices,
+        None,
+        values={index_code: new_value},
+        effective_from=effective_from,
+        weights={index_code: weights},
+    )
+    return divisor if counts else None
+
+
+def rebalance_indices(cursor, index_codes: Optional[Iterable[str]] = None, only_missing: bool = False) -> int:
+    """
+    批量调整指数
+
+    Args:
+        cursor: 数据库游标
+        index_codes: 要调整的指数 (None 表示全部)
+        only_missing: 只处理缺少除数或存在缺少份额的成分股的指数
+
+    Returns:
+        调整的指数数量
+    """
+    if index_codes is None:
+        if only_missing:
+            cursor.execute("""
+                SELECT code FROM indices
+                WHERE divisor IS NULL
+                   OR code IN (
+                       SELECT index_code FROM index_constituents
+                       WHERE is_active = 1 AND index_shares IS NULL
+                   )
+                ORDER BY code
+            """)
+        else:
+            cursor.execute("SELECT code FROM indices ORDER BY code")
+        index_codes = [row[0] for row in cursor.fetchall()]
+
+    count = 0
+    for index_code in index_codes:
+        if rebalance_index(cursor, index_code) is not None:
+            count += 1
+    return count
+
+
+def ensure_index_divisors(db_manager) -> int:
+    """
+    补齐缺少除数/份额的指数 (模拟引擎启动时调用)
+
+    Returns:
+        调整的指数数量
+    """
+    conn = db_manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_divisor_columns(cursor)
+        count = rebalance_indices(cursor, only_missing=True)
+        conn.commit()
+    finally:
+        conn.close()
+    if count:
+        print(f"[+] Computed divisors for {count} indices")
+    return count
@@ -0,0 +1,222 @@
+"""
+增量指数引擎 (Index Engine)
+
+在内存中保存每个指数的加权价格和 S_k = Σ q_i × p_i (q 为指数份额),
+指数点位 = S_k / 除数 (与 IndexCalculator.calculate_index_value 相同)。
+
+每个tick只处理价格发生变化的股票: 通过按股票排序的成分股表 (stock_indptr)
+找到它们所属的全部指数, 把 q × Δp 累加到对应的 S_k。涨跌停封板、停牌等
+价格不变的股票不产生任何运算, 也不再查询数据库。
+
+增量累加会积累浮点误差, 因此每隔 full_recompute_interval 个tick
+用权重矩阵 (IndexWeightMatrix) 按当前价格完整重算一次加权和。
+
+指数点位是成分股价格的线性函数, 因此本tick的指数路径就是成分股布朗桥路径
+(PriceGeneratorV2 返回的 path, 各股票的中间点位于相同的时间比例) 乘以权重矩阵:
+tick 的开盘 = 上一tick收盘, 最高/最低 = 路径上的极值, 与成分股K线一致。
+当日开盘/最高/最低也保存在内存中, 不读回 indices 或 price_data。
+"""
+
+from datetime import date
+from typing import Dict, Optional
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.index_weights import IndexWeightMatrix
+from lib.market_arena import MarketArena
+
+
+class IndexEngine:
+    """按价格增量维护全部指数加权和"""
+
+    def __init__(self, arena: MarketArena, full_recompute_interval: int = 200):
+        """
+        初始化引擎
+
+        Args:
+            arena: 内存市场状态 (提供价格和 COO 格式的成分股)
+            full_recompute_interval: 每隔多少个tick完整重算一次 (<=0 表示每个tick都重算)
+        """
+        self.arena = arena
+        self.full_recompute_interval = full_recompute_interval
+        self.matrix: Optional[IndexWeightMatrix] = None
+
+        self.num_indices = 0
+        self.weighted_sums = np.zeros(0)
+        self.divisors = np.zeros(0)
+        self.prices = np.zeros(0)
+
+        # 按股票排序的成分股: 股票 s 的成分记录为 [stock_indptr[s], stock_indptr[s+1])
+        self.stock_indptr = np.zeros(1, dtype=np.int64)
+        self.member_index_ids = np.zeros(0, dtype=np.int64)
+        self.member_weights = np.zeros(0)
+
+        # 当日 OHLC (按交易日重置)
+        self.session_date: Optional[date] = None
+        self.day_open = np.zeros(0)
+        self.day_high = np.zeros(0)
+        self.day_low = np.zeros(0)
+        self._session_codes: list = []
+
+        self.ticks_since_recompute = 0
+        self.full_recomputes = 0
+        self.last_changed = 0
+        self.max_drift = 0.0
+
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        按内存状态中的成分股重建索引结构并完整计算加权和
+
+        arena 重新加载或成分股调整后调用; 调整按当前点位选取除数, 因此点位连续,
+        当日 OHLC 保留 (指数列表不变时)。
+        """
+        arena = self.arena
+        self.matrix = IndexWeightMatrix.from_arena(arena)
+        self.num_indices = self.matrix.shape[0]
+        self.divisors = self.matrix.divisors
+
+        # 权重矩阵按列 (股票) 重排, 用于查找变化股票所属的指数
+        order = np.argsort(self.matrix.stock_ids, kind='stable')
+        self.member_index_ids = self.matrix.row_ids[order]
+        self.member_weights = self.matrix.weights[order]
+        counts = np.bincount(self.matrix.stock_ids, minlength=arena.size)
+        self.stock_indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        # 旧矩阵的加权和不可比较, 不计入漂移
+        self.weighted_sums = np.zeros(0)
+        self.recompute()
+
+    def recompute(self) -> float:
+        """
+        按当前价格完整重算加权和
+
+        Returns:
+            增量结果与完整结果的最大相对偏差 (用于观察浮点漂移)
+        """
+        prices = self.arena.prices.copy()
+        sums = self.matrix.matvec(prices)
+        drift = 0.0
+        if len(self.weighted_sums) == len(sums) and len(sums):
+            scale = np.maximum(np.abs(sums), 1e-12)
+            drift = float(np.max(np.abs(self.weighted_sums - sums) / scale))
+            self.max_drift = max(self.max_drift, drift)
+
+        self.weighted_sums = sums
+        self.prices = prices
+        self.ticks_since_recompute = 0
+        self.full_recomputes += 1
+        return drift
+
+    def update(self) -> np.ndarray:
+        """
+        按上次计算以来的价格变化更新加权和
+
+        Returns:
+            (K,) 指数点位 (没有成分股的指数为 nan)
+        """
+        prices = self.arena.prices
+        changed = np.flatnonzero(prices != self.prices)
+        self.last_changed = len(changed)
+
+        # 变化股票的全部成分记录 (CSR 行展开)
+        starts = self.stock_indptr[changed]
+        lengths = self.stock_indptr[changed + 1] - starts
+        total = int(lengths.sum())
+        if total:
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = np.repeat(starts, lengths) + offsets
+            deltas = np.repeat(prices[changed] - self.prices[changed], lengths)
+            self.weighted_sums += np.bincount(
+                self.member_index_ids[positions],
+                weights=self.member_weights[positions] * deltas,
+                minlength=self.num_indices,
+            )
+        self.prices[changed] = prices[changed]
+
+        # 定期完整重算, 消除累积的浮点误差
+        self.ticks_since_recompute += 1
+        if self.ticks_since_recompute >= self.full_recompute_interval:
+            self.recompute()
+
+        return self.values()
+
+    def step(self, path: Optional[np.ndarray] = None, session_date: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """
+        推进一个tick: 更新收盘点位并由成分股路径计算本tick的指数 OHLC
+
+        Args:
+            path: (N, k) 成分股本tick的中间点价格 (None 时最高/最低只取开盘和收盘)
+            session_date: tick 所属交易日 (跨日时重置当日 OHLC)
+
+        Returns:
+            {'open', 'high', 'low', 'close'}: (K,) 点位 (没有成分股的指数为 nan)
+        """
+        open_values = self.values()
+        close_values = self.update()
+        highs = np.fmax(open_values, close_values)
+        lows = np.fmin(open_values, close_values)
+
+        if path is not None and path.ndim == 2 and path.shape[0] == self.arena.size and path.shape[1]:
+            # (k, K): 每个中间点一次 P @ Wᵀ
+            with np.errstate(divide='ignore', invalid='ignore'):
+                points = np.round(self.matrix.matmat(path.T) / self.divisors, 2)
+            highs = np.fmax(highs, points.max(axis=0))
+            lows = np.fmin(lows, points.min(axis=0))
+            empty = self.matrix.counts == 0
+            highs[empty] = np.nan
+            lows[empty] = np.nan
+
+        self._update_session(open_values, highs, lows, session_date)
+        return {'open': open_values, 'high': highs, 'low': lows, 'close': close_values}
+
+    def _update_session(self, open_values, highs, lows, session_date: Optional[date]):
+        """合并到当日 OHLC (跨日或重新加载后指数列表变化时重置)"""
+        session_date = session_date or date.today()
+        if session_date != self.session_date or self._session_codes != self.matrix.index_codes:
+            self.session_date = session_date
+            self._session_codes = self.matrix.index_codes
+            self.day_open = open_values.copy()
+            self.day_high = highs.copy()
+            self.day_low = lows.copy()
+            return
+        np.fmax(self.day_high, highs, out=self.day_high)
+        np.fmin(self.day_low, lows, out=self.day_low)
+
+    def session_ohlc(self, index_code: str) -> Optional[Dict[str, float]]:
+        """
+        单个指数的当日开盘/最高/最低/最新
+
+        Returns:
+            没有成分股或尚未运行tick时为 None
+        """
+        k = self.matrix.index_ids.get(index_code) if self.matrix else None
+        if k is None or self.session_date is None or np.isnan(self.day_open[k]):
+            return None
+        return {
+            'date': self.session_date.isoformat(),
+            'open': float(self.day_open[k]),
+            'high': float(self.day_high[k]),
+            'low': float(self.day_low[k]),
+            'close': float(self.values()[k]),
+        }
+
+    def values(self) -> np.ndarray:
+        """当前指数点位 (保留两位小数; 没有成分股的指数为 nan)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(self.matrix.counts > 0, self.weighted_sums / self.divisors, np.nan)
+        return np.round(values, 2)
+
+    def metrics(self) -> dict:
+        """增量更新和完整重算计数"""
+        return {
+            "indices": self.num_indices,
+            "constituents": len(self.member_weights),
+            "last_changed_stocks": self.last_changed,
+            "full_recomputes": self.full_recomputes,
+            "ticks_since_recompute": self.ticks_since_recompute,
+            "max_drift": self.max_drift,
+        }
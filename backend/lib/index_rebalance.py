@@ -0,0 +1,409 @@
+"""
+指数成分股定期调整 (Index Rebalance)
+
+按实时市值 (价格 × 流通股本) 重新选择全部指数的成分股:
+- HAPPY300 / HAPPY50: 全市场市值前K
+- GROW100: 成长板块 (GROWTH_SECTORS) 中 Beta >= 1 的股票市值前K
+- 板块指数 {板块代码}_IDX: 本板块市值前K (K 取 indices.constituent_count, 至少 MIN_SECTOR_INDEX_SIZE)
+
+前K用 heapq.nlargest 选择 (O(N log K), 不对全市场排序); 权重按市值加权并限制单只上限。
+
+成分股按版本保存在 index_constituent_snapshots, 每个版本在 [effective_from, effective_to)
+(Unix 时间戳, effective_to 为 NULL 表示当前版本) 内生效, 历史K线按时间点选择版本
+(见 lib.constituent_history)。index_constituents 仍保存当前版本, 实时计算读取它。
+
+一次调整在一个事务内完成: 关闭当前版本、写入新版本、替换 index_constituents、
+更新除数 (按调整时的点位保持连续, 见 lib.index_divisor), 全部使用 executemany。
+"""
+
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.index_divisor import (
+    compute_index_shares, continuity_divisor, ensure_divisor_columns, rebalance_indices,
+)
+
+# 表约束 (index_constituents.weight)
+WEIGHT_RANGE = (0.0001, 0.1)
+
+# 指数成分股规则
+CORE_INDEX_SIZES = {'HAPPY300': 100, 'HAPPY50': 50}
+GROW_INDEX_CODE = 'GROW100'
+GROW_INDEX_SIZE = 50
+GROWTH_SECTORS = ['TECH', 'NEV', 'HEALTH', 'CONS']
+MIN_SECTOR_INDEX_SIZE = 10
+SECTOR_INDEX_SUFFIX = '_IDX'
+
+
+def cap_weights(market_caps: np.ndarray, cap: float = WEIGHT_RANGE[1]) -> np.ndarray:
+    """
+    市值加权并限制单只权重上限 (超出部分按比例分给其余股票)
+
+    成分股少于 1/cap 只时无法同时满足上限和总和为1, 此时权重被截断在上限。
+
+    Returns:
+        权重数组, 截断在 WEIGHT_RANGE 内
+    """
+    weights = np.asarray(market_caps, dtype=np.float64)
+    weights = weights / weights.sum()
+    if len(weights) * cap >= 1.0:
+        for _ in range(len(weights)):
+            capped = weights >= cap
+            excess = float((weights[capped] - cap).sum())
+            if excess <= 1e-12:
+                break
+            weights[capped] = cap
+            free = ~capped
+            weights[free] += excess * weights[free] / weights[free].sum()
+    return np.clip(weights, *WEIGHT_RANGE)
+
+
+def select_top_k(candidates: Iterable[int], market_caps: np.ndarray, k: int) -> List[int]:
+    """
+    按市值选择前K只 (堆选择)
+
+    Args:
+        candidates: 候选股票下标
+        market_caps: (N,) 市值
+        k: 数量
+
+    Returns:
+        股票下标列表 (按市值降序)
+    """
+    return heapq.nlargest(k, candidates, key=market_caps.__getitem__)
+
+
+def select_constituents(
+    index_sizes: Dict[str, int],
+    sector_codes: List[str],
+    betas: np.ndarray,
+    market_caps: np.ndarray,
+) -> Dict[str, List[int]]:
+    """
+    按规则选择全部指数的成分股
+
+    Args:
+        index_sizes: {index_code: indices.constituent_count}
+        sector_codes: (N,) 股票所属板块
+        betas: (N,) Beta
+        market_caps: (N,) 实时市值 (不为正的股票不入选)
+
+    Returns:
+        {index_code: 成分股下标列表 (按市值降序)}; 不适用规则的指数不出现
+    """
+    sector_array = np.array(sector_codes, dtype=object)
+    eligible = market_caps > 0
+
+    members: Dict[str, List[int]] = {}
+    for code, size in index_sizes.items():
+        if code in CORE_INDEX_SIZES:
+            candidates = np.flatnonzero(eligible)
+            k = CORE_INDEX_SIZES[code]
+        elif code == GROW_INDEX_CODE:
+            candidates = np.flatnonzero(
+                eligible & np.isin(sector_array, GROWTH_SECTORS) & (betas >= 1.0)
+            )
+            k = GROW_INDEX_SIZE
+        elif code.endswith(SECTOR_INDEX_SUFFIX):
+            sector = code[:-len(SECTOR_INDEX_SUFFIX)]
+            candidates = np.flatnonzero(eligible & (sector_array == sector))
+            k = max(size or 0, MIN_SECTOR_INDEX_SIZE)
+        else:
+            continue
+        members[code] = select_top_k(candidates.tolist(), market_caps, k)
+    return members
+
+
+def create_snapshot_table(cursor):
+    """创建成分股版本表 (旧数据库没有该表)"""
+    ensure_divisor_columns(cursor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS index_constituent_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            index_code TEXT NOT NULL,
+            stock_symbol TEXT NOT NULL,
+            weight REAL NOT NULL,
+            index_shares REAL,
+            divisor REAL,
+            rank INTEGER,
+            effective_from INTEGER NOT NULL,
+            effective_to INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(index_code, stock_symbol, effective_from)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_effective
+        ON index_constituent_snapshots(index_code, effective_from)
+    """)
+
+
+def _seed_versions(cursor) -> int:
+    """
+    为已编制 (有除数且成分股份额完整) 但还没有版本的指数写入当前成分股
+    (effective_from = 0, 覆盖全部历史); 缺少份额的指数不写入, 由编制时写入版本
+
+    Returns:
+        写入版本的指数数量
+    """
+    cursor.execute("""
+        SELECT DISTINCT ic.index_code FROM index_constituents ic
+        JOIN indices i ON ic.index_code = i.code
+        WHERE ic.is_active = 1
+          AND i.divisor IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM index_constituents m
+              WHERE m.index_code = ic.index_code AND m.is_active = 1 AND m.index_shares IS NULL
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM index_constituent_snapshots s WHERE s.index_code = ic.index_code
+          )
+    """)
+    missing = [row[0] for row in cursor.fetchall()]
+    if missing:
+        cursor.execute(
+            f"""
+                INSERT INTO index_constituent_snapshots
+                (index_code, stock_symbol, weight, index_shares, divisor, rank, effective_from)
+                SELECT ic.index_code, ic.stock_symbol, ic.weight, ic.index_shares, i.divisor, ic.rank, 0
+                FROM index_constituents ic
+                JOIN indices i ON ic.index_code = i.code
+                WHERE ic.is_active = 1 AND ic.index_code IN ({','.join('?' for _ in missing)})
+            """,
+            missing,
+        )
+    return len(missing)
+
+
+def ensure_snapshot_table(cursor) -> int:
+    """
+    创建成分股版本表, 先为缺少除数/份额的指数编制 (编制时写入版本),
+    再为其余还没有版本的指数写入当前成分股
+
+    Returns:
+        编制或写入版本的指数数量
+    """
+    create_snapshot_table(cursor)
+    compiled = rebalance_indices(cursor, only_missing=True)
+    return compiled + _seed_versions(cursor)
+
+
+def apply_rebalance(
+    cursor,
+    members: Dict[str, List[int]],
+    symbols: List[str],
+    prices: np.ndarray,
+    market_caps: Optional[np.ndarray],
+    values: Optional[Dict[str, float]] = None,
+    effective_from: Optional[int] = None,
+    weights: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, int]:
+    """
+    写入一次成分股调整 (在调用方的事务内执行)
+
+    Args:
+        cursor: 数据库游标
+        members: select_constituents 的结果
+        symbols / prices / market_caps: (N,) 股票代码、调整时价格、市值
+        values: 调整时的指数点位 (新除数使点位保持连续; 缺少时取 indices.current_value)
+        effective_from: 新版本生效时间 (Unix 秒, 默认当前时间)
+        weights: 指定成分权重 {index_code: (K,) 与 members 对齐} (缺少时按市值加权)
+
+    Returns:
+        {index_code: 成分股数量}
+    """
+    effective_from = int(effective_from if effective_from is not None else time.time())
+    codes = [code for code, idx in members.items() if idx]
+    if not codes:
+        return {}
+    placeholders = ','.join('?' for _ in codes)
+    # 没有版本的指数先保存调整前的成分股 (历史K线继续使用)
+    create_snapshot_table(cursor)
+    _seed_versions(cursor)
+
+    cursor.execute(f"SELECT code, current_value, base_point FROM indices WHERE code IN ({placeholders})", codes)
+    stored = {row[0]: row[1] or row[2] for row in cursor.fetchall()}
+    values = values or {}
+
+    # 留任的成分股保留纳入日期
+    cursor.execute(
+        f"SELECT index_code, stock_symbol, join_date FROM index_constituents WHERE index_code IN ({placeholders})",
+        codes,
+    )
+    join_dates = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+    today = time.strftime('%Y-%m-%d', time.localtime(effective_from))
+
+    constituent_rows = []
+    snapshot_rows = []
+    index_rows = []
+    counts: Dict[str, int] = {}
+    for code in codes:
+        idx = np.asarray(members[code], dtype=np.int64)
+        if weights is not None and code in weights:
+            code_weights = np.asarray(weights[code], dtype=np.float64)
+        else:
+            code_weights = np.round(cap_weights(market_caps[idx]), 6)
+        shares = compute_index_shares(code_weights, prices[idx])
+        value = values.get(code)
+        if value is None or not value > 0:
+            value = stored.get(code)
+        divisor = continuity_divisor(shares, prices[idx], value or 0.0)
+        if divisor is None:
+            continue
+
+        for rank, (i, w, q) in enumerate(zip(idx.tolist(), code_weights.tolist(), shares.tolist()), 1):
+            symbol = symbols[i]
+            constituent_rows.append((code, symbol, w, q, rank, join_dates.get((code, symbol), today)))
+            snapshot_rows.append((code, symbol, w, q, divisor, rank, effective_from))
+        index_rows.append((divisor, len(idx), round(value, 2), code))
+        counts[code] = len(idx)
+
+    codes = list(counts)
+    if not codes:
+        return {}
+    placeholders = ','.join('?' for _ in codes)
+
+    # 关闭在生效时间仍有效的版本 (同一时间点重复调整时替换该版本)
+    cursor.execute(
+        f"""
+            DELETE FROM index_constituent_snapshots
+            WHERE index_code IN ({placeholders}) AND effective_from >= ?
+        """,
+        (*codes, effective_from),
+    )
+    cursor.execute(
+        f"""
+            UPDATE index_constituent_snapshots SET effective_to = ?
+            WHERE index_code IN ({placeholders})
+              AND (effective_to IS NULL OR effective_to > ?)
+        """,
+        (effective_from, *codes, effective_from),
+    )
+    cursor.executemany(
+        """
+            INSERT INTO index_constituent_snapshots
+            (index_code, stock_symbol, weight, index_shares, divisor, rank, effective_from)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        snapshot_rows,
+    )
+
+    # 当前版本
+    cursor.execute(f"DELETE FROM index_constituents WHERE index_code IN ({placeholders})", codes)
+    cursor.executemany(
+        """
+            INSERT INTO index_constituents
+            (index_code, stock_symbol, weight, index_shares, rank, join_date, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+        """,
+        constituent_rows,
+    )
+    cursor.executemany(
+        """
+            UPDATE indices
+            SET divisor = ?, constituent_count = ?, current_value = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE code = ?
+        """,
+        index_rows,
+    )
+
+    if 'HAPPY300' in counts:
+        cursor.execute(
+            "UPDATE stock_metadata SET is_happy300 = 0, weight_in_happy300 = NULL WHERE is_happy300 = 1"
+        )
+        cursor.executemany(
+            "UPDATE stock_metadata SET is_happy300 = 1, weight_in_happy300 = ? WHERE symbol = ?",
+            [(row[2], row[1]) for row in constituent_rows if row[0] == 'HAPPY300'],
+        )
+    return counts
+
+
+def _index_sizes(cursor) -> Dict[str, int]:
+    cursor.execute("SELECT code, constituent_count FROM indices")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def rebalance_from_arena(db_manager, arena, effective_from: Optional[int] = None) -> Dict[str, int]:
+    """
+    按内存市场状态的实时市值调整全部指数 (模拟引擎定期调用)
+
+    市值取 arena.market_caps (每个tick按价格 × 流通股本更新), 点位取 arena.index_values,
+    调整前后连续。
+
+    Args:
+        db_manager: 数据库管理器
+        arena: 内存市场状态
+        effective_from: 新版本生效时间 (默认当前时间)
+
+    Returns:
+        {index_code: 成分股数量}
+    """
+    market_caps = arena.market_caps
+    conn = db_manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        members = select_constituents(
+            _index_sizes(cursor), arena.stock_sector_codes, arena.betas, market_caps
+        )
+        values = {
+            code: float(value)
+            for code, value in zip(arena.index_codes, arena.index_values.tolist())
+            if value > 0
+        }
+        counts = apply_rebalance(
+            cursor, members, arena.symbols, arena.prices, market_caps, values, effective_from
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return counts
+
+
+def rebalance_from_db(db_manager, effective_from: Optional[int] = None) -> Dict[str, int]:
+    """
+    按 stocks 表的当前价格调整全部指数 (脚本使用; 点位取 indices.current_value)
+
+    没有流通股本的股票按 stock_metadata.market_cap 计算市值。
+
+    Returns:
+        {index_code: 成分股数量}
+    """
+    conn = db_manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.symbol, s.sector_code, s.current_price,
+                   sm.beta, sm.outstanding_shares, sm.market_cap
+            FROM stocks s
+            LEFT JOIN stock_metadata sm ON s.symbol = sm.symbol
+            WHERE s.is_active = 1
+            ORDER BY s.symbol
+        """)
+        rows = cursor.fetchall()
+        symbols = [row[0] for row in rows]
+        prices = np.array([row[2] or 0.0 for row in rows], dtype=np.float64)
+        betas = np.array([row[3] if row[3] is not None else 1.0 for row in rows], dtype=np.float64)
+        market_caps = np.array(
+            [p * row[4] if row[4] else (row[5] or 0.0) for p, row in zip(prices.tolist(), rows)],
+            dtype=np.float64,
+        )
+
+        members = select_constituents(
+            _index_sizes(cursor), [row[1] for row in rows], betas, market_caps
+        )
+        counts = apply_rebalance(cursor, members, symbols, prices, market_caps, None, effective_from)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return counts
@@ -0,0 +1,344 @@
+"""
+指数权重矩阵 (Index Weight Matrix)
+
+全部指数 (核心指数 HAPPY300/HAPPY50/GROW100 与板块指数共享成分股) 的权重
+保存为一个 CSR 格式的稀疏矩阵 W (指数 × 股票), 只用 numpy 实现:
+- indptr:    (K+1,) 第 k 个指数的成分记录为 [indptr[k], indptr[k+1])
+- stock_ids: (nnz,) 成分股在股票数组中的下标
+- weights:   (nnz,) 成分系数 (指数份额, 见 lib.index_divisor; 未编制时为权重)
+- divisors:  (K,) 除数
+
+指数点位 = (W @ p) / 除数。未编制除数的指数沿用旧的归一化算法
+Σw·p / Σw × SCALE, 即除数取 Σw / SCALE, 两种指数可以放在同一个矩阵里。
+
+一次稀疏矩阵-向量乘 W @ p 得到全部指数的加权价格和, 按 open/high/low/close
+各乘一次即得到全部指数的 OHLC; 历史重建时对 T×N 价格矩阵做一次 P @ Wᵀ。
+"""
+
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+
+class IndexWeightMatrix:
+    """CSR 格式的指数 × 股票权重矩阵"""
+
+    # 未编制除数时的点位比例因子 (旧算法: 加权平均价 × 10)
+    SCALE = 10.0
+
+    def __init__(
+        self,
+        index_codes: List[str],
+        symbols: List[str],
+        indptr: np.ndarray,
+        stock_ids: np.ndarray,
+        weights: np.ndarray,
+        divisors: Optional[np.ndarray] = None,
+    ):
+        """
+        Args:
+            index_codes: 行对应的指数代码
+            symbols: 列对应的股票代码
+            indptr / stock_ids / weights: CSR 数组
+            divisors: (K,) 除数 (nan 或 None 表示按权重和归一化)
+        """
+        self.index_codes = list(index_codes)
+        self.symbols = list(symbols)
+        self.index_ids = {code: k for k, code in enumerate(self.index_codes)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.stock_ids = np.asarray(stock_ids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+        self.counts = np.diff(self.indptr)
+        self.row_ids = np.repeat(np.arange(len(self.index_codes), dtype=np.int64), self.counts)
+        self._nonempty = np.flatnonzero(self.counts > 0)
+        self.total_weights = self.matvec(np.ones(len(self.symbols)))
+
+        legacy = self.total_weights / self.SCALE
+        if divisors is None:
+            divisors = legacy
+        divisors = np.asarray(divisors, dtype=np.float64)
+        self.divisors = np.where(np.isnan(divisors) | (divisors <= 0), legacy, divisors)
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_coo(
+        cls,
+        index_codes: List[str],
+        symbols: List[str],
+        index_ids: np.ndarray,
+        stock_ids: np.ndarray,
+        weights: np.ndarray,
+        divisors: Optional[np.ndarray] = None,
+    ) -> "IndexWeightMatrix":
+        """
+        由 (指数下标, 股票下标, 系数) 三元组构建
+
+        Args:
+            index_codes: 行对应的指数代码
+            symbols: 列对应的股票代码
+            index_ids / stock_ids / weights: 等长数组
+            divisors: (K,) 除数
+        """
+        index_ids = np.asarray(index_ids, dtype=np.int64)
+        stock_ids = np.asarray(stock_ids, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        order = np.lexsort((stock_ids, index_ids))
+        counts = np.bincount(index_ids, minlength=len(index_codes))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        return cls(index_codes, symbols, indptr, stock_ids[order], weights[order], divisors)
+
+    @classmethod
+    def from_arena(cls, arena) -> "IndexWeightMatrix":
+        """由内存市场状态中的成分股构建 (列顺序与 arena.symbols 一致)"""
+        return cls.from_coo(
+            arena.index_codes,
+            arena.symbols,
+            arena.member_index_ids,
+            arena.member_stock_ids,
+            *index_coefficients(
+                arena.member_index_ids, arena.member_weights,
+                arena.member_shares, arena.index_divisors,
+            ),
+        )
+
+    @classmethod
+    def from_constituents(
+        cls,
+        rows: Iterable[Dict],
+        index_codes: Optional[List[str]] = None,
+        symbols: Optional[List[str]] = None,
+        divisors: Optional[Dict[str, float]] = None,
+    ) -> "IndexWeightMatrix":
+        """
+        由 index_constituents 查询结果构建
+
+        Args:
+            rows: 含 index_code / stock_symbol / weight (以及可选的 index_shares) 的字典
+            index_codes: 行顺序 (None 时按代码排序; 不在其中的记录被忽略)
+            symbols: 列顺序 (None 时按代码排序; 不在其中的记录被忽略)
+            divisors: 指数代码到除数的映射 (缺少时按权重和归一化)
+        """
+        rows = list(rows)
+        if index_codes is None:
+            index_codes = sorted({row['index_code'] for row in rows})
+        if symbols is None:
+            symbols = sorted({row['stock_symbol'] for row in rows})
+        index_ids = {code: k for k, code in enumerate(index_codes)}
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+
+        members = [
+            (index_ids[row['index_code']], symbol_ids[row['stock_symbol']],
+             row['weight'], row.get('index_shares'))
+            for row in rows
+            if row['index_code'] in index_ids and row['stock_symbol'] in symbol_ids
+        ]
+        member_index_ids = np.array([m[0] for m in members], dtype=np.int64)
+        divisors = divisors or {}
+        return cls.from_coo(
+            index_codes,
+            symbols,
+            member_index_ids,
+            np.array([m[1] for m in members], dtype=np.int64),
+            *index_coefficients(
+                member_index_ids,
+                np.array([m[2] for m in members], dtype=np.float64),
+                np.array([np.nan if m[3] is None else m[3] for m in members], dtype=np.float64),
+                np.array([divisors.get(code) or np.nan for code in index_codes], dtype=np.float64),
+            ),
+        )
+
+    @classmethod
+    def from_db(cls, db_manager, index_codes: Optional[List[str]] = None) -> "IndexWeightMatrix":
+        """
+        从 index_constituents 表构建 (只含生效的成分股)
+
+        Args:
+            db_manager: 数据库管理器
+            index_codes: 只包含这些指数 (None 表示全部)
+        """
+        query = """
+            SELECT index_code, stock_symbol, weight, index_shares
+            FROM index_constituents
+            WHERE is_active = 1
+        """
+        params: tuple = ()
+        if index_codes:
+            query += f" AND index_code IN ({','.join('?' for _ in index_codes)})"
+            params = tuple(index_codes)
+        rows = db_manager.execute_query(query, params)
+        divisors = {
+            row['code']: row['divisor']
+            for row in db_manager.execute_query("SELECT code, divisor FROM indices")
+        }
+        return cls.from_constituents(
+            rows, index_codes=list(index_codes) if index_codes else None, divisors=divisors
+        )
+
+    # ------------------------------------------------------------------
+    # 属性
+    # ------------------------------------------------------------------
+
+    @property
+    def shape(self):
+        return len(self.index_codes), len(self.symbols)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.weights)
+
+    def row(self, index_code: str):
+        """
+        单个指数的成分
+
+        Returns:
+            (股票下标数组, 权重数组)
+        """
+        k = self.index_ids[index_code]
+        start, end = self.indptr[k], self.indptr[k + 1]
+        return self.stock_ids[start:end], self.weights[start:end]
+
+    # ------------------------------------------------------------------
+    # 运算
+    # ------------------------------------------------------------------
+
+    def matvec(self, prices: np.ndarray) -> np.ndarray:
+        """
+        W @ p
+
+        Args:
+            prices: (N,) 与 symbols 对齐的价格
+
+        Returns:
+            (K,) 各指数的加权价格和
+        """
+        return np.bincount(
+            self.row_ids,
+            weights=self.weights * prices[self.stock_ids],
+            minlength=len(self.index_codes),
+        )
+
+    def matmat(self, prices: np.ndarray) -> np.ndarray:
+        """
+        P @ Wᵀ
+
+        Args:
+            prices: (T, N) 价格矩阵 (每行一个时间点)
+
+        Returns:
+            (T, K) 各时间点各指数的加权价格和
+        """
+        contrib = prices[:, self.stock_ids] * self.weights
+        out = np.zeros((prices.shape[0], len(self.index_codes)))
+        if len(self._nonempty):
+            out[:, self._nonempty] = np.add.reduceat(contrib, self.indptr[self._nonempty], axis=1)
+        return out
+
+    def index_values(self, prices: np.ndarray) -> np.ndarray:
+        """
+        全部指数点位
+
+        Args:
+            prices: (N,) 价格
+
+        Returns:
+            (K,) 点位 (没有成分股的指数为 nan)
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(self.counts > 0, self.matvec(prices) / self.divisors, np.nan)
+        return np.round(values, 2)
+
+    def ohlc(self, fields: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        按价格字段逐个做一次矩阵-向量乘
+
+        Args:
+            fields: {'open': (N,), 'high': (N,), 'low': (N,), 'close': (N,)}
+
+        Returns:
+            同名字段的 (K,) 指数点位
+        """
+        return {name: self.index_values(prices) for name, prices in fields.items()}
+
+    def historical_values(self, prices: np.ndarray):
+        """
+        历史价格矩阵的指数点位 (允许缺失数据)
+
+        缺失的价格 (nan) 沿用该股票上一个时间点的价格 (开头缺失时用其后第一个价格),
+        指数点位因此不会因为个别成分股缺少数据而跳变。
+
+        Args:
+            prices: (T, N) 价格矩阵, 缺失为 nan
+
+        Returns:
+            (values, coverage): (T, K) 点位 (没有成分股或成分股全无数据为 nan) 和
+            (T, K) 有数据的成分股占成分股总数的比例
+        """
+        present = ~np.isnan(prices)
+        return self.filled_values(_fill_missing(prices, present), present)
+
+    def filled_values(self, filled: np.ndarray, present: np.ndarray):
+        """
+        已填充缺失价格的历史点位 (多个权重矩阵分段计算同一价格矩阵时, 只填充一次)
+
+        Args:
+            filled: (T, N) 按 _fill_missing 填充后的价格
+            present: (T, N) 原始价格是否存在
+
+        Returns:
+            同 historical_values
+        """
+        present_counts = np.zeros((filled.shape[0], len(self.index_codes)))
+        if len(self._nonempty):
+            present_counts[:, self._nonempty] = np.add.reduceat(
+                present[:, self.stock_ids].astype(np.float64), self.indptr[self._nonempty], axis=1
+            )
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(
+                (self.counts > 0) & (present_counts > 0),
+                self.matmat(np.nan_to_num(filled)) / self.divisors,
+                np.nan,
+            )
+            coverage = np.where(self.counts > 0, present_counts / self.counts, 0.0)
+        return np.round(values, 2), coverage
+
+
+def _fill_missing(prices: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """按列前向填充缺失价格, 开头的缺失再后向填充"""
+    if present.all() or prices.shape[0] == 0:
+        return prices
+    rows = np.arange(prices.shape[0])[:, None]
+    last = np.maximum.accumulate(np.where(present, rows, 0), axis=0)
+    filled = prices[last, np.arange(prices.shape[1])]
+
+    first = np.argmax(present, axis=0)
+    leading = np.isnan(filled)
+    return np.where(leading, prices[first, np.arange(prices.shape[1])][None, :], filled)
+
+
+def index_coefficients(member_index_ids, weights, shares, divisors):
+    """
+    选择每个指数的矩阵系数和除数
+
+    已编制的指数 (有除数且全部成分股都有份额) 使用份额和除数,
+    其余指数使用权重, 除数取 nan (构建矩阵时按权重和归一化)。
+
+    Args:
+        member_index_ids: (nnz,) 成分记录所属指数下标
+        weights / shares: (nnz,) 权重和指数份额 (缺失为 nan)
+        divisors: (K,) 除数 (缺失为 nan)
+
+    Returns:
+        (系数数组, 除数数组)
+    """
+    divisors = np.asarray(divisors, dtype=np.float64)
+    missing = np.bincount(
+        member_index_ids, weights=np.isnan(shares).astype(np.float64), minlength=len(divisors)
+    )
+    use_divisor = ~np.isnan(divisors) & (divisors > 0) & (missing == 0)
+    coefficients = np.where(use_divisor[member_index_ids], shares, weights)
+    return coefficients, np.where(use_divisor, divisors, np.nan)
@@ -0,0 +1,606 @@
+"""
+市场内存状态 (Market Arena)
+
+以 struct-of-arrays 的形式常驻内存保存全市场状态:
+- 股票: 价格、昨收、涨跌、当日累计成交量/成交额、Beta、波动率、板块下标、市值档位、流通股本、
+  实时市值 (价格 × 流通股本, 每个tick更新, 板块总市值和市值排序随之增量维护)
+- 指数: 当前值、成分股关系 (COO 三元组: 指数下标, 股票下标, 权重)
+
+所有数组按整数 symbol id 对齐 (symbol_ids[symbol] -> 行号)。
+生命周期启动时从 SQLite 加载一次, 之后价格生成、指数计算、推送和
+读接口都直接读取内存; 数据库只通过 flush() 做 write-behind 持久化。
+"""
+
+import zlib
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.db_manager_sqlite import DatabaseManager, get_db_manager
+from lib.index_divisor import ensure_divisor_columns
+
+
+class MarketArena:
+    """全市场内存状态"""
+
+    # 缺省参数 (与 PriceGeneratorV2 保持一致)
+    DEFAULT_BETA = 1.0
+    DEFAULT_VOLATILITY = 0.80
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        """
+        初始化 (不加载数据, 需显式调用 load())
+
+        Args:
+            db_manager: 数据库管理器 (默认使用全局实例)
+        """
+        self.db_manager = db_manager or get_db_manager()
+        self.loaded = False
+        self.version = 0  # 每次 apply_tick 自增
+        self.universe_key = 0  # 股票/指数代码集合的校验值 (进程间同步时核对数组对齐)
+        self._flushed_version = 0
+
+        # 板块 (按 code 排序, 末尾保留一个未知板块槽位)
+        self.sector_codes: List[str] = []
+        self.sector_ids: Dict[str, int] = {}
+
+        # 股票
+        self.symbols: List[str] = []
+        self.symbol_ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.stock_sector_codes: List[str] = []
+        self.prices = np.zeros(0)
+        self.previous_closes = np.zeros(0)
+        self.change_values = np.zeros(0)
+        self.change_pcts = np.zeros(0)
+        self.volumes = np.zeros(0, dtype=np.int64)
+        self.turnovers = np.zeros(0)
+        self.betas = np.zeros(0)
+        self.volatilities = np.zeros(0)
+        self.stock_sector_ids = np.zeros(0, dtype=np.int64)
+        self.market_cap_tiers: List[Optional[str]] = []
+        self.outstanding_shares = np.zeros(0)
+        self.market_caps = np.zeros(0)
+
+        # 板块总市值 (按 stock_sector_ids 槽位, 随价格增量更新)
+        self.sector_market_caps = np.zeros(0)
+
+        # 按市值降序的股票下标 (读取时在上次结果上重排, 见 cap_ranking)
+        self._cap_order = np.zeros(0, dtype=np.int64)
+        self._cap_order_version = -1
+
+        # volumes/turnovers 累计所属的交易日
+        self.session_date: Optional[date] = None
+
+        # 指数
+        self.index_codes: List[str] = []
+        self.index_ids: Dict[str, int] = {}
+        self.index_values = np.zeros(0)
+        self.index_change_pcts = np.zeros(0)
+        self.index_divisors = np.zeros(0)
+
+        # 指数成分 (COO)
+        self.member_index_ids = np.zeros(0, dtype=np.int64)
+        self.member_stock_ids = np.zeros(0, dtype=np.int64)
+        self.member_weights = np.zeros(0)
+        self.member_shares = np.zeros(0)
+
+    @property
+    def size(self) -> int:
+        """股票数量"""
+        return len(self.symbols)
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未落库的修改"""
+        return self.version != self._flushed_version
+
+    def load(self):
+        """从数据库加载全市场状态 (启动时调用一次)"""
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            if ensure_divisor_columns(cursor):
+                conn.commit()
+
+            # 1. 板块
+            cursor.execute("SELECT code FROM sectors ORDER BY code")
+            self.sector_codes = [row[0] for row in cursor.fetchall()]
+            self.sector_ids = {code: i for i, code in enumerate(self.sector_codes)}
+            unknown_sector = len(self.sector_codes)
+
+            # 2. 股票 + 元数据
+            cursor.execute("""
+                SELECT s.symbol, s.name, s.sector_code,
+                       s.current_price, s.previous_close,
+                       s.change_value, s.change_pct, s.volume, s.turnover,
+                       sm.beta, sm.volatility,
+                       sm.market_cap_tier, sm.outstanding_shares, sm.market_cap
+                FROM stocks s
+                LEFT JOIN stock_metadata sm ON s.symbol = sm.symbol
+                WHERE s.is_active = 1
+                ORDER BY s.symbol
+            """)
+            rows = cursor.fetchall()
+
+            self.symbols = [row[0] for row in rows]
+            self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+            self.names = [row[1] for row in rows]
+            self.stock_sector_codes = [row[2] for row in rows]
+            self.prices = np.array([row[3] for row in rows], dtype=np.float64)
+            self.previous_closes = np.array([row[4] for row in rows], dtype=np.float64)
+            self.change_values = np.array([row[5] or 0.0 for row in rows], dtype=np.float64)
+            self.change_pcts = np.array([row[6] or 0.0 for row in rows], dtype=np.float64)
+            self.volumes = np.array([row[7] or 0 for row in rows], dtype=np.int64)
+            self.turnovers = np.array([row[8] or 0.0 for row in rows], dtype=np.float64)
+            self.betas = np.array(
+                [row[9] if row[9] is not None else self.DEFAULT_BETA for row in rows],
+                dtype=np.float64,
+            )
+            self.volatilities = np.array(
+                [row[10] if row[10] is not None else self.DEFAULT_VOLATILITY for row in rows],
+                dtype=np.float64,
+            )
+            self.stock_sector_ids = np.array(
+                [self.sector_ids.get(row[2], unknown_sector) for row in rows],
+                dtype=np.int64,
+            )
+            self.market_cap_tiers = [row[11] for row in rows]
+            self.outstanding_shares = np.array([row[12] or 0 for row in rows], dtype=np.float64)
+            # 缺少流通股本时按静态市值 / 当前价格折算, 之后市值同样随价格变化
+            static_caps = np.array([row[13] or 0 for row in rows], dtype=np.float64)
+            implied = (self.outstanding_shares <= 0) & (static_caps > 0) & (self.prices > 0)
+            self.outstanding_shares[implied] = static_caps[implied] / self.prices[implied]
+            self.market_caps = self.prices * self.outstanding_shares
+            self.sector_market_caps = np.bincount(
+                self.stock_sector_ids, weights=self.market_caps, minlength=unknown_sector + 1
+            )
+            self._cap_order = np.zeros(0, dtype=np.int64)
+            self._cap_order_version = -1
+            # 数据库中的成交量视为当日累计
+            self.session_date = date.today()
+
+            # 3. 指数
+            cursor.execute("SELECT code, current_value, change_pct FROM indices ORDER BY code")
+            index_rows = cursor.fetchall()
+            self.index_codes = [row[0] for row in index_rows]
+            self.index_ids = {code: i for i, code in enumerate(self.index_codes)}
+            self.index_values = np.array([row[1] or 0.0 for row in index_rows], dtype=np.float64)
+            self.index_change_pcts = np.array([row[2] or 0.0 for row in index_rows], dtype=np.float64)
+
+            # 4. 指数成分和除数
+            members = self._load_index_members(cursor)
+
+            self.universe_key = universe_key(self.symbols, self.index_codes)
+            self.loaded = True
+            self.version = 0
+            self._flushed_version = 0
+
+            print(
+                f"[+] MarketArena loaded: {self.size} stocks, "
+                f"{len(self.index_codes)} indices, {members} constituents"
+            )
+        finally:
+            conn.close()
+
+    def _load_index_members(self, cursor) -> int:
+        """加载指数除数和成分股 (只保留活跃股票), 返回成分记录数"""
+        cursor.execute("SELECT code, divisor FROM indices")
+        divisors = {row[0]: row[1] for row in cursor.fetchall()}
+        self.index_divisors = np.array(
+            [divisors[code] if divisors.get(code) is not None else np.nan for code in self.index_codes],
+            dtype=np.float64,
+        )
+
+        cursor.execute("""
+            SELECT index_code, stock_symbol, weight, index_shares
+            FROM index_constituents
+            WHERE is_active = 1
+        """)
+        members = [
+            (self.index_ids[row[0]], self.symbol_ids[row[1]], row[2],
+             row[3] if row[3] is not None else np.nan)
+            for row in cursor.fetchall()
+            if row[0] in self.index_ids and row[1] in self.symbol_ids
+        ]
+        self.member_index_ids = np.array([m[0] for m in members], dtype=np.int64)
+        self.member_stock_ids = np.array([m[1] for m in members], dtype=np.int64)
+        self.member_weights = np.array([m[2] for m in members], dtype=np.float64)
+        self.member_shares = np.array([m[3] for m in members], dtype=np.float64)
+        return len(members)
+
+    def reload_index_members(self) -> int:
+        """
+        只重新加载指数成分股和除数 (成分股调整后调用, 价格等内存状态保持不变)
+
+        Returns:
+            成分记录数
+        """
+        conn = self.db_manager.get_connection()
+        try:
+            return self._load_index_members(conn.cursor())
+        finally:
+            conn.close()
+
+    def ensure_loaded(self):
+        """未加载时加载"""
+        if not self.loaded:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def apply_tick(self, tick: Dict[str, np.ndarray]):
+        """
+        写入一次全市场价格生成结果 (PriceGeneratorV2.generate_market_tick 的返回值)
+
+        Args:
+            tick: 数组字典, 与 symbols 顺序对齐
+        """
+        self.prices = tick["close"]
+        self.previous_closes = tick["previous_close"]
+        self.change_values = tick["change_value"]
+        self.change_pcts = tick["change_pct"]
+        self._update_market_caps()
+        self.version += 1
+
+    def _update_market_caps(self):
+        """按最新价格更新实时市值, 只把市值变化的股票的差额累加到板块总市值"""
+        market_caps = self.prices * self.outstanding_shares
+        changed = np.flatnonzero(market_caps != self.market_caps)
+        if len(changed):
+            self.sector_market_caps += np.bincount(
+                self.stock_sector_ids[changed],
+                weights=market_caps[changed] - self.market_caps[changed],
+                minlength=len(self.sector_market_caps),
+            )
+        self.market_caps = market_caps
+
+    def add_volume(self, volumes: np.ndarray, turnovers: np.ndarray, session_date: date):
+        """
+        累加一个tick的成交量/成交额到当日累计 (跨日时先清零)
+
+        Args:
+            volumes: 成交量 (与 symbols 对齐)
+            turnovers: 成交额
+            session_date: tick 所属交易日
+        """
+        if session_date != self.session_date:
+            self.volumes = np.zeros(self.size, dtype=np.int64)
+            self.turnovers = np.zeros(self.size)
+            self.session_date = session_date
+        self.volumes = self.volumes + volumes
+        self.turnovers = self.turnovers + turnovers
+        self.version += 1
+
+    def set_index_values(self, values: np.ndarray, change_pcts: np.ndarray):
+        """
+        写入全部指数的最新值
+
+        Args:
+            values: 指数点位 (与 index_codes 对齐)
+            change_pcts: 涨跌幅(%)
+        """
+        self.index_values = values
+        self.index_change_pcts = change_pcts
+        self.version += 1
+
+    def apply_feed(self, feed: Dict) -> bool:
+        """
+        写入模拟器进程发布的全市场快照 (见 lib.market_feed, API 进程使用)
+
+        只覆盖内存数组, 不标记为待写回 (数据库由模拟器进程写入)。
+
+        Args:
+            feed: market_feed.arena_message 生成的消息
+
+        Returns:
+            universe_key 一致并已写入时为 True; 代码集合不一致时为 False (需要重新加载)
+        """
+        if not self.loaded or feed.get("universe_key") != self.universe_key:
+            return False
+
+        self.prices = np.asarray(feed["prices"], dtype=np.float64)
+        self.previous_closes = np.asarray(feed["previous_closes"], dtype=np.float64)
+        self.change_values = np.asarray(feed["change_values"], dtype=np.float64)
+        self.change_pcts = np.asarray(feed["change_pcts"], dtype=np.float64)
+        self.volumes = np.asarray(feed["volumes"], dtype=np.int64)
+        self.turnovers = np.asarray(feed["turnovers"], dtype=np.float64)
+        self.index_values = np.asarray(feed["index_values"], dtype=np.float64)
+        self.index_change_pcts = np.asarray(feed["index_change_pcts"], dtype=np.float64)
+        self._update_market_caps()
+        self.version += 1
+        self._flushed_version = self.version
+        return True
+
+    def snapshot(self) -> Optional[Dict]:
+        """
+        复制当前需要写回的字段 (供后台写入线程使用, 不访问数据库)
+
+        Returns:
+            {'version', 'symbols', 'prices', ..., 'index_codes', 'index_values', 'index_change_pcts'},
+            未加载或无修改时返回 None
+        """
+        if not self.loaded or not self.dirty:
+            return None
+
+        return {
+            "version": self.version,
+            "symbols": self.symbols,
+            "prices": self.prices.copy(),
+            "previous_closes": self.previous_closes.copy(),
+            "change_values": self.change_values.copy(),
+            "change_pcts": self.change_pcts.copy(),
+            "volumes": self.volumes.copy(),
+            "turnovers": self.turnovers.copy(),
+            "market_caps": self.market_caps.copy(),
+            "index_codes": self.index_codes,
+            "index_values": self.index_values.copy(),
+            "index_change_pcts": self.index_change_pcts.copy(),
+        }
+
+    def mark_flushed(self, version: int):
+        """记录已写回数据库的版本"""
+        self._flushed_version = max(self._flushed_version, version)
+
+    def flush(self) -> int:
+        """
+        把内存状态写回数据库 (同步写入, 关闭和脚本使用; 调度器经 PersistenceWriter 写入)
+
+        Returns:
+            写入的股票行数 (无修改时为0)
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return 0
+
+        conn = self.db_manager.get_connection()
+        try:
+            written = write_snapshot(conn.cursor(), snapshot)
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.mark_flushed(snapshot["version"])
+        return written
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def get_stock(self, symbol: str) -> Optional[Dict]:
+        """
+        获取单只股票的实时字段
+
+        Returns:
+            字典 (symbol/name/sector_code/current_price/...), 不存在返回None
+        """
+        i = self.symbol_ids.get(symbol)
+        if i is None:
+            return None
+        return {
+            "symbol": symbol,
+            "name": self.names[i],
+            "sector_code": self.stock_sector_codes[i],
+            "current_price": float(self.prices[i]),
+            "previous_close": float(self.previous_closes[i]),
+            "change_value": round(float(self.change_values[i]), 2),
+            "change_pct": float(self.change_pcts[i]),
+            "volume": int(self.volumes[i]),
+            "turnover": float(self.turnovers[i]),
+            "market_cap": int(round(self.market_caps[i])),
+        }
+
+    def overlay_rows(self, rows: List[Dict], key: str = "symbol") -> List[Dict]:
+        """
+        用内存中的实时字段覆盖数据库查询结果 (原地修改)
+
+        Args:
+            rows: execute_query 返回的字典列表
+            key: 股票代码字段名
+
+        Returns:
+            rows 本身
+        """
+        for row in rows:
+            live = self.get_stock(row.get(key))
+            if live:
+                for field in (
+                    "current_price", "previous_close", "change_value",
+                    "change_pct", "volume", "turnover",
+                ):
+                    row[field] = live[field]
+                # 市值只覆盖查询中已有的字段
+                if "market_cap" in row and live["market_cap"] > 0:
+                    row["market_cap"] = live["market_cap"]
+        return rows
+
+    def overlay_index_rows(self, rows: List[Dict], key: str = "code") -> List[Dict]:
+        """
+        用内存中的指数值覆盖数据库查询结果 (原地修改)
+
+        Args:
+            rows: execute_query 返回的字典列表
+            key: 指数代码字段名
+
+        Returns:
+            rows 本身
+        """
+        for row in rows:
+            i = self.index_ids.get(row.get(key))
+            if i is not None:
+                row["current_value"] = round(float(self.index_values[i]), 2)
+                row["change_pct"] = round(float(self.index_change_pcts[i]), 2)
+        return rows
+
+    def get_index_value(self, index_code: str) -> Optional[float]:
+        """获取指数当前值"""
+        i = self.index_ids.get(index_code)
+        if i is None:
+            return None
+        return float(self.index_values[i])
+
+    def index_members(self, index_code: str):
+        """
+        获取指数成分股
+
+        Returns:
+            (股票下标数组, 权重数组, 指数份额数组)
+        """
+        i = self.index_ids.get(index_code)
+        if i is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        mask = self.member_index_ids == i
+        return self.member_stock_ids[mask], self.member_weights[mask], self.member_shares[mask]
+
+    def get_index_divisor(self, index_code: str) -> Optional[float]:
+        """获取指数除数 (未编制时为 None)"""
+        i = self.index_ids.get(index_code)
+        if i is None or np.isnan(self.index_divisors[i]):
+            return None
+        return float(self.index_divisors[i])
+
+    def market_overview(self) -> Dict:
+        """全市场统计 (与 /market/overview 的SQL聚合字段一致)"""
+        pcts = self.change_pcts
+        return {
+            "total_stocks": self.size,
+            "rising": int(np.count_nonzero(pcts > 0)),
+            "falling": int(np.count_nonzero(pcts < 0)),
+            "unchanged": int(np.count_nonzero(pcts == 0)),
+            "limit_up": int(np.count_nonzero(pcts >= 9.9)),
+            "limit_down": int(np.count_nonzero(pcts <= -9.9)),
+            "total_volume": int(self.volumes.sum()),
+            "total_turnover": float(self.turnovers.sum()),
+        }
+
+    def sector_stats(self) -> Dict[str, Dict]:
+        """
+        按板块统计股票数量、平均涨跌幅和总市值
+
+        Returns:
+            {sector_code: {"stock_count": int, "avg_change_pct": float, "total_market_cap": int}}
+        """
+        slots = len(self.sector_codes) + 1
+        counts = np.bincount(self.stock_sector_ids, minlength=slots)
+        sums = np.bincount(self.stock_sector_ids, weights=self.change_pcts, minlength=slots)
+        stats = {}
+        for code, i in self.sector_ids.items():
+            count = int(counts[i])
+            stats[code] = {
+                "stock_count": count,
+                "avg_change_pct": float(sums[i] / count) if count else 0.0,
+                "total_market_cap": int(round(self.sector_market_caps[i])),
+            }
+        return stats
+
+    def cap_ranking(self) -> np.ndarray:
+        """
+        按实时市值降序的股票下标 (同一版本内缓存)
+
+        在上次的排序结果上做稳定排序: 两次读取之间排名只有少量变化,
+        输入近乎有序, 排序接近线性。
+
+        Returns:
+            (N,) 股票下标
+        """
+        if self._cap_order_version != self.version or len(self._cap_order) != self.size:
+            order = self._cap_order if len(self._cap_order) == self.size else np.arange(self.size)
+            self._cap_order = order[np.argsort(-self.market_caps[order], kind='stable')]
+            self._cap_order_version = self.version
+        return self._cap_order
+
+    def symbols_by_market_cap(
+        self, sector_code: Optional[str] = None, offset: int = 0, limit: Optional[int] = None
+    ):
+        """
+        按实时市值降序分页 (可按板块筛选)
+
+        Returns:
+            (本页股票代码列表, 符合条件的股票总数)
+        """
+        order = self.cap_ranking()
+        if sector_code is not None:
+            sector_id = self.sector_ids.get(sector_code)
+            if sector_id is None:
+                return [], 0
+            order = order[self.stock_sector_ids[order] == sector_id]
+        end = None if limit is None else offset + limit
+        return [self.symbols[i] for i in order[offset:end].tolist()], len(order)
+
+
+def universe_key(symbols: List[str], index_codes: List[str]) -> int:
+    """股票/指数代码集合 (含顺序) 的 CRC32 校验值"""
+    return zlib.crc32(("\n".join(symbols) + "|" + ",".join(index_codes)).encode("utf-8"))
+
+
+def write_snapshot(cursor, snapshot: Dict) -> int:
+    """
+    在调用方的事务内写入一份 MarketArena.snapshot()
+
+    Returns:
+        写入的股票行数
+    """
+    stock_updates = list(zip(
+        snapshot["prices"].tolist(),
+        snapshot["previous_closes"].tolist(),
+        np.round(snapshot["change_values"], 2).tolist(),
+        snapshot["change_pcts"].tolist(),
+        snapshot["volumes"].tolist(),
+        np.round(snapshot["turnovers"], 2).tolist(),
+        snapshot["symbols"],
+    ))
+    cap_updates = [
+        (cap, symbol)
+        for cap, symbol in zip(np.round(snapshot["market_caps"]).astype(np.int64).tolist(), snapshot["symbols"])
+        if cap > 0
+    ]
+    index_updates = list(zip(
+        np.round(snapshot["index_values"], 2).tolist(),
+        np.round(snapshot["index_change_pcts"], 2).tolist(),
+        snapshot["index_codes"],
+    ))
+
+    cursor.executemany("""
+        UPDATE stocks
+        SET current_price = ?,
+            previous_close = ?,
+            change_value = ?,
+            change_pct = ?,
+            volume = ?,
+            turnover = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE symbol = ?
+    """, stock_updates)
+    cursor.executemany("""
+        UPDATE stock_metadata
+        SET market_cap = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE symbol = ?
+    """, cap_updates)
+    cursor.executemany("""
+        UPDATE indices
+        SET current_value = ?,
+            change_pct = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE code = ?
+    """, index_updates)
+    return len(stock_updates)
+
+
+# 全局单例
+_arena: Optional[MarketArena] = None
+
+
+def get_market_arena() -> MarketArena:
+    """获取全局 MarketArena 实例 (未加载, 需调用 load())"""
+    global _arena
+
+    if _arena is None:
+        _arena = MarketArena()
+
+    return _arena
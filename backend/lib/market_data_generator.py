@@ -20,8 +20,11 @@ from enum import Enum
 import signal
 import sys
 
-from .price_generator import PriceGenerator, MarketState
+import numpy as np
+
+from .price_generator import PriceGenerator, MarketState, MarketRegimeEngine
 from .db_manager_sqlite import get_db_manager
+from .rng import get_rng_service
 from .db_models import (
     DatabaseManager,
     StockState,
@@ -93,7 +96,12 @@ class MarketDataGenerator:
         self.running = False
         self.stocks: List[StockMetadata] = []
         self.stock_states: Dict[str, dict] = {}
-        self.generators: Dict[str, PriceGenerator] = {}
+
+        # Vectorized engines: one generator and one regime engine for all stocks
+        self.price_generator = PriceGenerator(rng=get_rng_service().get("price_generator"))
+        self.regime_engine: Optional[MarketRegimeEngine] = None
+        self.prices = np.zeros(0)
+        self.base_volatilities = np.zeros(0)
         
         # Redis for real-time push
         self.redis_url = redis_url
@@ -149,12 +157,9 @@ class MarketDataGenerator:
         self.stocks = self.db.get_active_stocks()
         logger.info(f"Loaded {len(self.stocks)} active stocks")
 
-        # Initialize price generators
-        for stock in self.stocks:
-            self.generators[stock.symbol] = PriceGenerator(
-                base_volatility=float(stock.base_volatility)
-            )
-            logger.debug(f"Initialized generator for {stock.symbol}")
+        self.base_volatilities = np.array(
+            [float(stock.base_volatility) for stock in self.stocks], dtype=np.float64
+        )
 
     def load_stock_states(self):
         """Load current states for all stocks"""
@@ -193,55 +198,69 @@ class MarketDataGenerator:
                 )
                 logger.info(f"Initialized new state for {stock.symbol}: ${stock.base_price:.2f}")
 
+        # Array views of the loaded states for the vectorized engines
+        self.prices = np.array(
+            [self.stock_states[stock.symbol]["current_price"] for stock in self.stocks],
+            dtype=np.float64,
+        )
+        self.regime_engine = MarketRegimeEngine(
+            [self.stock_states[stock.symbol]["market_state"] for stock in self.stocks]
+        )
+
     def generate_minute_data(self):
         """
         Generate 1-minute K-line data for all stocks.
 
-        This is called every minute during trading hours.
+        This is called every minute during trading hours. Regime transitions
+        and K-lines are computed for the whole universe in one batch.
         """
         timestamp = int(time.time())
         klines_to_insert = []
 
-        for stock in self.stocks:
-            symbol = stock.symbol
+        # Check for market state transitions (all stocks at once)
+        changed = self.regime_engine.step(minutes_elapsed=1)
+        for i in np.flatnonzero(changed):
+            symbol = self.stocks[i].symbol
             state = self.stock_states[symbol]
-            generator = self.generators[symbol]
-
-            # Check for market state transition
-            new_state = generator.transition_market_state(
-                current_state=state["market_state"],
-                minutes_elapsed=1,
-            )
-
-            if new_state != state["market_state"]:
-                logger.info(
-                    f"{symbol}: Market state changed from "
-                    f"{state['market_state'].value} to {new_state.value}"
-                )
-                state["market_state"] = new_state
-
-            # Generate next K-line
-            kline = generator.generate_next_kline(
-                current_price=state["current_price"],
-                market_state=state["market_state"],
-                base_volume=1000000,  # Base volume, can be customized per stock
+            new_state = self.regime_engine.state_of(i)
+            logger.info(
+                f"{symbol}: Market state changed from "
+                f"{state['market_state'].value} to {new_state.value}"
             )
+            state["market_state"] = new_state
+
+        # Generate next K-lines
+        klines = self.price_generator.generate_next_klines(
+            current_prices=self.prices,
+            state_codes=self.regime_engine.states,
+            base_volatilities=self.base_volatilities,
+            base_volume=1000000,  # Base volume, can be customized per stock
+        )
+        self.prices = klines["close"]
+
+        for stock, o, h, l, c, v in zip(
+            self.stocks,
+            klines["open"].tolist(),
+            klines["high"].tolist(),
+            klines["low"].tolist(),
+            klines["close"].tolist(),
+            klines["volume"].tolist(),
+        ):
+            symbol = stock.symbol
+            state = self.stock_states[symbol]
 
             # Update current price
-            state["current_price"] = kline["close"]
+            state["current_price"] = c
             state["last_update"] = timestamp
 
             # Prepare for batch insert
+            kline = {"open": o, "high": h, "low": l, "close": c, "volume": v}
             klines_to_insert.append(
                 {
                     "symbol": symbol,
                     "interval": "1m",
                     "time": timestamp,
-                    "open": kline["open"],
-                    "high": kline["high"],
-                    "low": kline["low"],
-                    "close": kline["close"],
-                    "volume": kline["volume"],
+                    **kline,
                 }
             )
 
@@ -0,0 +1,117 @@
+"""
+进程间行情同步 (Market Feed)
+
+独立模拟器进程 (start_market_simulator.py) 拥有 tick 循环, API 进程不再运行调度器,
+两者通过 Redis pub/sub 交换数据:
+
+- market:arena   模拟器 -> API: 每个tick一条列式全市场快照 (价格、涨跌、成交、指数),
+                 数组按 MarketArena 的代码顺序对齐, 附带 universe_key 校验
+- market:control API -> 模拟器: 控制命令 (冲击注入/取消、重新加载配置)
+
+API 进程用 ArenaFeedSubscriber 把快照写入本地 MarketArena, 读接口照常读取内存,
+因此 API 延迟与 tick 开销无关, 也可以同时运行多个 API worker。
+"""
+
+import logging
+from typing import Dict, Optional
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.market_arena import MarketArena, get_market_arena
+from lib.shock_injector import get_shock_injector
+
+logger = logging.getLogger(__name__)
+
+ARENA_CHANNEL = "market:arena"
+CONTROL_CHANNEL = "market:control"
+
+CONTROL_SHOCK = "shock"
+CONTROL_CLEAR_SHOCKS = "clear_shocks"
+CONTROL_RELOAD = "reload"
+
+
+def arena_message(arena: MarketArena, timestamp: int) -> Dict:
+    """
+    生成一条列式全市场快照消息
+
+    Args:
+        arena: 模拟器进程的内存市场状态
+        timestamp: tick 时间戳(秒)
+    """
+    return {
+        "type": "arena_snapshot",
+        "timestamp": timestamp,
+        "version": arena.version,
+        "universe_key": arena.universe_key,
+        "prices": arena.prices.tolist(),
+        "previous_closes": arena.previous_closes.tolist(),
+        "change_values": np.round(arena.change_values, 4).tolist(),
+        "change_pcts": np.round(arena.change_pcts, 4).tolist(),
+        "volumes": arena.volumes.tolist(),
+        "turnovers": np.round(arena.turnovers, 2).tolist(),
+        "index_values": arena.index_values.tolist(),
+        "index_change_pcts": np.round(arena.index_change_pcts, 4).tolist(),
+    }
+
+
+class ArenaFeedSubscriber:
+    """API 进程: 把模拟器发布的快照写入本地 MarketArena"""
+
+    def __init__(self, arena: Optional[MarketArena] = None):
+        self.arena = arena or get_market_arena()
+        self.received = 0
+        self.reloads = 0
+        self.last_timestamp: Optional[int] = None
+
+    async def start(self, pubsub):
+        """订阅快照频道"""
+        await pubsub.subscribe(ARENA_CHANNEL, self.on_message)
+
+    def on_message(self, channel: str, message: Dict):
+        """
+        写入一条快照; 代码集合与本地不一致时 (模拟器重新加载了股票列表)
+        先从数据库重新加载再写入
+        """
+        if not self.arena.apply_feed(message):
+            print("[*] Market feed universe changed, reloading arena...")
+            self.arena.load()
+            self.reloads += 1
+            if not self.arena.apply_feed(message):
+                logger.warning("Market feed does not match database universe, snapshot skipped")
+                return
+        self.received += 1
+        self.last_timestamp = message.get("timestamp")
+
+
+def handle_control_message(channel: str, message: Dict):
+    """
+    模拟器进程: 执行 API 进程转发的控制命令
+
+    Args:
+        message: {'type': 'shock', 'event_id', 'target_type', 'magnitude', 'decay', 'codes', 'description'}
+                 或 {'type': 'clear_shocks'} / {'type': 'reload'}
+    """
+    command = message.get("type")
+    try:
+        if command == CONTROL_SHOCK:
+            event = get_shock_injector().submit(
+                target_type=message["target_type"],
+                magnitude=message["magnitude"],
+                decay=message.get("decay", 0.0),
+                codes=message.get("codes"),
+                description=message.get("description"),
+                event_id=message.get("event_id"),
+            )
+            print(f"[*] Shock queued from control channel: {event.event_id} {event.target_type}")
+        elif command == CONTROL_CLEAR_SHOCKS:
+            cleared = get_shock_injector().clear()
+            print(f"[*] Cleared {cleared} shocks from control channel")
+        elif command == CONTROL_RELOAD:
+            from lib.simulation_engine import get_simulation_engine
+            get_simulation_engine().reload()
+        else:
+            logger.warning(f"Unknown control command: {command}")
+    except (KeyError, ValueError) as e:
+        logger.error(f"Invalid control message {message}: {e}")
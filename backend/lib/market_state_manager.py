@@ -3,17 +3,24 @@
 Market State Manager
 
 管理全局市场状态（牛市/熊市/横盘），影响所有股票的价格生成。
+
+当前状态缓存在内存中（带版本号）:
+- 本进程的 transition_state / force_* 直接刷新缓存
+- 其他进程写入的状态通过 MAX(id) 变更检测发现, 最多每 CHANGE_CHECK_INTERVAL 秒查询一次
+因此tick路径上的 get_current_state 不产生数据库I/O。
 """
 
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime, timedelta
-import random
+import time
+import numpy as np
 import sys
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from lib.db_manager_sqlite import DatabaseManager
+from lib.rng import get_rng_service
 
 
 class MarketStateManager:
@@ -38,21 +45,52 @@ class MarketStateManager:
         STATE_SIDEWAYS: (-0.002, 0.002),  # 横盘：-0.2% ~ 0.2% 小幅波动
     }
 
+    # 每个状态的波动率乘数
+    VOLATILITY_MULTIPLIERS = {
+        STATE_BULL: 1.2,  # 牛市波动稍大
+        STATE_BEAR: 1.5,  # 熊市波动更大
+        STATE_SIDEWAYS: 1.0,  # 横盘波动正常
+    }
+
     # 最小持续天数
     MIN_DURATION_DAYS = 7
 
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+    # 跨进程变更检测的最小间隔（秒）
+    CHANGE_CHECK_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        rng: Optional[np.random.Generator] = None,
+        check_interval: Optional[float] = None,
+    ):
         """
         初始化市场状态管理器
 
         Args:
             db_manager: 数据库管理器（可选，默认创建新实例）
+            rng: 随机流（可选，默认取自全局随机数服务）
+            check_interval: 变更检测间隔（秒，默认 CHANGE_CHECK_INTERVAL）
         """
         self.db_manager = db_manager or DatabaseManager()
+        self.rng = rng or get_rng_service().get("market_state")
+        self.check_interval = (
+            self.CHANGE_CHECK_INTERVAL if check_interval is None else check_interval
+        )
+
+        # 当前状态缓存
+        self.version = 0  # 缓存内容每变化一次 +1
+        self._cached_state: Optional[Dict] = None
+        self._cached_marker: Optional[int] = None
+        self._cache_loaded = False
+        self._last_check = 0.0
 
-    def get_current_state(self) -> Optional[Dict]:
+    def get_current_state(self, refresh: bool = False) -> Optional[Dict]:
         """
-        获取当前市场状态
+        获取当前市场状态（读取内存缓存）
+
+        Args:
+            refresh: 强制从数据库重新加载
 
         Returns:
             当前状态字典，包含:
@@ -62,9 +100,54 @@ class MarketStateManager:
             - volatility_multiplier: 波动率乘数
             - description: 状态描述
         """
+        if refresh or not self._cache_loaded:
+            self.reload()
+        elif time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh_if_changed()
+
+        return dict(self._cached_state) if self._cached_state else None
+
+    def _set_cache(self, state: Optional[Dict], marker: Optional[int]):
+        """写入缓存, 内容变化时版本号 +1"""
+        if not self._cache_loaded or state != self._cached_state:
+            self.version += 1
+        self._cached_state = state
+        self._cached_marker = marker
+        self._cache_loaded = True
+        self._last_check = time.monotonic()
+
+    def _query_change_marker(self, cursor) -> Optional[int]:
+        """变更标记: 状态转换总会插入新行, MAX(id) 走主键, 代价极低"""
+        cursor.execute("SELECT MAX(id) FROM market_states")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def refresh_if_changed(self) -> bool:
+        """
+        变更检测: 只有 market_states 有新行时才重新加载
+
+        Returns:
+            缓存是否被刷新
+        """
+        conn = self.db_manager.get_connection()
+        try:
+            marker = self._query_change_marker(conn.cursor())
+        finally:
+            conn.close()
+
+        if self._cache_loaded and marker == self._cached_marker:
+            self._last_check = time.monotonic()
+            return False
+
+        self.reload()
+        return True
+
+    def reload(self) -> Optional[Dict]:
+        """从数据库加载当前状态到缓存"""
         conn = self.db_manager.get_connection()
         try:
             cursor = conn.cursor()
+            marker = self._query_change_marker(cursor)
             cursor.execute(
                 """
                 SELECT id, state, start_time, end_time, daily_trend,
@@ -76,22 +159,24 @@ class MarketStateManager:
                 """
             )
             row = cursor.fetchone()
-
-            if row:
-                return {
-                    "id": row[0],
-                    "state": row[1],
-                    "start_time": row[2],
-                    "end_time": row[3],
-                    "daily_trend": row[4],
-                    "volatility_multiplier": row[5],
-                    "description": row[6],
-                    "is_current": row[7],
-                }
-            return None
         finally:
             conn.close()
 
+        state = None
+        if row:
+            state = {
+                "id": row[0],
+                "state": row[1],
+                "start_time": row[2],
+                "end_time": row[3],
+                "daily_trend": row[4],
+                "volatility_multiplier": row[5],
+                "description": row[6],
+                "is_current": row[7],
+            }
+        self._set_cache(state, marker)
+        return state
+
     def get_market_trend(self) -> float:
         """
         获取当前市场趋势值（用于价格生成）
@@ -104,6 +189,79 @@ class MarketStateManager:
             return state["daily_trend"]
         return 0.0
 
+    def choose_next_state(self, current_state: Optional[str]) -> str:
+        """
+        按转换规则抽取下一个状态（不访问数据库）
+
+        Args:
+            current_state: 当前状态（None 表示没有当前状态）
+
+        Returns:
+            新状态
+        """
+        if current_state is None:
+            # 没有当前状态，默认横盘
+            return self.STATE_SIDEWAYS
+
+        possible_states = self.STATE_TRANSITIONS.get(
+            current_state, [self.STATE_SIDEWAYS]
+        )
+        # 70%概率保持当前状态，30%概率转换
+        if self.rng.random() < 0.7 and current_state in possible_states:
+            return current_state
+        return possible_states[self.rng.integers(len(possible_states))]
+
+    def draw_daily_trend(self, state: str) -> float:
+        """在状态对应的范围内抽取daily_trend"""
+        min_trend, max_trend = self.STATE_TREND_RANGES[state]
+        return float(self.rng.uniform(min_trend, max_trend))
+
+    def simulate_states(
+        self,
+        num_days: int,
+        initial: Optional[Dict] = None,
+        days_in_state: int = 0,
+    ) -> List[Dict]:
+        """
+        快进模拟逐日的市场状态（不写数据库）
+
+        与 transition_state 相同的规则: 状态至少持续 MIN_DURATION_DAYS 天,
+        之后每天尝试一次转换。
+
+        Args:
+            num_days: 模拟的交易日数
+            initial: 起始状态字典（默认读取当前状态）
+            days_in_state: 起始状态已持续的天数
+
+        Returns:
+            每个交易日一个字典: state / daily_trend / volatility_multiplier
+        """
+        if initial is None:
+            initial = self.get_current_state()
+
+        if initial:
+            state = initial["state"]
+            daily_trend = initial["daily_trend"]
+        else:
+            state = self.STATE_SIDEWAYS
+            daily_trend = 0.0
+
+        days = []
+        for _ in range(num_days):
+            if days_in_state >= self.MIN_DURATION_DAYS:
+                state = self.choose_next_state(state)
+                daily_trend = self.draw_daily_trend(state)
+                days_in_state = 0
+
+            days.append({
+                "state": state,
+                "daily_trend": daily_trend,
+                "volatility_multiplier": self.VOLATILITY_MULTIPLIERS[state],
+            })
+            days_in_state += 1
+
+        return days
+
     def transition_state(
         self,
         force_state: Optional[str] = None,
@@ -121,7 +279,7 @@ class MarketStateManager:
         Returns:
             新状态字典
         """
-        current = self.get_current_state()
+        current = self.get_current_state(refresh=True)
 
         # 检查是否满足最小持续时间（除非ignore_duration=True）
         if current and not ignore_duration:
@@ -139,33 +297,17 @@ class MarketStateManager:
         # 确定新状态
         if force_state:
             new_state = force_state
-        elif current:
-            # 根据转换规则选择新状态
-            possible_states = self.STATE_TRANSITIONS.get(
-                current["state"], [self.STATE_SIDEWAYS]
-            )
-            # 70%概率保持当前状态，30%概率转换
-            if random.random() < 0.7 and current["state"] in possible_states:
-                new_state = current["state"]
-            else:
-                new_state = random.choice(possible_states)
         else:
-            # 没有当前状态，默认横盘
-            new_state = self.STATE_SIDEWAYS
+            new_state = self.choose_next_state(current["state"] if current else None)
 
         # 确定daily_trend
         if force_trend is not None:
             daily_trend = force_trend
         else:
-            min_trend, max_trend = self.STATE_TREND_RANGES[new_state]
-            daily_trend = random.uniform(min_trend, max_trend)
+            daily_trend = self.draw_daily_trend(new_state)
 
         # 确定波动率乘数
-        volatility_multiplier = {
-            self.STATE_BULL: 1.2,  # 牛市波动稍大
-            self.STATE_BEAR: 1.5,  # 熊市波动更大
-            self.STATE_SIDEWAYS: 1.0,  # 横盘波动正常
-        }[new_state]
+        volatility_multiplier = self.VOLATILITY_MULTIPLIERS[new_state]
 
         # 生成描述
         state_names = {
@@ -209,7 +351,7 @@ class MarketStateManager:
             print(f"[+] Market state transitioned to: {new_state} (trend={daily_trend:.4f})")
             print(f"    Description: {description}")
 
-            return {
+            new_state_dict = {
                 "id": new_state_id,
                 "state": new_state,
                 "start_time": now_str,
@@ -219,6 +361,8 @@ class MarketStateManager:
                 "description": description,
                 "is_current": 1,
             }
+            self._set_cache(new_state_dict, new_state_id)
+            return dict(new_state_dict)
         finally:
             conn.close()
 
@@ -241,6 +385,20 @@ class MarketStateManager:
         )
 
 
+# 全局单例
+_market_state_manager: Optional[MarketStateManager] = None
+
+
+def get_market_state_manager() -> MarketStateManager:
+    """获取全局市场状态管理器（进程内共享同一份状态缓存）"""
+    global _market_state_manager
+
+    if _market_state_manager is None:
+        _market_state_manager = MarketStateManager()
+
+    return _market_state_manager
+
+
 def test_market_state_manager():
     """测试市场状态管理器"""
     print("=== Testing MarketStateManager ===\n")
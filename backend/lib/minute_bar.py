@@ -0,0 +1,186 @@
+"""
+分钟K线累加器 (Minute Bar Accumulator)
+
+tick 引擎每3秒产生一次 OHLC, 累加器在数组中维护当前分钟的
+open/high/low/close/volume/turnover:
+- 分钟内第一个 tick 决定 open
+- high/low 取整分钟的极值
+- close 取最后一个 tick
+- volume/turnover 累加
+
+分钟切换时把上一分钟的K线作为定稿返回, 每个代码每分钟只写一次 price_data。
+write_bars 把一批K线 (B个时间点 × N个代码) 在一个事务内写入 price_data;
+bar_rows / insert_bar_rows 供后台写入线程把多批K线合并到同一个事务。
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class MinuteBarAccumulator:
+    """分钟K线累加器 (按数组下标对应代码)"""
+
+    def __init__(self):
+        self.minute: Optional[int] = None
+        self.size = 0
+        self.open = np.zeros(0)
+        self.high = np.zeros(0)
+        self.low = np.zeros(0)
+        self.close = np.zeros(0)
+        self.change_pct = np.zeros(0)
+        self.volume = np.zeros(0, dtype=np.int64)
+        self.turnover = np.zeros(0)
+
+    def _start(self, minute: int, open_, high, low, close, change_pct, volume, turnover):
+        """以一个 tick 开始新的一分钟"""
+        self.minute = minute
+        self.size = len(close)
+        self.open = np.array(open_, dtype=np.float64)
+        self.high = np.array(high, dtype=np.float64)
+        self.low = np.array(low, dtype=np.float64)
+        self.close = np.array(close, dtype=np.float64)
+        self.change_pct = np.array(change_pct, dtype=np.float64)
+        self.volume = np.array(volume, dtype=np.int64)
+        self.turnover = np.array(turnover, dtype=np.float64)
+
+    def update(
+        self,
+        minute: int,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        change_pct: np.ndarray,
+        volume: Optional[np.ndarray] = None,
+        turnover: Optional[np.ndarray] = None,
+    ) -> Optional[Dict]:
+        """
+        合并一个 tick
+
+        Args:
+            minute: tick 所属分钟的时间戳 (秒数归零)
+            open_/high/low/close: tick 的 OHLC 数组 (N,)
+            change_pct: tick 收盘时的涨跌幅数组 (N,)
+            volume/turnover: tick 的成交量/成交额数组 (None 视为0)
+
+        Returns:
+            进入新分钟时返回上一分钟的定稿K线 (见 finalize), 否则 None
+        """
+        n = len(close)
+        if volume is None:
+            volume = np.zeros(n, dtype=np.int64)
+        if turnover is None:
+            turnover = np.zeros(n)
+
+        if self.minute is not None and self.minute == minute and self.size == n:
+            np.maximum(self.high, high, out=self.high)
+            np.minimum(self.low, low, out=self.low)
+            self.close[:] = close
+            self.change_pct[:] = change_pct
+            self.volume += np.asarray(volume, dtype=np.int64)
+            self.turnover += turnover
+            return None
+
+        # 新的一分钟 (或代码集合发生变化): 先定稿旧K线
+        finished = self.finalize()
+        self._start(minute, open_, high, low, close, change_pct, volume, turnover)
+        return finished
+
+    def finalize(self) -> Optional[Dict]:
+        """
+        定稿当前分钟并清空累加器 (分钟切换或关闭时调用)
+
+        Returns:
+            {'minute', 'open', 'high', 'low', 'close', 'change_pct', 'volume', 'turnover'},
+            没有进行中的分钟时返回 None
+        """
+        if self.minute is None:
+            return None
+
+        bar = {
+            "minute": self.minute,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "change_pct": self.change_pct,
+            "volume": self.volume,
+            "turnover": self.turnover,
+        }
+        self.minute = None
+        self.size = 0
+        return bar
+
+
+def bar_rows(target_type: str, codes: List[str], bars: Dict) -> List[tuple]:
+    """
+    把一批K线 (B个时间点 × N个代码) 展开为 price_data 行
+
+    Args:
+        target_type: 'STOCK' 或 'INDEX'
+        codes: 代码列表 (N,)
+        bars: timestamps (B,) 以及 open/high/low/close/volume/turnover/change_pct (B×N)
+
+    Returns:
+        行列表, 顺序与 insert_bar_rows 的列一致
+    """
+    timestamps = np.asarray(bars["timestamps"], dtype=np.int64)
+    b, n = len(timestamps), len(codes)
+    if b == 0 or n == 0:
+        return []
+
+    datetime_strs = [
+        datetime.fromtimestamp(int(ts)).strftime('%Y-%m-%d %H:%M:00') for ts in timestamps
+    ]
+
+    return list(zip(
+        [target_type] * (b * n),
+        list(codes) * b,
+        np.repeat(timestamps, n).tolist(),
+        np.repeat(np.array(datetime_strs, dtype=object), n).tolist(),
+        np.round(bars["open"], 2).ravel().tolist(),
+        np.round(bars["close"], 2).ravel().tolist(),
+        np.round(bars["high"], 2).ravel().tolist(),
+        np.round(bars["low"], 2).ravel().tolist(),
+        np.asarray(bars["volume"], dtype=np.int64).ravel().tolist(),
+        np.round(bars["turnover"], 2).ravel().tolist(),
+        np.round(bars["change_pct"], 2).ravel().tolist(),
+    ))
+
+
+def insert_bar_rows(cursor, rows: List[tuple]):
+    """在调用方的事务内写入 bar_rows 生成的行"""
+    cursor.executemany("""
+        INSERT OR REPLACE INTO price_data (
+            target_type, target_code, timestamp, datetime,
+            open, close, high, low, volume, turnover, change_pct
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def write_bars(db_manager, target_type: str, codes: List[str], bars: Dict) -> int:
+    """
+    批量写入K线到 price_data (一个事务)
+
+    Args:
+        db_manager: 数据库管理器实例
+        target_type: 'STOCK' 或 'INDEX'
+        codes: 代码列表 (N,)
+        bars: timestamps (B,) 以及 open/high/low/close/volume/turnover/change_pct (B×N)
+
+    Returns:
+        写入行数
+    """
+    rows = bar_rows(target_type, codes, bars)
+    if not rows:
+        return 0
+
+    conn = db_manager.get_connection()
+    try:
+        insert_bar_rows(conn.cursor(), rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return len(rows)
@@ -0,0 +1,286 @@
+"""
+后台持久化写入器 (Persistence Writer)
+
+tick 任务在事件循环上运行, 不能等待磁盘。需要写入的数据 (定稿分钟K线、
+内存市场状态快照) 放入有界队列, 由专用写入线程取出:
+- 每次阻塞等待第一项, 再在 batch_seconds 内尽量多取 (最多 max_batch 项)
+- 一批数据在一个事务内写入; 同一批中的多个状态快照只写最新的一个
+- 队列已满时丢弃新数据并计数 (tick 永远不阻塞)
+- 写入失败 (例如 database is locked) 时按指数退避重试整批数据, 重试用尽后
+  才把其中的K线计入丢弃数; 状态快照会被下一个快照取代, 不单独重试
+
+metrics() 提供队列深度、写入延迟等指标。
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import settings
+from lib.db_manager_sqlite import DatabaseManager, get_db_manager
+from lib.market_arena import write_snapshot
+from lib.minute_bar import bar_rows, insert_bar_rows
+
+KIND_BARS = 'bars'
+KIND_SNAPSHOT = 'snapshot'
+
+_STOP = object()
+
+
+class PersistenceWriter:
+    """有界队列 + 专用写入线程"""
+
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        max_queue: int = 256,
+        batch_seconds: float = 1.0,
+        max_batch: int = 64,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+    ):
+        """
+        初始化写入器
+
+        Args:
+            db_manager: 数据库管理器实例
+            max_queue: 队列容量
+            batch_seconds: 收集一批数据的最长等待时间(秒)
+            max_batch: 每个事务最多写入的项数
+            max_retries: 一批数据写入失败后的最多重试次数
+            retry_backoff: 第一次重试前的等待时间(秒), 之后每次加倍
+        """
+        self.db_manager = db_manager or get_db_manager()
+        self.batch_seconds = batch_seconds
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._enqueued = 0
+        self._dropped = 0
+        self._batches = 0
+        self._items_written = 0
+        self._rows_written = 0
+        self._errors = 0
+        self._retries = 0
+        self._last_error: Optional[str] = None
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动写入线程"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+        print("[+] Persistence writer started")
+
+    def stop(self, timeout: float = 30.0):
+        """
+        写完队列中的剩余数据后停止写入线程
+
+        Args:
+            timeout: 等待写完的最长时间(秒)
+        """
+        if not self.running:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("[!] Persistence writer queue full on shutdown, pending writes dropped")
+        self._thread.join(timeout)
+        self._thread = None
+        print("[+] Persistence writer stopped")
+
+    # ------------------------------------------------------------------
+    # 入队 (tick 调用, 永不阻塞)
+    # ------------------------------------------------------------------
+
+    def _put(self, item: tuple) -> bool:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            print(f"[!] Persistence queue full, dropped {item[0]}")
+            return False
+        with self._lock:
+            self._enqueued += 1
+        return True
+
+    def submit_bars(self, target_type: str, codes: List[str], bars: Dict) -> bool:
+        """
+        放入一批K线 (格式同 write_bars)
+
+        Returns:
+            是否入队 (队列已满时为 False)
+        """
+        return self._put((KIND_BARS, target_type, list(codes), bars))
+
+    def submit_snapshot(self, snapshot: Optional[Dict], on_written: Optional[Callable[[int], None]] = None) -> bool:
+        """
+        放入一份内存市场状态快照 (MarketArena.snapshot())
+
+        Args:
+            snapshot: 快照 (None 时忽略)
+            on_written: 写入成功后以快照版本号回调 (例如 arena.mark_flushed)
+        """
+        if snapshot is None:
+            return False
+        return self._put((KIND_SNAPSHOT, snapshot, on_written))
+
+    # ------------------------------------------------------------------
+    # 写入线程
+    # ------------------------------------------------------------------
+
+    def _collect(self, first) -> tuple:
+        """以 first 开始收集一批数据, 返回 (批次, 是否收到停止信号)"""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_seconds
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+            self._flush(batch)
+            if stopping:
+                break
+
+    def _flush(self, batch: List[tuple]):
+        """写入一批数据, 失败时按指数退避重试, 重试用尽后丢弃并计数"""
+        for attempt in range(self.max_retries + 1):
+            if self._write_batch(batch):
+                return
+            if attempt < self.max_retries:
+                delay = self.retry_backoff * (2 ** attempt)
+                with self._lock:
+                    self._retries += 1
+                print(f"[*] Persistence writer retrying {len(batch)} items in {delay:.1f}s "
+                      f"({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+        bar_items = sum(1 for item in batch if item[0] == KIND_BARS)
+        with self._lock:
+            self._dropped += bar_items
+        print(f"[!] Persistence writer gave up after {self.max_retries} retries, "
+              f"dropped {bar_items} bar items")
+
+    def _write_batch(self, batch: List[tuple]) -> bool:
+        """
+        在一个事务内写入一批数据
+
+        Returns:
+            是否写入成功 (失败时事务已回滚, 数据保留在 batch 中供重试)
+        """
+        snapshots = [item for item in batch if item[0] == KIND_SNAPSHOT]
+        latest = snapshots[-1] if snapshots else None
+
+        started = time.perf_counter()
+        rows = 0
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            for item in batch:
+                if item[0] == KIND_BARS:
+                    _, target_type, codes, bars = item
+                    item_rows = bar_rows(target_type, codes, bars)
+                    if item_rows:
+                        insert_bar_rows(cursor, item_rows)
+                        rows += len(item_rows)
+            if latest is not None:
+                rows += write_snapshot(cursor, latest[1])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            with self._lock:
+                self._errors += 1
+                self._last_error = str(e)
+            print(f"[!] Persistence writer failed to write {len(batch)} items: {e}")
+            return False
+        finally:
+            conn.close()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._batches += 1
+            self._items_written += len(batch)
+            self._rows_written += rows
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+        if latest is not None and latest[2] is not None:
+            latest[2](latest[1]["version"])
+        return True
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict:
+        """队列深度、吞吐和写入延迟指标"""
+        with self._lock:
+            return {
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self._enqueued,
+                "dropped": self._dropped,
+                "batches": self._batches,
+                "items_written": self._items_written,
+                "rows_written": self._rows_written,
+                "errors": self._errors,
+                "retries": self._retries,
+                "last_error": self._last_error,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self._batches, 3) if self._batches else 0.0,
+                "max_flush_ms": round(self._max_flush_ms, 3),
+            }
+
+
+# 全局单例
+_persistence_writer: Optional[PersistenceWriter] = None
+
+
+def get_persistence_writer() -> PersistenceWriter:
+    """获取全局持久化写入器"""
+    global _persistence_writer
+
+    if _persistence_writer is None:
+        _persistence_writer = PersistenceWriter(
+            max_queue=settings.PERSISTENCE_QUEUE_SIZE,
+            batch_seconds=settings.PERSISTENCE_BATCH_SECONDS,
+            max_batch=settings.PERSISTENCE_MAX_BATCH,
+            max_retries=settings.PERSISTENCE_MAX_RETRIES,
+            retry_backoff=settings.PERSISTENCE_RETRY_BACKOFF_SECONDS,
+        )
+
+    return _persistence_writer
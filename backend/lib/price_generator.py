@@ -6,8 +6,13 @@ Prices follow Geometric Brownian Motion with dynamic volatility and trend adjust
 """
 
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from enum import Enum
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.rng import get_rng_service
 
 
 class MarketState(Enum):
@@ -64,14 +69,21 @@ class PriceGenerator:
         },
     }
 
-    def __init__(self, base_volatility: float = 0.02):
+    def __init__(
+        self,
+        base_volatility: float = 0.02,
+        rng: Optional[np.random.Generator] = None,
+    ):
         """
         Initialize price generator.
 
         Args:
             base_volatility: Base annual volatility (default 0.02 = 2%)
+            rng: Random stream (default: shared "price_generator" stream
+                 from the RNG service)
         """
         self.base_volatility = base_volatility
+        self.rng = rng or get_rng_service().get("price_generator")
         self.state_transition_timer = 0
         self.state_duration = 0
 
@@ -94,7 +106,7 @@ class PriceGenerator:
 
         # Check for state transition every 30-120 minutes (random)
         if self.state_duration == 0:
-            self.state_duration = np.random.randint(30, 121)
+            self.state_duration = self.rng.integers(30, 121)
 
         if self.state_transition_timer < self.state_duration:
             return current_state
@@ -108,9 +120,72 @@ class PriceGenerator:
         states = list(probabilities.keys())
         probs = list(probabilities.values())
 
-        next_state = np.random.choice(states, p=probs)
+        next_state = states[self.rng.choice(len(states), p=probs)]
         return next_state
 
+    def generate_next_klines(
+        self,
+        current_prices: np.ndarray,
+        state_codes: np.ndarray,
+        base_volatilities: np.ndarray,
+        base_volume: int = 1000000,
+        dt: float = 1 / 240
+    ) -> Dict[str, np.ndarray]:
+        """
+        Generate the next 1-minute K-line for many stocks at once.
+
+        Vectorized version of generate_next_kline: same model, one numpy
+        operation per field instead of one Python call per stock.
+
+        Args:
+            current_prices: Current prices, shape (N,)
+            state_codes: Market state codes, shape (N,), see MarketRegimeEngine
+            base_volatilities: Per-stock base volatility, shape (N,)
+            base_volume: Base trading volume
+            dt: Time step (1/240 for 1 minute in 4-hour trading day)
+
+        Returns:
+            Dictionary of (N,) arrays: open, high, low, close, volume
+        """
+        current_prices = np.asarray(current_prices, dtype=np.float64)
+        state_codes = np.asarray(state_codes, dtype=np.int64)
+        n = current_prices.shape[0]
+
+        trend = STATE_TRENDS[state_codes]
+        volatility = np.asarray(base_volatilities, dtype=np.float64) * STATE_VOLATILITY_MULTS[state_codes]
+
+        open_price = current_prices
+
+        # GBM close, never below half the previous price
+        shock = volatility * np.sqrt(dt) * self.rng.normal(0, 1, size=n)
+        close_price = current_prices * (1 + trend * dt + shock)
+        close_price = np.maximum(close_price, current_prices * 0.5)
+
+        # Half-normal spreads for high/low
+        spread_scale = volatility * np.sqrt(dt) * current_prices * 0.5
+        high_spread = np.abs(self.rng.normal(0, 1, size=n) * spread_scale)
+        low_spread = np.abs(self.rng.normal(0, 1, size=n) * spread_scale)
+
+        high_price = np.maximum(open_price, close_price) + high_spread
+        low_price = np.minimum(open_price, close_price) - low_spread
+        low_price = np.maximum(low_price, 0.01)
+
+        # Volume correlated with price movement
+        price_change_pct = np.abs((close_price - open_price) / open_price)
+        volume_multiplier = 1.0 + (price_change_pct * 10)
+        volume_noise = self.rng.uniform(0.7, 1.3, size=n)
+
+        volume = (base_volume * volume_multiplier * volume_noise).astype(np.int64)
+        volume = np.maximum(volume, int(base_volume * 0.3))
+
+        return {
+            "open": np.round(open_price, 2),
+            "high": np.round(high_price, 2),
+            "low": np.round(low_price, 2),
+            "close": np.round(close_price, 2),
+            "volume": volume,
+        }
+
     def generate_next_kline(
         self,
         current_price: float,
@@ -145,7 +220,7 @@ class PriceGenerator:
 
         # Generate close price using GBM
         drift = trend * dt
-        shock = volatility * np.sqrt(dt) * np.random.normal(0, 1)
+        shock = volatility * np.sqrt(dt) * self.rng.normal(0, 1)
         close_price = current_price * (1 + drift + shock)
 
         # Ensure price doesn't go negative
@@ -156,8 +231,8 @@ class PriceGenerator:
 
         # High and low prices (realistic spread)
         # Use half-normal distribution for spread from open/close
-        high_spread = abs(np.random.normal(0, intraday_volatility * current_price * 0.5))
-        low_spread = abs(np.random.normal(0, intraday_volatility * current_price * 0.5))
+        high_spread = abs(self.rng.normal(0, intraday_volatility * current_price * 0.5))
+        low_spread = abs(self.rng.normal(0, intraday_volatility * current_price * 0.5))
 
         high_price = max(open_price, close_price) + high_spread
         low_price = min(open_price, close_price) - low_spread
@@ -175,7 +250,7 @@ class PriceGenerator:
         volume_multiplier = 1.0 + (price_change_pct * 10)  # 1% move = 10% more volume
 
         # Add random noise to volume
-        volume_noise = np.random.uniform(0.7, 1.3)
+        volume_noise = self.rng.uniform(0.7, 1.3)
 
         volume = int(base_volume * volume_multiplier * volume_noise)
         volume = max(volume, int(base_volume * 0.3))  # Minimum 30% of base volume
@@ -228,6 +303,241 @@ class PriceGenerator:
         return klines, current_state
 
 
+# State codes used by the vectorized engines (index into STATE_LIST)
+STATE_LIST = list(MarketState)
+STATE_CODES = {state: code for code, state in enumerate(STATE_LIST)}
+
+STATE_TRENDS = np.array(
+    [PriceGenerator.STATE_PARAMS[state]["trend"] for state in STATE_LIST]
+)
+STATE_VOLATILITY_MULTS = np.array(
+    [PriceGenerator.STATE_PARAMS[state]["volatility_mult"] for state in STATE_LIST]
+)
+
+# Cumulative transition probabilities, row = current state code
+STATE_TRANSITION_CUMULATIVE = np.cumsum(
+    [
+        [PriceGenerator.STATE_TRANSITION[current][nxt] for nxt in STATE_LIST]
+        for current in STATE_LIST
+    ],
+    axis=1,
+)
+STATE_TRANSITION_CUMULATIVE[:, -1] = 1.0
+
+
+class MarketRegimeEngine:
+    """
+    Batch Markov regime engine for many stocks.
+
+    Holds state codes, timers and durations as int arrays and applies
+    PriceGenerator.transition_market_state semantics to every stock at once:
+    each stock keeps its state for a random 30-120 minutes, then samples the
+    next state from STATE_TRANSITION by cumulative-probability lookup.
+    """
+
+    MIN_DURATION = 30
+    MAX_DURATION = 120
+
+    def __init__(
+        self,
+        initial_states,
+        rng: Optional[np.random.Generator] = None,
+    ):
+        """
+        Initialize regime engine.
+
+        Args:
+            initial_states: Starting states, MarketState values or state codes
+            rng: Random stream (default: "market_regime" stream from the RNG service)
+        """
+        self.rng = rng or get_rng_service().get("market_regime")
+        self.states = np.array(
+            [STATE_CODES[s] if isinstance(s, MarketState) else int(s) for s in initial_states],
+            dtype=np.int64,
+        )
+        self.timers = np.zeros(len(self.states), dtype=np.int64)
+        self.durations = np.zeros(len(self.states), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def step(self, minutes_elapsed: int = 1) -> np.ndarray:
+        """
+        Advance all timers and sample transitions for stocks that are due.
+
+        Args:
+            minutes_elapsed: Minutes since last step
+
+        Returns:
+            Boolean mask of stocks whose state changed
+        """
+        self.timers += minutes_elapsed
+
+        # Draw a new 30-120 minute duration where none is pending
+        pending = self.durations == 0
+        if pending.any():
+            self.durations[pending] = self.rng.integers(
+                self.MIN_DURATION, self.MAX_DURATION + 1, size=int(pending.sum())
+            )
+
+        changed = np.zeros(len(self.states), dtype=bool)
+        due = np.flatnonzero(self.timers >= self.durations)
+        if len(due) == 0:
+            return changed
+
+        self.timers[due] = 0
+        self.durations[due] = 0
+
+        # Cumulative-probability lookup: first column whose cumulative p exceeds u
+        u = self.rng.random(len(due))
+        cumulative = STATE_TRANSITION_CUMULATIVE[self.states[due]]
+        next_states = np.minimum((u[:, None] >= cumulative).sum(axis=1), len(STATE_LIST) - 1)
+
+        changed[due] = next_states != self.states[due]
+        self.states[due] = next_states
+        return changed
+
+    def state_of(self, index: int) -> MarketState:
+        """Return MarketState for one stock"""
+        return STATE_LIST[self.states[index]]
+
+
+def simulate_regime_paths(
+    initial_states: np.ndarray,
+    num_bars: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Build per-bar market state codes for many stocks, segment by segment.
+
+    Each stock stays in a state for a random MIN_DURATION..MAX_DURATION bars,
+    then samples the next state from STATE_TRANSITION. Segments are drawn for
+    all stocks at once, so the loop runs once per segment, not once per bar.
+
+    Args:
+        initial_states: Starting state codes, shape (N,)
+        num_bars: Number of bars T
+        rng: Random stream
+
+    Returns:
+        State code matrix, shape (N, T)
+    """
+    initial_states = np.asarray(initial_states, dtype=np.int64)
+    n = len(initial_states)
+    if num_bars <= 0:
+        return np.zeros((n, 0), dtype=np.int64)
+
+    num_segments = num_bars // MarketRegimeEngine.MIN_DURATION + 1
+
+    # Segment lengths and their start bars
+    durations = rng.integers(
+        MarketRegimeEngine.MIN_DURATION,
+        MarketRegimeEngine.MAX_DURATION + 1,
+        size=(n, num_segments),
+    )
+    boundaries = np.cumsum(durations, axis=1)
+
+    # Markov chain over segments
+    segment_states = np.empty((n, num_segments + 1), dtype=np.int64)
+    segment_states[:, 0] = initial_states
+    u = rng.random((n, num_segments))
+    for k in range(num_segments):
+        cumulative = STATE_TRANSITION_CUMULATIVE[segment_states[:, k]]
+        segment_states[:, k + 1] = np.minimum(
+            (u[:, k, None] >= cumulative).sum(axis=1), len(STATE_LIST) - 1
+        )
+
+    # Segment index of every bar: count boundaries at or before each bar
+    markers = np.zeros((n, num_bars + 1), dtype=np.int64)
+    rows, cols = np.nonzero(boundaries < num_bars)
+    np.add.at(markers, (rows, boundaries[rows, cols]), 1)
+    segment_index = np.cumsum(markers[:, :num_bars], axis=1)
+
+    return np.take_along_axis(segment_states, segment_index, axis=1)
+
+
+def generate_kline_matrix(
+    initial_prices: np.ndarray,
+    num_bars: int,
+    base_volatilities: np.ndarray,
+    initial_states: np.ndarray = None,
+    base_volume: int = 1000000,
+    dt: float = 1 / 240,
+    rng: Optional[np.random.Generator] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Generate (stocks x bars) K-line matrices in one pass.
+
+    Vectorized equivalent of PriceGenerator.generate_kline_sequence for many
+    stocks: per-bar growth factors (1 + drift + shock, floored at 0.5) are
+    turned into a price path with a cumulative sum of log returns, and
+    high/low/volume are computed as whole-matrix operations. Regimes change
+    per segment (see simulate_regime_paths). Unlike the per-bar loop, the
+    path is not re-rounded to cents between bars.
+
+    Args:
+        initial_prices: Starting prices, shape (N,)
+        num_bars: Number of bars T
+        base_volatilities: Per-stock base volatility, shape (N,)
+        initial_states: Starting state codes (default: all SIDEWAYS)
+        base_volume: Base trading volume
+        dt: Time step (1/240 for 1 minute in 4-hour trading day)
+        rng: Random stream (default: "price_generator" stream from the RNG service)
+
+    Returns:
+        Dictionary of (N, T) arrays: open, high, low, close, volume, state,
+        plus "final_state" with shape (N,)
+    """
+    rng = rng or get_rng_service().get("price_generator")
+    initial_prices = np.asarray(initial_prices, dtype=np.float64)
+    base_volatilities = np.asarray(base_volatilities, dtype=np.float64)
+    n = len(initial_prices)
+
+    if initial_states is None:
+        initial_states = np.full(n, STATE_CODES[MarketState.SIDEWAYS], dtype=np.int64)
+
+    states = simulate_regime_paths(initial_states, num_bars, rng)
+    trend = STATE_TRENDS[states]
+    volatility = base_volatilities[:, None] * STATE_VOLATILITY_MULTS[states]
+    step_volatility = volatility * np.sqrt(dt)
+
+    # Close path: cumulative sum of log growth factors
+    shock = step_volatility * rng.standard_normal((n, num_bars))
+    growth = np.maximum(1 + trend * dt + shock, 0.5)
+    log_path = np.log(initial_prices)[:, None] + np.cumsum(np.log(growth), axis=1)
+    close_price = np.exp(log_path)
+
+    open_price = np.empty_like(close_price)
+    open_price[:, 0] = initial_prices
+    open_price[:, 1:] = close_price[:, :-1]
+
+    # Half-normal spreads for high/low
+    spread_scale = step_volatility * open_price * 0.5
+    high_price = np.maximum(open_price, close_price) + np.abs(
+        rng.standard_normal((n, num_bars)) * spread_scale
+    )
+    low_price = np.minimum(open_price, close_price) - np.abs(
+        rng.standard_normal((n, num_bars)) * spread_scale
+    )
+    low_price = np.maximum(low_price, 0.01)
+
+    # Volume correlated with price movement
+    price_change_pct = np.abs(growth - 1)
+    volume_noise = rng.uniform(0.7, 1.3, size=(n, num_bars))
+    volume = (base_volume * (1.0 + price_change_pct * 10) * volume_noise).astype(np.int64)
+    volume = np.maximum(volume, int(base_volume * 0.3))
+
+    return {
+        "open": np.round(open_price, 2),
+        "high": np.round(high_price, 2),
+        "low": np.round(low_price, 2),
+        "close": np.round(close_price, 2),
+        "volume": volume,
+        "state": states,
+        "final_state": states[:, -1] if num_bars else np.asarray(initial_states),
+    }
+
+
 def generate_historical_data(
     symbol: str,
     start_price: float,
@@ -9,7 +9,8 @@
 5. 布朗桥近似生成OHLC
 """
 
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Iterator, Optional, Tuple, List
+from datetime import datetime, timedelta
 import numpy as np
 from pathlib import Path
 import sys
@@ -17,6 +18,8 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from lib.db_manager_sqlite import DatabaseManager
 from lib.market_state_manager import MarketStateManager
+from lib.shock_engine import CorrelatedShockEngine
+from lib.rng import get_rng_service
 
 
 class PriceGeneratorV2:
@@ -48,6 +51,12 @@ class PriceGeneratorV2:
     # 市场-板块相关系数
     RHO_MS = 0.75  # 相关系数 ρ_ms
     
+    # 布朗桥中间点数量 k (生成High/Low用)
+    BRIDGE_POINTS = 2
+    
+    # 交易时段 (快进模拟用): 9:30-11:30, 13:00-15:00
+    TRADING_SESSIONS = (((9, 30), (11, 30)), ((13, 0), (15, 0)))
+    
     # 年化波动率 (调大以增强视觉效果)
     SIGMA_MARKET_ANNUAL = 0.30   # 30% 市场年化波动 (原18%)
     SIGMA_SECTOR_ANNUAL = 0.40   # 40% 板块年化波动 (原25%)
@@ -58,6 +67,9 @@ class PriceGeneratorV2:
         db_manager: Optional[DatabaseManager] = None,
         market_state_manager: Optional[MarketStateManager] = None,
         steps_per_day: int = 4800,  # 3秒/步: 240分×60秒÷3秒 = 4800步
+        rng: Optional[np.random.Generator] = None,
+        common_rng: Optional[np.random.Generator] = None,
+        bridge_points: Optional[int] = None,
     ):
         """
         初始化价格生成器
@@ -66,12 +78,23 @@ class PriceGeneratorV2:
             db_manager: 数据库管理器
             market_state_manager: 市场状态管理器
             steps_per_day: 每日步数 (决定dt)
+            rng: 个股随机流 (默认取自全局随机数服务, 分片运行时按分片传入)
+            common_rng: 市场/板块冲击随机流 (各分片必须相同)
+            bridge_points: 布朗桥中间点数量 k (默认 BRIDGE_POINTS)
         """
         self.db_manager = db_manager or DatabaseManager()
         self.market_state_manager = market_state_manager or MarketStateManager(
             self.db_manager
         )
         
+        # 随机流
+        service = get_rng_service()
+        self.rng = rng or service.get("price_v2")
+        self.common_rng = common_rng or service.get("price_v2", "common")
+        
+        # 布朗桥中间点数量
+        self.bridge_points = max(1, int(bridge_points or self.BRIDGE_POINTS))
+        
         # 时间步长 (以日为单位)
         self.steps_per_day = steps_per_day
         self.dt = 1.0 / steps_per_day  # dt = 1/4800 ≈ 0.000208 (日)
@@ -83,21 +106,34 @@ class PriceGeneratorV2:
         
         # 缓存板块数据
         self._sector_cache: Dict[str, Dict] = {}
+        # 板块索引 (向量化计算用): 板块代码 -> 整数下标
+        self._sector_codes: List[str] = []
+        self._sector_index: Dict[str, int] = {}
+        self.sector_betas: np.ndarray = np.ones(1)
         self._load_sectors()
         
+        # 共享相关冲击引擎 (每个tick: 1个市场冲击 + 每板块1个冲击 + 个股冲击)
+        self.shock_engine = CorrelatedShockEngine(
+            num_sectors=len(self.sector_betas),
+            rho_ms=self.RHO_MS,
+            rng=self.rng,
+            common_rng=self.common_rng,
+        )
+        
         print(f"[PriceGeneratorV2] 初始化完成:")
         print(f"  - 每日步数: {steps_per_day}")
         print(f"  - 时间步长 dt: {self.dt:.6f} 日")
         print(f"  - 市场日化波动: {self.sigma_m_day:.4f}")
         print(f"  - 板块日化波动: {self.sigma_s_day:.4f}")
         print(f"  - 个股日化波动: {self.sigma_i_day:.4f}")
+        print(f"  - 布朗桥中间点: {self.bridge_points}")
     
     def _load_sectors(self):
         """加载板块数据到缓存"""
         conn = self.db_manager.get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT code, name, beta FROM sectors")
+            cursor.execute("SELECT code, name, beta FROM sectors ORDER BY code")
             rows = cursor.fetchall()
             
             for row in rows:
@@ -107,10 +143,38 @@ class PriceGeneratorV2:
                     "beta": row[2] if row[2] else 1.0,
                 }
             
+            # 按 code 排序 (与 MarketArena 的板块下标一致),
+            # 最后一个下标保留给未知板块 (Beta=1.0)
+            self._sector_codes = list(self._sector_cache.keys())
+            self._sector_index = {
+                code: i for i, code in enumerate(self._sector_codes)
+            }
+            self.sector_betas = np.array(
+                [self._sector_cache[c]["beta"] for c in self._sector_codes] + [1.0],
+                dtype=np.float64,
+            )
+            
             print(f"[+] 加载 {len(self._sector_cache)} 个板块到缓存")
         finally:
             conn.close()
     
+    def reload_sectors(self):
+        """
+        重新加载板块配置 (sectors 表变化后调用)
+        
+        板块数量变化时重建冲击引擎 (沿用同一随机流)
+        """
+        num_sectors = len(self.sector_betas)
+        self._sector_cache = {}
+        self._load_sectors()
+        if len(self.sector_betas) != num_sectors:
+            self.shock_engine = CorrelatedShockEngine(
+                num_sectors=len(self.sector_betas),
+                rho_ms=self.RHO_MS,
+                rng=self.rng,
+                common_rng=self.common_rng,
+            )
+    
     def get_sector_beta(self, sector_code: str) -> float:
         """获取板块Beta系数"""
         sector = self._sector_cache.get(sector_code)
@@ -118,6 +182,36 @@ class PriceGeneratorV2:
             return sector["beta"]
         return 1.0
     
+    def sector_indices(self, sector_codes: List[str]) -> np.ndarray:
+        """
+        将板块代码批量映射为板块下标 (未知板块映射到末尾的默认槽位)
+        
+        Args:
+            sector_codes: 板块代码列表
+        
+        Returns:
+            int64 下标数组, 可直接索引 self.sector_betas
+        """
+        default = len(self._sector_codes)
+        return np.array(
+            [self._sector_index.get(code, default) for code in sector_codes],
+            dtype=np.int64,
+        )
+    
+    def set_sector_correlation(self, correlation: Optional[np.ndarray]):
+        """
+        设置板块相关矩阵 (按 code 排序的 S×S 矩阵, None 表示板块之间独立)
+        
+        未知板块槽位与其他板块不相关。
+        """
+        if correlation is not None:
+            correlation = np.asarray(correlation, dtype=np.float64)
+            size = len(self.sector_betas)
+            padded = np.eye(size)
+            padded[:size - 1, :size - 1] = correlation
+            correlation = padded
+        self.shock_engine.set_sector_correlation(correlation)
+    
     def generate_correlated_shocks(self) -> Tuple[float, float, float]:
         """
         生成相关的随机冲击
@@ -127,7 +221,7 @@ class PriceGeneratorV2:
             其中 Corr(Z_m, Z_s) = ρ_ms
         """
         # 生成3个独立的标准正态随机数
-        z0, z1, z2 = np.random.normal(0, 1, size=3)
+        z0, z1, z2 = self.rng.normal(0, 1, size=3)
         
         # 市场冲击
         z_m = z0
@@ -219,7 +313,7 @@ class PriceGeneratorV2:
         previous_close: float,
     ) -> Tuple[float, float]:
         """
-        使用布朗桥近似生成High和Low
+        使用布朗桥近似生成High和Low (单只股票, 调用批量版本)
         
         Args:
             open_price: 开盘价
@@ -230,41 +324,360 @@ class PriceGeneratorV2:
         Returns:
             (high, low)
         """
-        # 路径点采样: x0=0, x1=u, x2=u+v, x3=R
-        # 其中 u,v ~ N(0, σ²)
+        highs, lows = self.generate_ohlc_brownian_bridge_batch(
+            open_prices=np.array([open_price], dtype=np.float64),
+            close_prices=np.array([close_price], dtype=np.float64),
+            log_returns=np.array([log_return], dtype=np.float64),
+            previous_closes=np.array([previous_close], dtype=np.float64),
+        )
+        return float(highs[0]), float(lows[0])
+    
+    def generate_ohlc_brownian_bridge_batch(
+        self,
+        open_prices: np.ndarray,
+        close_prices: np.ndarray,
+        log_returns: np.ndarray,
+        previous_closes: np.ndarray,
+        num_points: Optional[int] = None,
+        return_path: bool = False,
+    ):
+        """
+        批量布朗桥生成High和Low (N只股票 × k个中间点)
         
-        # 使用合成波动的一个比例作为中间波动
-        sigma_bridge = abs(log_return) * 0.5  # 简化估计
+        路径: x_0=0, x_1..x_k 为中间点, x_{k+1}=R
+            W_j = Σ ε_1..ε_j,  ε ~ N(0, σ_step²)
+            x_j = W_j + (j/(k+1))·(R - W_{k+1})   (端点固定在R)
+        σ_step = σ_bridge·√(3/(k+1)), k=2 时与原来的 u,v 采样尺度一致,
+        k 增大时只是把同一条路径采样得更细, 影线不会随k放大。
         
-        u = np.random.normal(0, sigma_bridge)
-        v = np.random.normal(0, sigma_bridge)
+        Args:
+            open_prices: 开盘价数组 (N,)
+            close_prices: 收盘价数组 (N,), 已限制
+            log_returns: 总对数收益数组 (N,)
+            previous_closes: 昨收价数组 (N,)
+            num_points: 中间点数量 k (默认 self.bridge_points)
+            return_path: 同时返回中间点价格路径
         
-        # 构造路径
-        path_points = [
-            0,           # x0: 开盘
-            u,           # x1: 中间点1
-            u + v,       # x2: 中间点2
-            log_return,  # x3: 收盘
-        ]
+        Returns:
+            (highs, lows) 两个 (N,) 数组;
+            return_path=True 时为 (highs, lows, price_path), price_path 为 (N, k)
+        """
+        open_prices = np.asarray(open_prices, dtype=np.float64)
+        close_prices = np.asarray(close_prices, dtype=np.float64)
+        log_returns = np.asarray(log_returns, dtype=np.float64)
+        previous_closes = np.asarray(previous_closes, dtype=np.float64)
+        n = open_prices.shape[0]
+        k = max(1, int(num_points or self.bridge_points))
+        steps = k + 1
+        
+        # 使用合成波动的一个比例作为中间波动 (简化估计)
+        sigma_bridge = np.abs(log_returns) * 0.5
+        sigma_step = sigma_bridge * np.sqrt(3.0 / steps)
+        
+        # N×(k+1) 随机游走, 再钉住终点得到布朗桥
+        walk = np.cumsum(
+            self.rng.standard_normal((n, steps)) * sigma_step[:, None], axis=1
+        )
+        fractions = np.arange(1, steps + 1, dtype=np.float64) / steps
+        bridge = walk + fractions[None, :] * (log_returns - walk[:, -1])[:, None]
+        
+        # 中间点价格路径 (N×k) + 涨跌停限制
+        price_path = open_prices[:, None] * np.exp(bridge[:, :-1])
+        price_path = np.clip(
+            price_path,
+            (previous_closes * (1 - self.PRICE_LIMIT_PCT))[:, None],
+            (previous_closes * (1 + self.PRICE_LIMIT_PCT))[:, None],
+        )
         
-        # 转换为价格路径
-        price_path = [open_price * np.exp(x) for x in path_points]
+        # 确保 high >= max(open, close) 和 low <= min(open, close)
+        highs = np.maximum(price_path.max(axis=1), np.maximum(open_prices, close_prices))
+        lows = np.minimum(price_path.min(axis=1), np.minimum(open_prices, close_prices))
         
-        # 应用涨跌停限制到每个点
-        price_path_limited = [
-            self.apply_price_limit(p, previous_close) 
-            for p in price_path
-        ]
+        if return_path:
+            return highs, lows, price_path
+        return highs, lows
+    
+    def generate_market_tick(
+        self,
+        current_prices: np.ndarray,
+        previous_closes: np.ndarray,
+        betas: np.ndarray,
+        sector_indices: np.ndarray,
+        volatilities: np.ndarray,
+        mu_m_daily: Optional[float] = None,
+        shock_returns: Optional[np.ndarray] = None,
+        steps: int = 1,
+    ) -> Dict[str, np.ndarray]:
+        """
+        全市场单步价格生成 (向量化版本)
         
-        # 取最高和最低
-        high = max(price_path_limited)
-        low = min(price_path_limited)
+        与 generate_next_price 使用相同的三层模型, 但一次numpy运算完成
+        所有股票, 不访问股票表。
         
-        # 确保 high >= max(open, close) 和 low <= min(open, close)
-        high = max(high, open_price, close_price)
-        low = min(low, open_price, close_price)
+        Args:
+            current_prices: 当前价格数组 (N,)
+            previous_closes: 昨收价数组 (N,)
+            betas: 股票市场Beta数组 (N,)
+            sector_indices: 板块下标数组 (N,), 见 sector_indices()
+            volatilities: 个股年化波动率数组 (N,)
+            mu_m_daily: 市场日均漂移 (None则读取当前市场状态)
+            shock_returns: 额外叠加的冲击对数收益 (N,), 见 ShockInjector
+            steps: 本步代表的基础步数 (tick 超时合并时 >1, 漂移和方差按步数放大)
+        
+        Returns:
+            字典, 每个值都是长度N的数组:
+            open/high/low/close/volume/turnover/previous_close/
+            change_value/change_pct/log_return/capped;
+            另有 path: (N, k) 布朗桥中间点价格 (指数引擎据此计算指数的真实高低点)
+        """
+        current_prices = np.asarray(current_prices, dtype=np.float64)
+        previous_closes = np.asarray(previous_closes, dtype=np.float64)
+        betas = np.asarray(betas, dtype=np.float64)
+        sector_indices = np.asarray(sector_indices, dtype=np.int64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        n = current_prices.shape[0]
+        
+        if mu_m_daily is None:
+            market_state = self.market_state_manager.get_current_state()
+            mu_m_daily = market_state["daily_trend"] if market_state else 0.0
+        
+        dt = self.dt * max(1, steps)
+        sqrt_dt = np.sqrt(dt)
+        
+        # 1. 共享相关冲击: 全市场1个 Z_m, 每板块1个 Z_s, 每只股票1个 Z_i
+        z_m, z_s_sector, z_i = self.shock_engine.draw(n)
+        z_s = z_s_sector[sector_indices]
+        
+        # 2. 三层对数收益
+        r_m = mu_m_daily * dt + self.sigma_m_day * sqrt_dt * z_m
+        r_s = self.sigma_s_day * sqrt_dt * z_s
+        sigma_i_day = volatilities / np.sqrt(self.TRADING_DAYS_PER_YEAR)
+        r_i = sigma_i_day * sqrt_dt * z_i
+        
+        sector_betas = self.sector_betas[sector_indices]
+        log_returns = (
+            self.MARKET_WEIGHT * betas * r_m +
+            self.SECTOR_WEIGHT * sector_betas * r_s +
+            self.INDIVIDUAL_WEIGHT * r_i
+        )
+        if shock_returns is not None:
+            log_returns = log_returns + shock_returns
+        
+        # 3. 价格更新 + 涨跌停限制 + 防止负价格
+        upper_limits = previous_closes * (1 + self.PRICE_LIMIT_PCT)
+        lower_limits = previous_closes * (1 - self.PRICE_LIMIT_PCT)
+        
+        new_prices_raw = current_prices * np.exp(log_returns)
+        new_prices = np.clip(new_prices_raw, lower_limits, upper_limits)
+        new_prices = np.maximum(new_prices, 0.01)
+        
+        # 4. 布朗桥生成 High/Low (N×k 中间点)
+        open_prices = current_prices
+        close_prices = new_prices
+        highs, lows, price_path = self.generate_ohlc_brownian_bridge_batch(
+            open_prices, close_prices, log_returns, previous_closes, return_path=True
+        )
+        
+        # 5. 涨跌
+        change_values = close_prices - previous_closes
+        safe_prev = np.where(previous_closes > 0, previous_closes, 1.0)
+        change_pcts = np.where(
+            previous_closes > 0, change_values / safe_prev * 100, 0.0
+        )
+        
+        # 6. 成交量和成交额 (简化模型)
+        base_volumes = 10000 + self.rng.poisson(5000, size=n)
+        volume_mult = 1.0 + np.abs(log_returns) * 50  # 波动大时成交量增加
+        volumes = (base_volumes * volume_mult).astype(np.int64)
+        turnovers = volumes * close_prices
+        
+        return {
+            "open": open_prices,
+            "high": highs,
+            "low": lows,
+            "close": close_prices,
+            "volume": volumes,
+            "turnover": turnovers,
+            "previous_close": previous_closes,
+            "change_value": change_values,
+            "change_pct": change_pcts,
+            "log_return": log_returns,
+            "capped": new_prices != new_prices_raw,
+            "path": price_path,
+        }
+    
+    def trading_minutes(self, start: datetime, end: datetime) -> List[Tuple[datetime, np.ndarray]]:
+        """
+        列出 [start, end) 内每个交易日的分钟时间戳 (跳过周末)
+        
+        Returns:
+            [(交易日, 该日分钟时间戳数组), ...]
+        """
+        days = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            if day.weekday() < 5:
+                minutes = []
+                for (h0, m0), (h1, m1) in self.TRADING_SESSIONS:
+                    t = day.replace(hour=h0, minute=m0)
+                    session_end = day.replace(hour=h1, minute=m1)
+                    while t < session_end:
+                        if start <= t < end:
+                            minutes.append(int(t.timestamp()))
+                        t += timedelta(minutes=1)
+                if minutes:
+                    days.append((day, np.array(minutes, dtype=np.int64)))
+            day += timedelta(days=1)
+        return days
+    
+    def simulate(
+        self,
+        start: datetime,
+        end: datetime,
+        step_seconds: int = 3,
+        current_prices: Optional[np.ndarray] = None,
+        previous_closes: Optional[np.ndarray] = None,
+        betas: Optional[np.ndarray] = None,
+        sector_indices: Optional[np.ndarray] = None,
+        volatilities: Optional[np.ndarray] = None,
+        bar_seconds: int = 60,
+        chunk_bars: int = 30,
+        regimes: Optional[List[Dict]] = None,
+    ) -> Iterator[Dict]:
+        """
+        快进模拟 [start, end) 内的全部交易时段, 按块产出分钟K线
+        
+        与 generate_market_tick 相同的三层模型, 但一个块内的 T 个tick
+        一次抽取冲击, 用 T×N 累加和得到价格路径:
+            x_t = log P_0 + Σ r_1..r_t
+        路径越过涨跌停的股票 (通常极少) 逐步重算, 结果与逐tick限制一致。
+        每个交易日按 MarketStateManager.simulate_states 的状态取市场漂移,
+        新交易日开始时昨收价滚动为上一日收盘价。
+        High/Low 取自分钟内的tick路径。
         
-        return high, low
+        Args:
+            start: 开始时间
+            end: 结束时间 (不含)
+            step_seconds: tick 间隔(秒)
+            current_prices: 起始价格数组 (N,)
+            previous_closes: 起始昨收价数组 (N,)
+            betas: 股票市场Beta数组 (N,)
+            sector_indices: 板块下标数组 (N,), 见 sector_indices()
+            volatilities: 个股年化波动率数组 (N,)
+            bar_seconds: K线周期(秒), 必须是 step_seconds 的整数倍
+            chunk_bars: 每块包含的K线数量
+            regimes: 逐交易日的市场状态 (默认由 MarketStateManager 模拟)
+        
+        Yields:
+            字典: timestamps (B,), state, open/high/low/close/volume/turnover/
+            change_pct/previous_close (B×N 或 N)
+        """
+        if bar_seconds % step_seconds != 0:
+            raise ValueError(
+                f"bar_seconds ({bar_seconds}) must be a multiple of step_seconds ({step_seconds})"
+            )
+        
+        prices = np.array(current_prices, dtype=np.float64)
+        prev_closes = np.array(previous_closes, dtype=np.float64)
+        betas = np.asarray(betas, dtype=np.float64)
+        sector_indices = np.asarray(sector_indices, dtype=np.int64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        n = prices.shape[0]
+        
+        steps_per_bar = bar_seconds // step_seconds
+        dt = step_seconds / (self.TRADING_MINUTES_PER_DAY * 60)
+        sqrt_dt = np.sqrt(dt)
+        
+        days = self.trading_minutes(start, end)
+        if regimes is None:
+            regimes = self.market_state_manager.simulate_states(len(days))
+        
+        # 与时间无关的系数
+        market_coef = self.MARKET_WEIGHT * betas
+        sector_coef = self.SECTOR_WEIGHT * self.sector_betas[sector_indices]
+        individual_coef = (
+            self.INDIVIDUAL_WEIGHT
+            * volatilities / np.sqrt(self.TRADING_DAYS_PER_YEAR)
+            * sqrt_dt
+        )
+        
+        for day_idx, (day, minutes) in enumerate(days):
+            # 昨收价滚动
+            if day_idx > 0:
+                prev_closes = prices.copy()
+            
+            regime = regimes[day_idx]
+            mu_m_daily = regime["daily_trend"]
+            log_lower = np.log(np.maximum(prev_closes * (1 - self.PRICE_LIMIT_PCT), 0.01))
+            log_upper = np.log(prev_closes * (1 + self.PRICE_LIMIT_PCT))
+            
+            for c0 in range(0, len(minutes), chunk_bars):
+                timestamps = minutes[c0:c0 + chunk_bars]
+                b = len(timestamps)
+                t = b * steps_per_bar
+                
+                # 1. T 个tick的共享冲击 + 三层对数收益 (T×N)
+                z_m, z_s, z_i = self.shock_engine.draw_path(t, n)
+                r_m = mu_m_daily * dt + self.sigma_m_day * sqrt_dt * z_m
+                r_s = self.sigma_s_day * sqrt_dt * z_s
+                log_returns = (
+                    r_m[:, None] * market_coef
+                    + r_s[:, sector_indices] * sector_coef
+                    + z_i * individual_coef
+                )
+                
+                # 2. 对数价格路径 (累加和)
+                x0 = np.log(prices)
+                path = x0 + np.cumsum(log_returns, axis=0)
+                
+                # 3. 触及涨跌停的股票逐tick限制
+                hit = ((path < log_lower) | (path > log_upper)).any(axis=0)
+                if hit.any():
+                    cols = np.flatnonzero(hit)
+                    x = x0[cols]
+                    lo, hi = log_lower[cols], log_upper[cols]
+                    sub_returns = log_returns[:, cols]
+                    sub_path = np.empty((t, len(cols)))
+                    for j in range(t):
+                        x = np.clip(x + sub_returns[j], lo, hi)
+                        sub_path[j] = x
+                    path[:, cols] = sub_path
+                
+                price_path = np.exp(path).reshape(b, steps_per_bar, n)
+                
+                # 4. 分钟K线
+                closes = price_path[:, -1, :]
+                opens = np.vstack([prices[None, :], closes[:-1]])
+                highs = np.maximum(price_path.max(axis=1), opens)
+                lows = np.minimum(price_path.min(axis=1), opens)
+                
+                # 5. 成交量: 每tick (10000 + Poisson(5000))·(1 + 50|r|) 在分钟内汇总
+                abs_returns = np.abs(log_returns).reshape(b, steps_per_bar, n)
+                base_volumes = 10000 * steps_per_bar + self.rng.poisson(
+                    5000 * steps_per_bar, size=(b, n)
+                )
+                volumes = (base_volumes * (1.0 + abs_returns.mean(axis=1) * 50)).astype(np.int64)
+                turnovers = volumes * closes
+                
+                safe_prev = np.where(prev_closes > 0, prev_closes, 1.0)
+                change_pcts = np.where(
+                    prev_closes > 0, (closes - prev_closes) / safe_prev * 100, 0.0
+                )
+                
+                prices = closes[-1].copy()
+                
+                yield {
+                    "timestamps": timestamps,
+                    "state": regime["state"],
+                    "open": opens,
+                    "high": highs,
+                    "low": lows,
+                    "close": closes,
+                    "volume": volumes,
+                    "turnover": turnovers,
+                    "change_pct": change_pcts,
+                    "previous_close": prev_closes,
+                }
     
     def generate_next_price(
         self, 
@@ -368,7 +781,7 @@ class PriceGeneratorV2:
             change_pct = (change_value / previous_close) * 100 if previous_close > 0 else 0
             
             # 生成成交量和成交额 (简化模型)
-            base_volume = 10000 + np.random.poisson(5000)
+            base_volume = 10000 + self.rng.poisson(5000)
             volume_mult = 1.0 + abs(log_return) * 50  # 波动大时成交量增加
             volume = int(base_volume * volume_mult)
             turnover = volume * close_price
@@ -0,0 +1,125 @@
+"""
+随机数服务 (RNG Service)
+
+所有价格生成器共用的随机数来源, 基于 numpy.random.Generator (PCG64)。
+
+- 一个根种子 (settings.MARKET_RNG_SEED) 决定整个会话的全部随机数
+- 每个用途按名字派生独立的随机流: get("price_v2"), get("price_generator", symbol)
+  派生只依赖 (根种子, 名字, 键), 与创建顺序无关
+- 分片/多进程: spawn(name, n) 用 SeedSequence.spawn 派生 n 个子种子,
+  子种子可以 pickle 传给工作进程, 在进程内用 generator_from() 还原
+
+同一个根种子 + 同样的分片数, 整个会话可以逐位复现。
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+import zlib
+import numpy as np
+
+Key = Union[int, str]
+
+
+def _stable_key(key: Key) -> int:
+    """把名字/代码转换为跨进程稳定的整数 (不使用会随机化的 hash())"""
+    if isinstance(key, str):
+        return zlib.crc32(key.encode("utf-8"))
+    return int(key)
+
+
+def generator_from(seed_sequence: np.random.SeedSequence) -> np.random.Generator:
+    """由 SeedSequence 构造 PCG64 生成器"""
+    return np.random.Generator(np.random.PCG64(seed_sequence))
+
+
+class RngService:
+    """随机数服务"""
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        初始化随机数服务
+
+        Args:
+            seed: 根种子 (None 则使用操作系统熵, 实际种子可通过 self.seed 读出并复现)
+        """
+        self._streams: Dict[Tuple[int, ...], np.random.Generator] = {}
+        self.reset(seed)
+
+    def reset(self, seed: Optional[int] = None):
+        """
+        重新设置根种子并丢弃所有已派生的随机流
+
+        Args:
+            seed: 根种子
+        """
+        self._root = np.random.SeedSequence(seed)
+        self.seed = self._root.entropy
+        self._streams.clear()
+
+    def seed_sequence(self, name: str, *keys: Key) -> np.random.SeedSequence:
+        """
+        按名字派生 SeedSequence (无状态, 同样的参数总是得到同样的结果)
+
+        Args:
+            name: 用途名, 如 "price_v2"
+            keys: 追加的键, 如股票代码、分片编号
+        """
+        spawn_key = (_stable_key(name),) + tuple(_stable_key(k) for k in keys)
+        return np.random.SeedSequence(self.seed, spawn_key=spawn_key)
+
+    def get(self, name: str, *keys: Key) -> np.random.Generator:
+        """
+        获取命名随机流 (同一进程内缓存, 多次调用返回同一个生成器)
+
+        Args:
+            name: 用途名
+            keys: 追加的键
+        """
+        cache_key = (_stable_key(name),) + tuple(_stable_key(k) for k in keys)
+        stream = self._streams.get(cache_key)
+        if stream is None:
+            stream = generator_from(self.seed_sequence(name, *keys))
+            self._streams[cache_key] = stream
+        return stream
+
+    def spawn(self, name: str, count: int) -> List[np.random.SeedSequence]:
+        """
+        为分片/工作进程派生子种子
+
+        第 i 个子种子与 seed_sequence(name, i) 相同, 因此分片 i 无论在哪个进程
+        中还原, 得到的随机流都一致。
+
+        Args:
+            name: 用途名
+            count: 分片/进程数量
+
+        Returns:
+            SeedSequence 列表 (可 pickle)
+        """
+        return self.seed_sequence(name).spawn(count)
+
+
+# 全局单例
+_rng_service: Optional[RngService] = None
+
+
+def get_rng_service() -> RngService:
+    """获取全局随机数服务 (根种子取自 settings.MARKET_RNG_SEED)"""
+    global _rng_service
+
+    if _rng_service is None:
+        from config import settings
+        _rng_service = RngService(settings.MARKET_RNG_SEED)
+
+    return _rng_service
+
+
+def init_rng_service(seed: Optional[int] = None) -> RngService:
+    """
+    用指定根种子重建全局随机数服务 (用于回放、基准测试和工作进程)
+
+    Args:
+        seed: 根种子
+    """
+    global _rng_service
+    _rng_service = RngService(seed)
+    return _rng_service
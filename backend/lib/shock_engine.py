@@ -0,0 +1,146 @@
+"""
+共享相关冲击引擎 (Correlated Shock Engine)
+
+每个tick只抽取:
+- 1 个市场冲击 Z_m          (全市场共享)
+- S 个板块冲击 Z_s[k]       (同板块股票共享)
+- N 个个股冲击 Z_i[j]       (各自独立)
+
+随机数从 3N 个降到 1+S+N 个, 并且同一板块的股票真正共享市场/板块层冲击,
+三层模型由此产生联动。
+
+板块冲击与市场冲击的相关系数为 ρ_ms:
+    Z_s = ρ_ms·Z_m + √(1-ρ_ms²)·(L·ε)
+其中 L 是板块相关矩阵的 Cholesky 因子 (未配置时为单位阵, 板块之间独立)。
+
+市场/板块冲击取自 common_rng, 个股冲击取自 rng: 分片运行时各分片使用相同的
+common_rng 种子, 因此所有分片看到同一组市场/板块冲击。
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.rng import get_rng_service
+
+
+class CorrelatedShockEngine:
+    """共享相关冲击引擎"""
+
+    def __init__(
+        self,
+        num_sectors: int,
+        rho_ms: float = 0.75,
+        sector_correlation: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None,
+        common_rng: Optional[np.random.Generator] = None,
+    ):
+        """
+        初始化冲击引擎
+
+        Args:
+            num_sectors: 板块数量 S
+            rho_ms: 市场-板块相关系数 ρ_ms
+            sector_correlation: 可选的 S×S 板块相关矩阵
+            rng: 个股冲击随机流 (默认取自全局随机数服务)
+            common_rng: 市场/板块冲击随机流 (默认取自全局随机数服务)
+        """
+        if not -1.0 <= rho_ms <= 1.0:
+            raise ValueError(f"rho_ms must be within [-1, 1], got {rho_ms}")
+
+        self.num_sectors = num_sectors
+        self.rho_ms = rho_ms
+        self._sector_scale = np.sqrt(1 - rho_ms**2)
+        self._cholesky: Optional[np.ndarray] = None
+
+        service = get_rng_service()
+        self.rng = rng or service.get("shock_engine")
+        self.common_rng = common_rng or service.get("shock_engine", "common")
+
+        if sector_correlation is not None:
+            self.set_sector_correlation(sector_correlation)
+
+    def set_sector_correlation(self, correlation: Optional[np.ndarray]):
+        """
+        设置板块相关矩阵并预计算 Cholesky 因子
+
+        Args:
+            correlation: S×S 对称正定矩阵, 对角线为1; None 表示板块之间独立
+
+        Raises:
+            ValueError: 矩阵形状不符或不是合法的相关矩阵
+        """
+        if correlation is None:
+            self._cholesky = None
+            return
+
+        correlation = np.asarray(correlation, dtype=np.float64)
+        expected = (self.num_sectors, self.num_sectors)
+        if correlation.shape != expected:
+            raise ValueError(
+                f"sector correlation must have shape {expected}, got {correlation.shape}"
+            )
+        if not np.allclose(correlation, correlation.T):
+            raise ValueError("sector correlation must be symmetric")
+        if not np.allclose(np.diag(correlation), 1.0):
+            raise ValueError("sector correlation must have a unit diagonal")
+
+        try:
+            self._cholesky = np.linalg.cholesky(correlation)
+        except np.linalg.LinAlgError as e:
+            raise ValueError(f"sector correlation is not positive definite: {e}")
+
+    def draw(self, num_stocks: int) -> Tuple[float, np.ndarray, np.ndarray]:
+        """
+        抽取一个tick的全部冲击 (公共流1次 + 个股流1次)
+
+        Args:
+            num_stocks: 股票数量 N
+
+        Returns:
+            (z_m, z_s, z_i)
+            - z_m: 市场冲击 (标量)
+            - z_s: 板块冲击 (S,), Corr(Z_m, Z_s[k]) = ρ_ms
+            - z_i: 个股冲击 (N,)
+        """
+        common = self.common_rng.standard_normal(1 + self.num_sectors)
+        z_i = self.rng.standard_normal(num_stocks)
+
+        z_m = float(common[0])
+        eps = common[1:]
+
+        if self._cholesky is not None:
+            eps = self._cholesky @ eps
+
+        z_s = self.rho_ms * z_m + self._sector_scale * eps
+
+        return z_m, z_s, z_i
+
+    def draw_path(self, num_steps: int, num_stocks: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        一次抽取 T 个tick的全部冲击 (快进模拟用)
+
+        Args:
+            num_steps: tick 数量 T
+            num_stocks: 股票数量 N
+
+        Returns:
+            (z_m, z_s, z_i)
+            - z_m: 市场冲击 (T,)
+            - z_s: 板块冲击 (T, S)
+            - z_i: 个股冲击 (T, N)
+        """
+        common = self.common_rng.standard_normal((num_steps, 1 + self.num_sectors))
+        z_i = self.rng.standard_normal((num_steps, num_stocks))
+
+        z_m = common[:, 0]
+        eps = common[:, 1:]
+
+        if self._cholesky is not None:
+            eps = eps @ self._cholesky.T
+
+        z_s = self.rho_ms * z_m[:, None] + self._sector_scale * eps
+
+        return z_m, z_s, z_i
@@ -0,0 +1,214 @@
+"""
+冲击注入器 (Shock Injector)
+
+用于市场演练 (板块暴跌、涨停潮等): 管理接口把冲击事件放入队列,
+tick 引擎在下一步把它们作为数组掩码叠加到对数收益上。
+
+- 目标: 全市场 (MARKET)、板块列表 (SECTOR) 或股票代码列表 (SYMBOLS)
+- magnitude: 首个tick叠加的对数收益 (例如 -0.05 ≈ -5%)
+- decay: 每个tick保留的比例 (0 表示只作用一个tick, 0.9 表示逐tick衰减10%)
+
+事件在被 tick 引擎取出时才按内存中的代码/板块下标解析为掩码 (不查询数据库),
+活跃事件保存为 K×N 掩码矩阵, 每个tick只需一次 amplitudes @ masks。
+叠加后的价格仍受涨跌停限制。
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+import uuid
+
+TARGET_MARKET = 'MARKET'
+TARGET_SECTOR = 'SECTOR'
+TARGET_SYMBOLS = 'SYMBOLS'
+TARGET_TYPES = (TARGET_MARKET, TARGET_SECTOR, TARGET_SYMBOLS)
+
+
+@dataclass
+class ShockEvent:
+    """冲击事件"""
+    target_type: str
+    magnitude: float
+    decay: float = 0.0
+    codes: List[str] = field(default_factory=list)
+    description: Optional[str] = None
+    event_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created_at: float = field(default_factory=time.time)
+    ticks_applied: int = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'event_id': self.event_id,
+            'target_type': self.target_type,
+            'codes': self.codes,
+            'magnitude': self.magnitude,
+            'decay': self.decay,
+            'description': self.description,
+            'created_at': self.created_at,
+            'ticks_applied': self.ticks_applied,
+        }
+
+
+class ShockInjector:
+    """冲击事件队列 + 活跃冲击的向量化叠加"""
+
+    # 振幅低于该值时事件结束
+    MIN_AMPLITUDE = 1e-5
+
+    # 单个事件最多作用的tick数
+    MAX_TICKS = 2400
+
+    # 单个事件的对数收益上限 (涨跌停之外再留余量)
+    MAX_MAGNITUDE = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: List[ShockEvent] = []
+        self._active: List[ShockEvent] = []
+        self._amplitudes = np.zeros(0)
+        self._masks = np.zeros((0, 0))
+
+    def submit(
+        self,
+        target_type: str,
+        magnitude: float,
+        decay: float = 0.0,
+        codes: Optional[List[str]] = None,
+        description: Optional[str] = None,
+        event_id: Optional[str] = None,
+    ) -> ShockEvent:
+        """
+        放入一个冲击事件 (下一个tick生效)
+
+        Args:
+            target_type: MARKET / SECTOR / SYMBOLS
+            magnitude: 首个tick的对数收益
+            decay: 每tick保留比例, [0, 1)
+            codes: SECTOR 时为板块代码, SYMBOLS 时为股票代码
+            description: 说明
+            event_id: 事件编号 (None 时自动生成; 转发的事件沿用 API 进程返回给客户端的编号)
+
+        Raises:
+            ValueError: 参数不合法
+        """
+        target_type = target_type.upper()
+        codes = list(codes or [])
+        if target_type not in TARGET_TYPES:
+            raise ValueError(f"target_type must be one of {TARGET_TYPES}, got {target_type}")
+        if target_type != TARGET_MARKET and not codes:
+            raise ValueError(f"{target_type} shock requires at least one code")
+        if not abs(magnitude) <= self.MAX_MAGNITUDE:
+            raise ValueError(f"magnitude must be within ±{self.MAX_MAGNITUDE}, got {magnitude}")
+        if not 0.0 <= decay < 1.0:
+            raise ValueError(f"decay must be within [0, 1), got {decay}")
+
+        event = ShockEvent(
+            target_type=target_type,
+            magnitude=float(magnitude),
+            decay=float(decay),
+            codes=codes if target_type != TARGET_MARKET else [],
+            description=description,
+        )
+        if event_id:
+            event.event_id = str(event_id)
+        with self._lock:
+            self._pending.append(event)
+        return event
+
+    def clear(self) -> int:
+        """取消全部排队和活跃的事件, 返回取消数量"""
+        with self._lock:
+            count = len(self._pending) + len(self._active)
+            self._pending = []
+            self._active = []
+            self._amplitudes = np.zeros(0)
+            self._masks = np.zeros((0, 0))
+        return count
+
+    def list_events(self) -> Dict[str, List[Dict]]:
+        """排队和活跃的事件"""
+        with self._lock:
+            active = []
+            for event, amplitude in zip(self._active, self._amplitudes):
+                info = event.to_dict()
+                info['current_amplitude'] = float(amplitude)
+                active.append(info)
+            return {
+                'pending': [event.to_dict() for event in self._pending],
+                'active': active,
+            }
+
+    def _build_mask(self, event: ShockEvent, arena) -> np.ndarray:
+        """按内存中的代码/板块下标把事件解析为 (N,) 掩码"""
+        mask = np.zeros(arena.size)
+        if event.target_type == TARGET_MARKET:
+            mask[:] = 1.0
+        elif event.target_type == TARGET_SECTOR:
+            sector_ids = [arena.sector_ids[c] for c in event.codes if c in arena.sector_ids]
+            mask[np.isin(arena.stock_sector_ids, sector_ids)] = 1.0
+        else:
+            stock_ids = [arena.symbol_ids[s] for s in event.codes if s in arena.symbol_ids]
+            mask[stock_ids] = 1.0
+        return mask
+
+    def next_returns(self, arena) -> Optional[np.ndarray]:
+        """
+        取出本tick的冲击对数收益 (tick 引擎每步调用一次)
+
+        Args:
+            arena: 内存市场状态 (提供 size/symbol_ids/sector_ids/stock_sector_ids)
+
+        Returns:
+            (N,) 对数收益数组; 没有活跃事件时返回 None
+        """
+        with self._lock:
+            if not self._pending and not self._active:
+                return None
+
+            n = arena.size
+            if self._masks.shape[1:] != (n,):
+                # 股票集合变化 (arena 重新加载): 重新解析活跃事件
+                self._masks = np.array(
+                    [self._build_mask(e, arena) for e in self._active]
+                ).reshape(len(self._active), n)
+
+            if self._pending:
+                new_masks = np.array([self._build_mask(e, arena) for e in self._pending])
+                self._masks = np.vstack([self._masks, new_masks.reshape(len(self._pending), n)])
+                self._amplitudes = np.concatenate(
+                    [self._amplitudes, [e.magnitude for e in self._pending]]
+                )
+                self._active.extend(self._pending)
+                self._pending = []
+
+            returns = self._amplitudes @ self._masks
+
+            # 衰减并移除结束的事件
+            decays = np.array([e.decay for e in self._active])
+            for event in self._active:
+                event.ticks_applied += 1
+            self._amplitudes = self._amplitudes * decays
+            ticks = np.array([e.ticks_applied for e in self._active])
+            alive = (np.abs(self._amplitudes) >= self.MIN_AMPLITUDE) & (ticks < self.MAX_TICKS)
+            if not alive.all():
+                self._active = [e for e, keep in zip(self._active, alive) if keep]
+                self._amplitudes = self._amplitudes[alive]
+                self._masks = self._masks[alive]
+
+            return returns
+
+
+# 全局单例
+_shock_injector: Optional[ShockInjector] = None
+
+
+def get_shock_injector() -> ShockInjector:
+    """获取全局冲击注入器"""
+    global _shock_injector
+
+    if _shock_injector is None:
+        _shock_injector = ShockInjector()
+
+    return _shock_injector
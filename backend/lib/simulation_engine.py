@@ -0,0 +1,282 @@
+"""
+常驻模拟引擎 (Simulation Engine)
+
+在 FastAPI lifespan (嵌入模式) 或独立模拟器进程中创建一次, 跨 tick 保持:
+- 价格生成器 (板块缓存、冲击引擎、随机流)
+- 市场状态管理器 (当前市场状态缓存)
+- 内存市场状态、成交量引擎、增量指数引擎
+- 股票/指数的分钟K线累加器
+
+每个 tick 只做数组运算, 不再重新构造 DatabaseManager / PriceGeneratorV2,
+也不再查询配置表。配置表 (sectors、stock_metadata、indices、index_constituents、
+market_states) 变化后调用 reload() 显式重新加载。
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import settings
+from lib.db_manager_sqlite import DatabaseManager, get_db_manager
+from lib.index_divisor import ensure_index_divisors
+from lib.index_engine import IndexEngine
+from lib.index_rebalance import rebalance_from_arena
+from lib.market_arena import MarketArena, get_market_arena
+from lib.market_state_manager import MarketStateManager, get_market_state_manager
+from lib.minute_bar import MinuteBarAccumulator
+from lib.persistence_writer import get_persistence_writer
+from lib.price_generator_v2 import PriceGeneratorV2
+from lib.shock_injector import ShockInjector, get_shock_injector
+from lib.tick_clock import TickInfo
+from lib.volume_engine import VolumeEngine
+
+
+class SimulationEngine:
+    """跨 tick 常驻的模拟引擎"""
+
+    STEPS_PER_DAY = 4800  # 3秒/步
+
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        arena: Optional[MarketArena] = None,
+        market_state_manager: Optional[MarketStateManager] = None,
+        shock_injector: Optional[ShockInjector] = None,
+    ):
+        self.db_manager = db_manager or get_db_manager()
+        self.arena = arena or get_market_arena()
+        self.market_state_manager = market_state_manager or get_market_state_manager()
+        self.shock_injector = shock_injector or get_shock_injector()
+
+        self.price_generator = PriceGeneratorV2(
+            self.db_manager,
+            market_state_manager=self.market_state_manager,
+            steps_per_day=self.STEPS_PER_DAY,
+            bridge_points=settings.PRICE_BRIDGE_POINTS,
+        )
+        self.volume_engine: Optional[VolumeEngine] = None
+        self.index_engine: Optional[IndexEngine] = None
+
+        # 分钟K线累加器 (每个代码每分钟只写一次 price_data)
+        self.stock_bars = MinuteBarAccumulator()
+        self.index_bars = MinuteBarAccumulator()
+
+        # 最近一次股票 tick (指数引擎使用其中的布朗桥路径)
+        self.last_stock_tick: Optional[Dict[str, np.ndarray]] = None
+
+        self.reloads = 0
+
+    # ------------------------------------------------------------------
+    # 缓存
+    # ------------------------------------------------------------------
+
+    def warm(self):
+        """补齐指数除数, 加载内存状态并构建依赖股票/指数列表的缓存"""
+        if ensure_index_divisors(self.db_manager) and self.arena.loaded:
+            self.arena.load()
+        self.arena.ensure_loaded()
+        self._build_caches()
+
+    def _build_caches(self):
+        self.volume_engine = VolumeEngine.from_arena(self.arena, steps_per_day=self.STEPS_PER_DAY)
+
+        self.index_engine = IndexEngine(
+            self.arena, full_recompute_interval=settings.INDEX_FULL_RECOMPUTE_TICKS
+        )
+
+    def reload(self):
+        """
+        配置表变化后重新加载 (板块、股票元数据、指数和成分股、市场状态)
+
+        先提交进行中的分钟K线并同步写回内存价格, 为缺少份额的指数重新计算除数
+        (按写回的点位保持连续), 再从数据库重新加载内存状态和全部缓存。
+        """
+        self.flush_bars()
+        self.arena.flush()
+        ensure_index_divisors(self.db_manager)
+        self.arena.load()
+        self.price_generator.reload_sectors()
+        self.market_state_manager.reload()
+        self._build_caches()
+        self.reloads += 1
+        print(f"[+] SimulationEngine reloaded ({self.arena.size} stocks, "
+              f"{self.index_engine.num_indices} indices)")
+
+    def rebalance_indices(self, effective_from: Optional[int] = None) -> Dict[str, int]:
+        """
+        按实时市值调整全部指数成分股 (定期任务调用, 不停止 tick)
+
+        新版本写入 index_constituent_snapshots 和 index_constituents, 除数按当前点位
+        保持连续; 之后只重新加载内存中的成分股并重建指数引擎, 价格和当日 OHLC 不变。
+
+        Args:
+            effective_from: 新版本生效时间 (默认当前时间)
+
+        Returns:
+            {index_code: 成分股数量}
+        """
+        counts = rebalance_from_arena(self.db_manager, self.arena, effective_from)
+        if counts:
+            self.arena.reload_index_members()
+            self.index_engine.rebuild()
+        print(f"[+] Rebalanced {len(counts)} indices ({sum(counts.values())} constituents)")
+        return counts
+
+    # ------------------------------------------------------------------
+    # tick
+    # ------------------------------------------------------------------
+
+    def step_stocks(self, tick_info: Optional[TickInfo] = None) -> int:
+        """
+        批量生成所有股票的新价格, 并累加到分钟K线
+
+        直接读取内存中的市场状态, 通过 generate_market_tick 向量化生成新价格。
+        stocks 表由 flush_market_arena 任务异步写回; price_data 只在分钟切换时
+        写入上一分钟的定稿K线。
+
+        Args:
+            tick_info: 本步序号和计划时间 (None 表示当前时间的单步)
+
+        Returns:
+            更新的股票数量
+        """
+        arena = self.arena
+        if arena.size == 0:
+            return 0
+
+        # tick 计划时间的分钟级时间戳 (秒数归零); 按计划时间而不是执行时间, 避免漂移
+        steps = tick_info.steps if tick_info else 1
+        now = datetime.fromtimestamp(tick_info.scheduled_time) if tick_info else datetime.now()
+        timestamp_minute = int(now.replace(second=0, microsecond=0).timestamp())
+
+        # 全市场一次生成
+        tick = self.price_generator.generate_market_tick(
+            current_prices=arena.prices,
+            previous_closes=arena.previous_closes,
+            betas=arena.betas,
+            sector_indices=arena.stock_sector_ids,
+            volatilities=arena.volatilities,
+            shock_returns=self.shock_injector.next_returns(arena),
+            steps=steps,
+        )
+
+        # 成交量/成交额: 向量化成交量引擎, 累加到当日总量 (随内存状态一起写回)
+        if self.volume_engine is None or self.volume_engine.size != arena.size:
+            self.volume_engine = VolumeEngine.from_arena(arena, steps_per_day=self.STEPS_PER_DAY)
+        tick['volume'], tick['turnover'] = self.volume_engine.generate(
+            tick['log_return'], tick['close'], now, steps=steps
+        )
+
+        arena.apply_tick(tick)
+        self.last_stock_tick = tick
+        arena.add_volume(tick['volume'], tick['turnover'], now.date())
+
+        # 累加到分钟K线, 进入新分钟时提交上一分钟的定稿K线
+        finished = self.stock_bars.update(
+            timestamp_minute,
+            tick['open'], tick['high'], tick['low'], tick['close'],
+            tick['change_pct'], tick['volume'], tick['turnover'],
+        )
+        if finished:
+            submit_minute_bars('STOCK', arena.symbols, finished)
+
+        return arena.size
+
+    def step_indices(self, tick_info: Optional[TickInfo] = None) -> int:
+        """
+        批量计算所有指数的新值, 并累加到分钟K线
+
+        收盘点位由增量指数引擎计算 (只对价格变化的成分股累加 q × Δp);
+        开盘为上一tick收盘, 最高/最低取成分股布朗桥路径 × 权重矩阵上的极值。
+        全部在内存中完成, 不查询数据库; indices 表由 flush_market_arena 写回。
+
+        Args:
+            tick_info: 本步序号和计划时间 (None 表示当前时间)
+
+        Returns:
+            更新的指数数量
+        """
+        arena = self.arena
+
+        # tick 计划时间的分钟级时间戳
+        now = datetime.fromtimestamp(tick_info.scheduled_time) if tick_info else datetime.now()
+        timestamp_minute = int(now.replace(second=0, microsecond=0).timestamp())
+
+        tick = self.last_stock_tick
+        path = tick.get('path') if tick is not None else None
+        bar = self.index_engine.step(path, now.date())
+
+        # 没有成分股的指数保持原值
+        previous_values = arena.index_values
+        updated = ~np.isnan(bar['close'])
+        new_values = np.where(updated, bar['close'], previous_values)
+        open_values = np.where(updated, bar['open'], previous_values)
+        highs = np.where(updated, bar['high'], previous_values)
+        lows = np.where(updated, bar['low'], previous_values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_pcts = np.where(
+                updated & (open_values > 0),
+                (new_values - open_values) / open_values * 100,
+                arena.index_change_pcts,
+            )
+        updated_count = int(np.count_nonzero(updated))
+
+        arena.set_index_values(new_values, change_pcts)
+
+        # 滚动分钟K线: 分钟内合并, 进入新分钟时定稿一次
+        finished = self.index_bars.update(
+            timestamp_minute,
+            open_values,
+            highs,
+            lows,
+            new_values,
+            change_pcts,
+        )
+        if finished:
+            submit_minute_bars('INDEX', arena.index_codes, finished)
+
+        return updated_count
+
+    def flush_bars(self):
+        """提交进行中的分钟K线 (关闭或重新加载时调用, 避免丢失最后一分钟)"""
+        bar = self.stock_bars.finalize()
+        if bar:
+            submit_minute_bars('STOCK', self.arena.symbols, bar)
+        bar = self.index_bars.finalize()
+        if bar:
+            submit_minute_bars('INDEX', self.arena.index_codes, bar)
+
+
+def submit_minute_bars(target_type: str, codes, bar: dict) -> bool:
+    """
+    把一分钟的定稿K线放入持久化队列 (由写入线程写入 price_data, tick 不等待磁盘)
+
+    Args:
+        target_type: 'STOCK' 或 'INDEX'
+        codes: 与K线数组对齐的代码列表
+        bar: MinuteBarAccumulator 返回的定稿K线
+
+    Returns:
+        是否入队
+    """
+    bars = {key: value[None, :] for key, value in bar.items() if key != 'minute'}
+    bars['timestamps'] = [bar['minute']]
+    return get_persistence_writer().submit_bars(target_type, codes, bars)
+
+
+# 全局单例
+_simulation_engine: Optional[SimulationEngine] = None
+
+
+def get_simulation_engine() -> SimulationEngine:
+    """获取全局模拟引擎 (首次调用时创建并预热)"""
+    global _simulation_engine
+
+    if _simulation_engine is None:
+        _simulation_engine = SimulationEngine()
+        _simulation_engine.warm()
+
+    return _simulation_engine
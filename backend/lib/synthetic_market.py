@@ -0,0 +1,284 @@
+"""
+合成大规模市场 (Synthetic Large Universe)
+
+为规模测试生成 N 只合成股票, 分布取自现有的股票定义:
+- 板块: SECTOR_DATA 中的板块, 按 STOCK_DEFINITIONS 各板块股票数量的比例抽样
+- 市值: 各板块市值的对数正态拟合 (市值分档由 get_market_cap_tier 确定)
+- Beta/波动率: 各板块的均值和标准差, 截断在板块区间 (略放宽) 与表约束内
+- 初始价格: 与 insert_stocks_to_db 相同的按市值分段规则
+- 代码: 不重复的6位数字
+
+并按定期调整的规则 (lib.index_rebalance.select_constituents) 生成匹配的指数成分股,
+首次调整不会大幅替换初始成分股:
+- HAPPY300: 市值前100; HAPPY50: 市值前50
+- GROW100: 成长板块中 Beta>=1 的股票市值前50
+- 行业指数: 本板块市值前K只
+市值按 价格 × 流通股本 计算, 权重按市值加权, 单只上限10%。
+
+load_synthetic_market 在一个全新的数据库中建表, 然后在一个事务内批量写入全部数据。
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.data_initializer_sqlite import STOCK_DEFINITIONS, get_market_cap_tier
+from lib.index_divisor import rebalance_indices
+from lib.index_rebalance import cap_weights, select_constituents
+from lib.rng import get_rng_service
+from lib.virtual_market_data import SECTOR_DATA
+
+SCHEMA_PATH = Path(__file__).parent.parent.parent / "sql_scripts" / "init_virtual_market_sqlite.sql"
+
+# 表约束 (stock_metadata)
+BETA_RANGE = (0.5, 2.0)
+VOLATILITY_RANGE = (0.01, 1.0)
+
+# 单一板块样本太少时的最小对数标准差 / 区间放宽量
+MIN_LOG_CAP_STD = 0.5
+PROFILE_MARGIN = 0.1
+
+# 市值下限 (2亿)
+MIN_MARKET_CAP = 2_0000_0000
+
+
+def sector_profiles() -> Dict[str, Dict]:
+    """
+    由 STOCK_DEFINITIONS 计算各板块的抽样参数
+
+    Returns:
+        {sector_code: {'share', 'log_cap_mean', 'log_cap_std', 'beta_mean', 'beta_std',
+                       'beta_range', 'vol_mean', 'vol_std', 'vol_range'}}
+    """
+    sector_codes = [s['code'] for s in SECTOR_DATA]
+    counts = {code: len(STOCK_DEFINITIONS.get(code, [])) for code in sector_codes}
+    total = sum(counts.values()) or 1
+
+    profiles = {}
+    for code in sector_codes:
+        definitions = STOCK_DEFINITIONS.get(code, [])
+        if not definitions:
+            continue
+
+        log_caps = np.log([d[2] for d in definitions])
+        betas = np.array([d[3] for d in definitions], dtype=np.float64)
+        vols = np.array([d[4] for d in definitions], dtype=np.float64)
+
+        profiles[code] = {
+            'share': counts[code] / total,
+            'log_cap_mean': float(log_caps.mean()),
+            'log_cap_std': max(float(log_caps.std()), MIN_LOG_CAP_STD),
+            'beta_mean': float(betas.mean()),
+            'beta_std': float(betas.std()),
+            'beta_range': (
+                max(BETA_RANGE[0], float(betas.min()) * (1 - PROFILE_MARGIN)),
+                min(BETA_RANGE[1], float(betas.max()) * (1 + PROFILE_MARGIN)),
+            ),
+            'vol_mean': float(vols.mean()),
+            'vol_std': float(vols.std()),
+            'vol_range': (
+                max(VOLATILITY_RANGE[0], float(vols.min()) * (1 - PROFILE_MARGIN)),
+                min(VOLATILITY_RANGE[1], float(vols.max()) * (1 + PROFILE_MARGIN)),
+            ),
+        }
+    return profiles
+
+
+def _initial_prices(market_caps: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """按市值分段抽取初始价格 (与 insert_stocks_to_db 相同)"""
+    n = len(market_caps)
+    low = np.where(market_caps >= 100_0000_0000, 50.0, np.where(market_caps >= 30_0000_0000, 20.0, 10.0))
+    high = np.where(market_caps >= 100_0000_0000, 200.0, np.where(market_caps >= 30_0000_0000, 80.0, 40.0))
+    return np.round(low + (high - low) * rng.random(n), 2)
+
+
+def generate_universe(num_stocks: int, rng: Optional[np.random.Generator] = None) -> Dict:
+    """
+    生成 N 只合成股票
+
+    Args:
+        num_stocks: 股票数量 (最多 1,000,000)
+        rng: 随机流 (默认取自全局随机数服务)
+
+    Returns:
+        按市值降序排列的数组字典:
+        symbols, names, sector_codes, market_caps (int64), market_cap_tiers,
+        prices, betas, volatilities, outstanding_shares (int64)
+    """
+    if not 0 < num_stocks <= 1_000_000:
+        raise ValueError(f"num_stocks must be within [1, 1000000], got {num_stocks}")
+
+    rng = rng or get_rng_service().get("synthetic_market")
+    profiles = sector_profiles()
+    codes = list(profiles)
+    shares = np.array([profiles[c]['share'] for c in codes])
+
+    sector_ids = rng.choice(len(codes), size=num_stocks, p=shares / shares.sum())
+
+    log_caps = np.empty(num_stocks)
+    betas = np.empty(num_stocks)
+    vols = np.empty(num_stocks)
+    for k, code in enumerate(codes):
+        mask = sector_ids == k
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        p = profiles[code]
+        log_caps[mask] = rng.normal(p['log_cap_mean'], p['log_cap_std'], count)
+        betas[mask] = np.clip(rng.normal(p['beta_mean'], p['beta_std'], count), *p['beta_range'])
+        vols[mask] = np.clip(rng.normal(p['vol_mean'], p['vol_std'], count), *p['vol_range'])
+
+    market_caps = np.maximum(np.exp(log_caps), MIN_MARKET_CAP).astype(np.int64)
+    prices = _initial_prices(market_caps, rng)
+    outstanding_shares = (market_caps / prices).astype(np.int64)
+
+    symbol_numbers = rng.choice(1_000_000, size=num_stocks, replace=False)
+
+    order = np.argsort(-market_caps, kind='stable')
+    sector_codes = np.array(codes, dtype=object)[sector_ids[order]].tolist()
+    symbols = [f"{int(x):06d}" for x in symbol_numbers[order]]
+    market_caps = market_caps[order]
+
+    return {
+        'symbols': symbols,
+        'names': [f"{code}{symbol}" for code, symbol in zip(sector_codes, symbols)],
+        'sector_codes': sector_codes,
+        'market_caps': market_caps,
+        'market_cap_tiers': [get_market_cap_tier(int(c)) for c in market_caps],
+        'prices': prices[order],
+        'betas': np.round(betas[order], 2),
+        'volatilities': np.round(vols[order], 4),
+        'outstanding_shares': outstanding_shares[order],
+    }
+
+
+def universe_market_caps(universe: Dict) -> np.ndarray:
+    """合成股票的市值 (价格 × 流通股本, 与模拟器的实时市值一致)"""
+    return universe['prices'] * universe['outstanding_shares']
+
+
+def build_index_constituents(universe: Dict, index_sizes: Dict[str, int]) -> Dict[str, List[int]]:
+    """
+    按定期调整的规则选择成分股
+
+    Args:
+        universe: generate_universe 的结果
+        index_sizes: {index_code: 目标成分股数量} (来自 indices.constituent_count)
+
+    Returns:
+        {index_code: 成分股在 universe 中的下标列表 (按市值降序)}
+    """
+    return select_constituents(
+        index_sizes, universe['sector_codes'], universe['betas'], universe_market_caps(universe)
+    )
+
+
+def load_synthetic_market(db_path: str, num_stocks: int, rng: Optional[np.random.Generator] = None) -> Dict:
+    """
+    创建全新数据库并在一个事务内写入合成股票、元数据、指数成分股和市场状态
+
+    Args:
+        db_path: 数据库文件路径 (已存在时报错, 避免覆盖真实数据)
+        num_stocks: 股票数量
+        rng: 随机流 (默认取自全局随机数服务)
+
+    Returns:
+        {'stocks': 股票数, 'constituents': 成分股行数, 'indices': {index_code: 成分股数}}
+    """
+    if Path(db_path).exists():
+        raise FileExistsError(f"database already exists: {db_path}")
+
+    universe = generate_universe(num_stocks, rng)
+    symbols = universe['symbols']
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+        index_sizes = {
+            row[0]: row[1] for row in conn.execute("SELECT code, constituent_count FROM indices")
+        }
+        members = build_index_constituents(universe, index_sizes)
+
+        market_caps = universe_market_caps(universe)
+        weights = {
+            code: cap_weights(market_caps[idx]) if idx else np.zeros(0)
+            for code, idx in members.items()
+        }
+        happy300_weights = dict(zip(members.get('HAPPY300', []), weights.get('HAPPY300', [])))
+
+        prices = universe['prices'].tolist()
+        conn.execute("BEGIN")
+        conn.executemany(
+            """
+            INSERT INTO stocks (symbol, name, sector_code, current_price, previous_close,
+                                change_value, change_pct, volume, turnover, is_active)
+            VALUES (?, ?, ?, ?, ?, 0, 0, 0, 0, 1)
+            """,
+            zip(symbols, universe['names'], universe['sector_codes'], prices, prices),
+        )
+        conn.executemany(
+            """
+            INSERT INTO stock_metadata (symbol, market_cap, market_cap_tier, beta, volatility,
+                                        outstanding_shares, is_happy300, weight_in_happy300)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (
+                    symbols[i],
+                    int(universe['market_caps'][i]),
+                    universe['market_cap_tiers'][i],
+                    float(universe['betas'][i]),
+                    float(universe['volatilities'][i]),
+                    int(universe['outstanding_shares'][i]),
+                    1 if i in happy300_weights else 0,
+                    round(float(happy300_weights[i]), 6) if i in happy300_weights else None,
+                )
+                for i in range(len(symbols))
+            ),
+        )
+
+        total_constituents = 0
+        for code, idx in members.items():
+            conn.executemany(
+                """
+                INSERT INTO index_constituents (index_code, stock_symbol, weight, rank)
+                VALUES (?, ?, ?, ?)
+                """,
+                (
+                    (code, symbols[i], round(float(w), 6), rank)
+                    for rank, (i, w) in enumerate(zip(idx, weights[code]), 1)
+                ),
+            )
+            total_constituents += len(idx)
+
+        conn.executemany(
+            "UPDATE indices SET constituent_count = ? WHERE code = ?",
+            [(len(idx), code) for code, idx in members.items()],
+        )
+        # 编制指数份额和除数 (当前点位 = 基点)
+        rebalance_indices(conn.cursor(), list(members))
+        conn.execute(
+            """
+            INSERT INTO market_states (state, start_time, daily_trend, volatility_multiplier,
+                                       description, is_current)
+            VALUES ('SIDEWAYS', ?, 0.0, 1.0, 'synthetic', 1)
+            """,
+            (now,),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {
+        'stocks': len(symbols),
+        'constituents': total_constituents,
+        'indices': {code: len(idx) for code, idx in members.items()},
+    }
@@ -18,6 +18,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from lib.db_manager_sqlite import DatabaseManager
 from lib.market_state_manager import MarketStateManager
+from lib.rng import get_rng_service
 
 
 class ThreeLayerPriceGenerator:
@@ -35,6 +36,7 @@ class ThreeLayerPriceGenerator:
         self,
         db_manager: Optional[DatabaseManager] = None,
         market_state_manager: Optional[MarketStateManager] = None,
+        rng: Optional[np.random.Generator] = None,
     ):
         """
         初始化三层价格生成器
@@ -42,11 +44,13 @@ class ThreeLayerPriceGenerator:
         Args:
             db_manager: 数据库管理器
             market_state_manager: 市场状态管理器
+            rng: 随机流 (默认取自全局随机数服务)
         """
         self.db_manager = db_manager or DatabaseManager()
         self.market_state_manager = market_state_manager or MarketStateManager(
             self.db_manager
         )
+        self.rng = rng or get_rng_service().get("three_layer")
 
         # 缓存板块数据
         self._sector_cache: Dict[str, Dict] = {}
@@ -97,7 +101,7 @@ class ThreeLayerPriceGenerator:
         sector_base_trend = market_trend * sector_beta
 
         # 添加板块特有噪声（小幅）
-        sector_noise = np.random.normal(0, 0.0005)  # 0.05%标准差
+        sector_noise = self.rng.normal(0, 0.0005)  # 0.05%标准差
 
         return sector_base_trend + sector_noise
 
@@ -131,7 +135,7 @@ class ThreeLayerPriceGenerator:
 
         # 3. 计算个股GBM波动
         dt = 1 / (240 * 250)  # 1分钟 / (每天240分钟 × 每年250交易日)
-        individual_shock = base_volatility * np.sqrt(dt) * np.random.normal(0, 1)
+        individual_shock = base_volatility * np.sqrt(dt) * self.rng.normal(0, 1)
 
         # 4. 三层合成
         # 市场影响 = 市场趋势 × 股票Beta × 时间步长 × 市场权重
@@ -235,10 +239,10 @@ class ThreeLayerPriceGenerator:
             # High/Low根据波动生成
             volatility_range = abs(new_price - current_price) * 0.5
             high_price = max(open_price, close_price) + abs(
-                np.random.normal(0, volatility_range)
+                self.rng.normal(0, volatility_range)
             )
             low_price = min(open_price, close_price) - abs(
-                np.random.normal(0, volatility_range)
+                self.rng.normal(0, volatility_range)
             )
 
             # 确保OHLC约束
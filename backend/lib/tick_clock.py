@@ -0,0 +1,186 @@
+"""
+无漂移 tick 时钟 (Tick Clock)
+
+第 k 个tick的计划时间固定为 anchor + k × interval (单调时钟计时),
+与任务耗时无关, 因此不会随运行时间漂移。每个tick带有递增的序号 seq
+和计划时间 scheduled_time, 下游可据此发现缺口。
+
+一次 tick 运行超过间隔 (overrun) 时, 错过的步数按追赶策略处理:
+- skip:     直接跳到当前应执行的序号, 错过的序号成为缺口
+- coalesce: 用一个合并步代表全部错过的步数 (steps>1, 方差按步数放大)
+- burst:    用向量化引擎逐步补算错过的步 (最多 max_catchup 步, 其余跳过)
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+POLICY_SKIP = 'skip'
+POLICY_COALESCE = 'coalesce'
+POLICY_BURST = 'burst'
+CATCHUP_POLICIES = (POLICY_SKIP, POLICY_COALESCE, POLICY_BURST)
+
+
+@dataclass
+class TickInfo:
+    """一次价格步的序号和计划时间"""
+    seq: int
+    scheduled_time: float  # 计划时间 (Unix 时间戳, 秒)
+    steps: int = 1  # 合并的基础步数 (coalesce 时 >1)
+    first_seq: Optional[int] = None  # 本步覆盖的第一个序号 (合并/补算时小于 seq)
+
+    def __post_init__(self):
+        if self.first_seq is None:
+            self.first_seq = self.seq
+
+
+class TickClock:
+    """单调、无漂移的 tick 时钟"""
+
+    def __init__(self, interval: float = 3.0, policy: str = POLICY_COALESCE, max_catchup: int = 20):
+        """
+        初始化时钟
+
+        Args:
+            interval: tick 间隔(秒)
+            policy: 追赶策略 skip / coalesce / burst
+            max_catchup: burst 策略单次最多补算的步数
+
+        Raises:
+            ValueError: 参数不合法
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        if policy not in CATCHUP_POLICIES:
+            raise ValueError(f"policy must be one of {CATCHUP_POLICIES}, got {policy}")
+
+        self.interval = interval
+        self.policy = policy
+        self.max_catchup = max(1, max_catchup)
+
+        self.seq = 0
+        self._anchor_monotonic: Optional[float] = None
+        self._anchor_wall: Optional[float] = None
+        self._running = False
+
+        self.ticks_run = 0
+        self.overruns = 0
+        self.skipped_steps = 0
+        self.coalesced_steps = 0
+        self.burst_steps = 0
+        self.errors = 0
+        self.last_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def start(self):
+        """以当前时刻为锚点 (seq 0) 开始计时"""
+        self._anchor_monotonic = time.monotonic()
+        self._anchor_wall = time.time()
+        self.seq = 0
+
+    def scheduled_time(self, seq: int) -> float:
+        """序号 seq 的计划时间 (Unix 时间戳)"""
+        return self._anchor_wall + seq * self.interval
+
+    def _deadline(self, seq: int) -> float:
+        return self._anchor_monotonic + seq * self.interval
+
+    def _due_seq(self) -> int:
+        """当前时刻应执行到的最大序号"""
+        return int(math.floor((time.monotonic() - self._anchor_monotonic) / self.interval))
+
+    def plan(self, next_seq: int, due_seq: int) -> List[TickInfo]:
+        """
+        按追赶策略为 [next_seq, due_seq] 生成本次要执行的步
+
+        Args:
+            next_seq: 下一个未执行的序号
+            due_seq: 当前应执行到的序号 (>= next_seq)
+
+        Returns:
+            要依次执行的 TickInfo 列表 (最后一项的 seq 为 due_seq)
+        """
+        missed = due_seq - next_seq
+        if missed <= 0:
+            return [TickInfo(next_seq, self.scheduled_time(next_seq))]
+
+        self.overruns += 1
+
+        if self.policy == POLICY_SKIP:
+            self.skipped_steps += missed
+            return [TickInfo(due_seq, self.scheduled_time(due_seq))]
+
+        if self.policy == POLICY_COALESCE:
+            self.coalesced_steps += missed
+            return [TickInfo(due_seq, self.scheduled_time(due_seq), steps=missed + 1, first_seq=next_seq)]
+
+        # burst: 最近的 max_catchup 个错过步 + 当前步, 更早的跳过
+        first = max(next_seq, due_seq - self.max_catchup)
+        self.skipped_steps += first - next_seq
+        self.burst_steps += due_seq - first
+        return [TickInfo(seq, self.scheduled_time(seq)) for seq in range(first, due_seq + 1)]
+
+    async def run(self, tick_fn: Callable[[List[TickInfo]], Awaitable[None]]):
+        """
+        运行时钟循环 (直到 stop 或任务取消)
+
+        Args:
+            tick_fn: 每次唤醒时调用, 参数为本次要执行的步 (见 plan)
+        """
+        if self._anchor_monotonic is None:
+            self.start()
+        self._running = True
+
+        while self._running:
+            next_seq = self.seq + 1
+            delay = self._deadline(next_seq) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            due_seq = max(next_seq, self._due_seq())
+            ticks = self.plan(next_seq, due_seq)
+            self.seq = due_seq
+
+            lag_ms = (time.monotonic() - self._deadline(due_seq)) * 1000
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+            started = time.perf_counter()
+            try:
+                await tick_fn(ticks)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[!] Tick {due_seq} failed: {e}")
+            duration_ms = (time.perf_counter() - started) * 1000
+
+            self.ticks_run += len(ticks)
+            self.last_duration_ms = duration_ms
+            self.max_duration_ms = max(self.max_duration_ms, duration_ms)
+
+    def stop(self):
+        """在当前tick结束后停止循环"""
+        self._running = False
+
+    def metrics(self) -> Dict:
+        """序号、超时和追赶计数"""
+        return {
+            "seq": self.seq,
+            "interval": self.interval,
+            "policy": self.policy,
+            "ticks_run": self.ticks_run,
+            "overruns": self.overruns,
+            "skipped_steps": self.skipped_steps,
+            "coalesced_steps": self.coalesced_steps,
+            "burst_steps": self.burst_steps,
+            "errors": self.errors,
+            "last_duration_ms": round(self.last_duration_ms, 3),
+            "max_duration_ms": round(self.max_duration_ms, 3),
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+        }
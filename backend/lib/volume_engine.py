@@ -0,0 +1,159 @@
+"""
+成交量引擎 (Volume Engine)
+
+向量化生成每个tick的成交量和成交额:
+
+    λ_i = 日均成交股数_i / 每日步数 × 日内活跃度(t) × (1 + k·|r_i|/σ_tick_i) × 噪声
+    成交量_i = Poisson(λ_i / 100) × 100          (按手取整)
+    成交额_i = 成交量_i × 价格_i
+
+- 日均成交股数 = 流通股本 × 市值档位对应的日换手率 (大盘股换手低, 小盘股换手高)
+- 日内活跃度为U型曲线: 开盘和收盘最活跃, 午间最清淡, 全天均值为1
+- 涨跌幅越大成交越活跃
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from lib.rng import get_rng_service
+
+
+class VolumeEngine:
+    """成交量引擎"""
+
+    # 各市值档位的日换手率
+    TIER_TURNOVER_RATES = {
+        '超大盘': 0.003,
+        '大盘': 0.006,
+        '中盘': 0.012,
+        '小盘': 0.020,
+        '微盘': 0.030,
+    }
+    DEFAULT_TURNOVER_RATE = 0.012
+
+    # 缺少流通股本数据时的日均成交股数
+    FALLBACK_DAILY_SHARES = 5_000_000
+
+    # U型曲线深度: activity(x) = 1 + A·((2x-1)² - 1/3), x 为交易时段进度
+    U_SHAPE_DEPTH = 2.0
+
+    # 收益敏感度 k
+    RETURN_SENSITIVITY = 0.5
+
+    # 对数正态噪声的标准差
+    NOISE_SIGMA = 0.5
+
+    # 每手股数
+    LOT_SIZE = 100
+
+    # 交易时段 (分钟, 自0点起): 9:30-11:30, 13:00-15:00
+    SESSIONS = ((9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60))
+    SESSION_MINUTES = 240
+
+    def __init__(
+        self,
+        market_cap_tiers: List[Optional[str]],
+        outstanding_shares: np.ndarray,
+        volatilities: np.ndarray,
+        steps_per_day: int = 4800,
+        trading_days_per_year: int = 250,
+        rng: Optional[np.random.Generator] = None,
+    ):
+        """
+        初始化成交量引擎
+
+        Args:
+            market_cap_tiers: 市值档位列表 (N,)
+            outstanding_shares: 流通股本数组 (N,), 缺失为0
+            volatilities: 个股年化波动率数组 (N,)
+            steps_per_day: 每日步数
+            trading_days_per_year: 每年交易日数
+            rng: 随机流 (默认取自全局随机数服务)
+        """
+        self.rng = rng or get_rng_service().get("volume")
+        self.size = len(market_cap_tiers)
+
+        turnover_rates = np.array(
+            [self.TIER_TURNOVER_RATES.get(tier, self.DEFAULT_TURNOVER_RATE) for tier in market_cap_tiers],
+            dtype=np.float64,
+        )
+        outstanding_shares = np.asarray(outstanding_shares, dtype=np.float64)
+        daily_shares = np.where(
+            outstanding_shares > 0,
+            outstanding_shares * turnover_rates,
+            self.FALLBACK_DAILY_SHARES,
+        )
+        self.base_per_tick = daily_shares / steps_per_day
+
+        # 个股单步收益的典型幅度 (用于把 |r| 归一化)
+        self.sigma_tick = (
+            np.asarray(volatilities, dtype=np.float64)
+            / np.sqrt(trading_days_per_year)
+            / np.sqrt(steps_per_day)
+        )
+        self.sigma_tick = np.where(self.sigma_tick > 0, self.sigma_tick, 1.0)
+
+    @classmethod
+    def from_arena(cls, arena, steps_per_day: int = 4800, rng: Optional[np.random.Generator] = None):
+        """由 MarketArena 的数组构造 (与 arena.symbols 对齐)"""
+        return cls(
+            market_cap_tiers=arena.market_cap_tiers,
+            outstanding_shares=arena.outstanding_shares,
+            volatilities=arena.volatilities,
+            steps_per_day=steps_per_day,
+            rng=rng,
+        )
+
+    def intraday_activity(self, when: datetime) -> float:
+        """
+        日内活跃度 (U型, 全天均值为1)
+
+        Args:
+            when: tick 时间
+
+        Returns:
+            活跃度系数; 非交易时段 (全天交易模式) 返回1
+        """
+        minute = when.hour * 60 + when.minute + when.second / 60
+        elapsed = 0.0
+        for start, end in self.SESSIONS:
+            if start <= minute < end:
+                x = (elapsed + minute - start) / self.SESSION_MINUTES
+                return 1.0 + self.U_SHAPE_DEPTH * ((2 * x - 1) ** 2 - 1 / 3)
+            elapsed += end - start
+        return 1.0
+
+    def generate(
+        self,
+        log_returns: np.ndarray,
+        prices: np.ndarray,
+        when: Optional[datetime] = None,
+        steps: int = 1,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        生成一个tick的成交量和成交额
+
+        Args:
+            log_returns: 本tick对数收益 (N,)
+            prices: 成交价格 (N,)
+            when: tick 时间 (默认当前时间)
+            steps: 本tick代表的基础步数 (合并步时成交量按步数放大)
+
+        Returns:
+            (volumes, turnovers): int64 (N,) 和 float64 (N,)
+        """
+        when = when or datetime.now()
+        n = len(prices)
+
+        activity = 1.0 + self.RETURN_SENSITIVITY * np.abs(log_returns) / self.sigma_tick
+        noise = self.rng.lognormal(-0.5 * self.NOISE_SIGMA ** 2, self.NOISE_SIGMA, size=n)
+        expected = self.base_per_tick * max(1, steps) * self.intraday_activity(when) * activity * noise
+
+        volumes = self.rng.poisson(expected / self.LOT_SIZE).astype(np.int64) * self.LOT_SIZE
+        turnovers = volumes * np.asarray(prices, dtype=np.float64)
+
+        return volumes, turnovers
@@ -10,9 +10,12 @@ from contextlib import asynccontextmanager
 from config import settings, TORTOISE_ORM
 from exceptions import TradingException
 from lib.db_manager_sqlite import get_db_manager
+from lib.market_arena import get_market_arena
+from lib.simulation_engine import get_simulation_engine
 from scheduler.jobs import start_scheduler, shutdown_scheduler
 from lib.websocket_manager import get_connection_manager
 from lib.redis_pubsub import get_redis_pubsub, close_redis_pubsub
+from lib.market_feed import ArenaFeedSubscriber
 
 
 @asynccontextmanager
@@ -36,10 +39,19 @@ async def lifespan(app: FastAPI):
     else:
         print("[!] Virtual market database connection failed")
 
-    # 启动定时任务调度器
-    print("[*] Starting price generation scheduler...")
-    start_scheduler()
-    print("[+] Scheduler started successfully")
+    # 加载内存市场状态 (价格生成、指数计算、推送和读接口共用)
+    print("[*] Loading market arena...")
+    get_market_arena().load()
+
+    # 启动定时任务调度器 (独立模拟器模式下由 start_market_simulator.py 负责)
+    if settings.EMBEDDED_SIMULATOR:
+        # 常驻模拟引擎: 跨 tick 保持板块/元数据/市场状态缓存
+        get_simulation_engine()
+        print("[*] Starting price generation scheduler...")
+        start_scheduler()
+        print("[+] Scheduler started successfully")
+    else:
+        print("[*] Embedded simulator disabled, prices come from the market feed")
     
     # 初始化 WebSocket 管理器和 Redis Pub/Sub
     print("[*] Initializing WebSocket manager and Redis Pub/Sub...")
@@ -48,6 +60,11 @@ async def lifespan(app: FastAPI):
         pubsub = await get_redis_pubsub()
         print("[+] Redis Pub/Sub connected")
         
+        # 独立模拟器模式: 订阅全市场快照, 更新内存状态
+        if not settings.EMBEDDED_SIMULATOR:
+            await ArenaFeedSubscriber().start(pubsub)
+            print("[+] Subscribed to market feed")
+        
         # 启动 WebSocket 心跳检测
         manager = get_connection_manager()
         await manager.start_heartbeat_checker()
@@ -71,8 +88,9 @@ async def lifespan(app: FastAPI):
     await close_redis_pubsub()
     
     # 关闭调度器
-    print("[*] Stopping scheduler...")
-    shutdown_scheduler()
+    if settings.EMBEDDED_SIMULATOR:
+        print("[*] Stopping scheduler...")
+        shutdown_scheduler()
     
     # 关闭数据库
     db_manager.close()
@@ -175,6 +193,7 @@ from api import indices as virtual_market_indices
 from api import sectors as virtual_market_sectors
 from api import market as virtual_market_market
 from api import websocket as websocket_api
+from api import admin as admin_api
 
 # 注册 API 路由
 app.include_router(accounts.router, prefix="/api/v1", tags=["账户管理"])
@@ -189,6 +208,9 @@ app.include_router(virtual_market_indices.router, prefix="/api/v1", tags=["虚
 app.include_router(virtual_market_sectors.router, prefix="/api/v1", tags=["虚拟市场-板块"])
 app.include_router(virtual_market_market.router, prefix="/api/v1", tags=["虚拟市场-市场"])
 
+# 管理API路由 (市场演练)
+app.include_router(admin_api.router, prefix="/api/v1", tags=["管理-市场演练"])
+
 # WebSocket API路由 (实时数据推送)
 app.include_router(websocket_api.router, prefix="/api/v1", tags=["实时数据推送"])
 
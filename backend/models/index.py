@@ -27,6 +27,7 @@ class Index:
     turnover: Optional[int] = None  # 成交额
     constituent_count: int = 0  # 成分股数量
     calculation_method: str = 'FREE_FLOAT_MKT_CAP'  # 计算方法
+    divisor: Optional[float] = None  # 除数 (点位 = Σ价格×指数份额 / 除数)
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -71,6 +72,7 @@ class Index:
             'turnover': self.turnover,
             'constituent_count': self.constituent_count,
             'calculation_method': self.calculation_method,
+            'divisor': self.divisor,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -85,6 +87,7 @@ class IndexConstituent:
     index_code: str  # 指数代码
     stock_symbol: str  # 股票代码
     weight: Decimal  # 权重 (0.0001 - 0.1000, 即0.01% - 10%)
+    index_shares: Optional[float] = None  # 指数份额 (调整时按 权重 × S / 价格 折算)
     rank: Optional[int] = None  # 排名
     join_date: Optional[date] = None  # 加入日期
     is_active: bool = True  # 是否活跃
@@ -105,6 +108,7 @@ class IndexConstituent:
             'stock_symbol': self.stock_symbol,
             'weight': float(self.weight),
             'weight_percent': float(self.weight_percent),
+            'index_shares': self.index_shares,
             'rank': self.rank,
             'join_date': self.join_date.isoformat() if self.join_date else None,
             'is_active': self.is_active,
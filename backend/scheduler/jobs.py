@@ -2,12 +2,14 @@
 定时任务调度模块
 Job Scheduler Module
 
-使用APScheduler实现市场数据的定时更新。
-每分钟执行一次价格生成和指数计算。
+价格生成和指数计算由无漂移的 TickClock 驱动 (每3秒一步, 超时按追赶策略处理),
+内存状态写回等周期任务使用APScheduler。
 """
 
 import asyncio
+import time
 from datetime import datetime
+from typing import List, Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import sys
@@ -15,38 +17,54 @@ from pathlib import Path
 import json
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from lib.db_manager_sqlite import DatabaseManager
-from lib.price_generator_v2 import PriceGeneratorV2  # 使用V2生成器
-from lib.index_calculator import IndexCalculator
-from lib.market_state_manager import MarketStateManager
 from lib.redis_pubsub import get_redis_pubsub
+from lib.market_arena import MarketArena, get_market_arena
+from lib.persistence_writer import get_persistence_writer
+from lib.simulation_engine import get_simulation_engine
+from lib.market_feed import ARENA_CHANNEL, arena_message
+from lib.tick_clock import TickClock, TickInfo
+from config import settings
 
 # 全局调度器实例
 scheduler: AsyncIOScheduler = None
 
+# 价格 tick 时钟和运行它的任务 (取代固定间隔的 APScheduler 任务, 见 lib/tick_clock.py)
+tick_clock: TickClock = None
+tick_task: asyncio.Task = None
 
-async def generate_prices_job():
+
+async def generate_prices_job(ticks: Optional[List[TickInfo]] = None):
     """
     价格生成任务
     
-    每分钟执行一次，更新所有股票价格和指数值
+    由 TickClock 每3秒调用一次, 更新所有股票价格和指数值。
+    ticks 为本次要执行的步 (tick 超时后按追赶策略可能多于一步或为合并步),
+    全部执行完后只发布一次行情, 消息带最后一步的序号和计划时间。
+    出错时记录日志后重新抛出, 由 TickClock 计数; 发布到 Redis 失败不算出错。
+    
+    Args:
+        ticks: 本次要执行的步 (None 表示以当前时间执行一步, 手动调用时使用)
     """
     try:
         start_time = datetime.now()
-        print(f"\n[{start_time.strftime('%H:%M:%S')}] ===== Price Generation Job Started =====")
+        if not ticks:
+            ticks = [TickInfo(seq=tick_clock.seq if tick_clock else 0, scheduled_time=time.time())]
+        last = ticks[-1]
+        print(f"\n[{start_time.strftime('%H:%M:%S')}] ===== Price Generation Job Started "
+              f"(seq={last.seq}, steps={sum(t.steps for t in ticks)}) =====")
 
-        db_manager = DatabaseManager()
-        price_generator = PriceGeneratorV2(db_manager, steps_per_day=4800)  # 使用V2生成器
+        # 常驻模拟引擎 (通常已在 lifespan / 模拟器进程启动时创建并预热)
+        engine = get_simulation_engine()
+        arena = engine.arena
 
-        # 1. 生成所有股票的新价格
-        print("[1/3] Generating prices for all stocks...")
-        updated_count = await generate_all_stocks(price_generator)
-        print(f"      [+] Updated {updated_count} stocks")
+        for tick_info in ticks:
+            # 1. 生成所有股票的新价格
+            updated_count = engine.step_stocks(tick_info)
 
-        # 2. 重新计算所有指数
-        print("[2/3] Recalculating all indices...")
-        indices_updated = await calculate_all_indices(db_manager)
-        print(f"      [+] Updated {indices_updated} indices")
+            # 2. 重新计算所有指数
+            indices_updated = engine.step_indices(tick_info)
+        print(f"[1/3] Updated {updated_count} stocks over {len(ticks)} tick(s)")
+        print(f"[2/3] Updated {indices_updated} indices")
 
         # 3. 计算耗时
         end_time = datetime.now()
@@ -55,7 +73,7 @@ async def generate_prices_job():
         
         # 4. 发布到 Redis (实时推送)
         try:
-            await publish_market_data(db_manager)
+            await publish_market_data(arena, last, first_seq=ticks[0].first_seq)
         except Exception as e:
             print(f"[!] Error publishing to Redis: {e}")
         
@@ -65,277 +83,117 @@ async def generate_prices_job():
         print(f"[!] Error in generate_prices_job: {e}")
         import traceback
         traceback.print_exc()
+        # 交给 TickClock 计入 errors (时钟继续运行)
+        raise
 
 
-async def generate_all_stocks(price_generator: PriceGeneratorV2) -> int:
+async def publish_market_data(arena: MarketArena, tick_info: Optional[TickInfo] = None, first_seq: Optional[int] = None):
     """
-    批量生成所有股票的新价格,并插入历史K线数据
+    将最新的市场数据发布到 Redis
+    
+    每条消息带 seq (tick 序号)、first_seq (本次覆盖的第一个序号) 和
+    scheduled_time (计划时间), 下游可据此发现缺口。
     
     Args:
-        price_generator: 价格生成器V2实例
-        
-    Returns:
-        更新的股票数量
+        arena: 内存市场状态
+        tick_info: 最后执行的一步 (None 表示当前时间)
+        first_seq: 本次发布覆盖的第一个序号 (默认同 tick_info.first_seq)
     """
-    import time
-    
-    conn = price_generator.db_manager.get_connection()
     try:
-        cursor = conn.cursor()
-        
-        # 获取当前时间戳（分钟级别，秒数归零）
-        now = datetime.now()
-        timestamp_minute = int(now.replace(second=0, microsecond=0).timestamp())
-        datetime_str = now.strftime('%Y-%m-%d %H:%M:00')
-        
-        # 获取所有活跃股票
-        cursor.execute("""
-            SELECT symbol FROM stocks
-            WHERE is_active = 1
-            ORDER BY symbol
-        """)
-        stocks = cursor.fetchall()
+        # 获取 Redis Pub/Sub 实例
+        pubsub = await get_redis_pubsub()
         
-        # 批量准备数据
-        stock_updates = []
-        price_data_inserts = []
+        scheduled_time = tick_info.scheduled_time if tick_info else time.time()
+        timestamp = int(scheduled_time)
+        tick_fields = {
+            "seq": tick_info.seq if tick_info else None,
+            "first_seq": first_seq if first_seq is not None else (tick_info.first_seq if tick_info else None),
+            "scheduled_time": round(scheduled_time, 3),
+        }
         
-        updated_count = 0
-        for row in stocks:
-            symbol = row[0]
+        stocks_data = []
+        for symbol, name, sector, price, prev_close, change_value, change_pct, volume, turnover in zip(
+            arena.symbols,
+            arena.names,
+            arena.stock_sector_codes,
+            arena.prices.tolist(),
+            arena.previous_closes.tolist(),
+            arena.change_values.tolist(),
+            arena.change_pcts.tolist(),
+            arena.volumes.tolist(),
+            arena.turnovers.tolist(),
+        ):
+            stock_data = {
+                "symbol": symbol,
+                "name": name,
+                "sector": sector,
+                "current_price": price,
+                "previous_close": prev_close,
+                "change_value": round(change_value, 2),
+                "change_pct": change_pct,
+                "volume": volume,
+                "turnover": turnover,
+                "timestamp": timestamp,
+                **tick_fields,
+            }
+            stocks_data.append(stock_data)
             
-            # 生成新价格
-            result = price_generator.generate_next_price(symbol, verbose=False)
-            if result:
-                # 计算change_value (新价 - 旧价)
-                change_value = result['close'] - result['previous_close']
-                
-                # 准备stocks表更新数据
-                stock_updates.append((
-                    result['close'],
-                    result['previous_close'],
-                    round(change_value, 2),
-                    result['change_pct'],
-                    symbol
-                ))
-                
-                # 准备price_data表插入数据（使用result中的OHLC）
-                price_data_inserts.append((
-                    'STOCK',
-                    symbol,
-                    timestamp_minute,
-                    datetime_str,
-                    result['open'],
-                    result['close'],
-                    result['high'],
-                    result['low'],
-                    0,  # volume (暂时为0)
-                    0,  # turnover (暂时为0)
-                    result['change_pct']
-                ))
-                
-                updated_count += 1
-        
-        # 批量更新stocks表
-        if stock_updates:
-            cursor.executemany("""
-                UPDATE stocks
-                SET current_price = ?,
-                    previous_close = ?,
-                    change_value = ?,
-                    change_pct = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE symbol = ?
-            """, stock_updates)
+            # 发布单只股票数据
+            await pubsub.publish(f"market:stock:{symbol}", stock_data)
         
-        # 批量插入price_data表（使用INSERT OR REPLACE避免重复）
-        if price_data_inserts:
-            cursor.executemany("""
-                INSERT OR REPLACE INTO price_data (
-                    target_type, target_code, timestamp, datetime,
-                    open, close, high, low, volume, turnover, change_pct
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, price_data_inserts)
+        # 发布全市场数据
+        market_message = {
+            "type": "market_update",
+            "data": stocks_data,
+            "timestamp": timestamp,
+            **tick_fields,
+        }
+        await pubsub.publish("market:stocks", market_message)
         
-        conn.commit()
-        return updated_count
+        # 列式全市场快照 (独立模拟器模式下 API 进程据此更新内存状态)
+        await pubsub.publish(ARENA_CHANNEL, {**arena_message(arena, timestamp), **tick_fields})
         
-    finally:
-        conn.close()
+        print(f"[4/4] Published {len(stocks_data)} stocks to Redis")
+            
+    except Exception as e:
+        print(f"[!] Failed to publish market data: {e}")
+        import traceback
+        traceback.print_exc()
 
 
-async def publish_market_data(db_manager: DatabaseManager):
+async def flush_market_arena():
     """
-    将最新的市场数据发布到 Redis
+    内存市场状态写回任务 (write-behind)
     
-    Args:
-        db_manager: 数据库管理器实例
+    按 MARKET_ARENA_FLUSH_INTERVAL 周期把 stocks / indices 的最新值快照
+    放入持久化队列, 由写入线程写回数据库
     """
     try:
-        # 获取 Redis Pub/Sub 实例
-        pubsub = await get_redis_pubsub()
-        
-        conn = db_manager.get_connection()
-        try:
-            cursor = conn.cursor()
-            
-            # 获取所有活跃股票的最新数据
-            cursor.execute("""
-                SELECT 
-                    symbol, name, sector_code,
-                    current_price, previous_close, change_value, change_pct,
-                    volume, turnover
-                FROM stocks
-                WHERE is_active = 1
-                ORDER BY symbol
-            """)
-            
-            stocks_data = []
-            for row in cursor.fetchall():
-                stock_data = {
-                    "symbol": row[0],
-                    "name": row[1],
-                    "sector": row[2],
-                    "current_price": float(row[3]) if row[3] else 0,
-                    "previous_close": float(row[4]) if row[4] else 0,
-                    "change_value": float(row[5]) if row[5] else 0,
-                    "change_pct": float(row[6]) if row[6] else 0,
-                    "volume": int(row[7]) if row[7] else 0,
-                    "turnover": float(row[8]) if row[8] else 0,
-                    "timestamp": int(datetime.now().timestamp()),
-                }
-                stocks_data.append(stock_data)
-                
-                # 发布单只股票数据
-                await pubsub.publish(f"market:stock:{row[0]}", stock_data)
-            
-            # 发布全市场数据
-            market_message = {
-                "type": "market_update",
-                "data": stocks_data,
-                "timestamp": int(datetime.now().timestamp()),
-            }
-            await pubsub.publish("market:stocks", market_message)
-            
-            print(f"[4/4] Published {len(stocks_data)} stocks to Redis")
-            
-        finally:
-            conn.close()
-            
+        arena = get_market_arena()
+        writer = get_persistence_writer()
+        if writer.submit_snapshot(arena.snapshot(), arena.mark_flushed):
+            metrics = writer.metrics()
+            print(f"[*] MarketArena snapshot queued "
+                  f"(queue={metrics['queue_depth']}, last_flush={metrics['last_flush_ms']}ms)")
     except Exception as e:
-        print(f"[!] Failed to publish market data: {e}")
+        print(f"[!] Error in flush_market_arena: {e}")
         import traceback
         traceback.print_exc()
 
 
-async def calculate_all_indices(db_manager: DatabaseManager) -> int:
+async def rebalance_indices_job():
     """
-    批量计算所有指数的新值，并插入历史K线数据
-    
-    Args:
-        db_manager: 数据库管理器实例
-        
-    Returns:
-        更新的指数数量
+    指数成分股定期调整任务
+
+    按 INDEX_REBALANCE_INTERVAL_MINUTES 周期按实时市值重新选择成分股,
+    写入新的成分股版本 (历史K线仍按当时的成分股计算)
     """
-    conn = db_manager.get_connection()
     try:
-        cursor = conn.cursor()
-        
-        # 获取当前时间戳（分钟级别）
-        now = datetime.now()
-        timestamp_minute = int(now.replace(second=0, microsecond=0).timestamp())
-        datetime_str = now.strftime('%Y-%m-%d %H:%M:00')
-        
-        # 获取所有指数
-        cursor.execute("""
-            SELECT code FROM indices
-            ORDER BY code
-        """)
-        indices = cursor.fetchall()
-        
-        # 批量准备数据
-        index_updates = []
-        price_data_inserts = []
-        
-        updated_count = 0
-        for row in indices:
-            index_code = row[0]
-            
-            # 计算并更新指数值
-            try:
-                # 为每个指数创建一个IndexCalculator实例
-                calculator = IndexCalculator(index_code)
-                
-                # calculate_index_value()使用当前股票价格计算指数
-                new_value = calculator.calculate_index_value()
-                
-                if new_value:
-                    # 获取前一个值计算涨跌
-                    cursor.execute("""
-                        SELECT current_value FROM indices
-                        WHERE code = ?
-                    """, (index_code,))
-                    prev_row = cursor.fetchone()
-                    prev_value = prev_row[0] if prev_row else new_value
-                    
-                    change_pct = ((new_value - prev_value) / prev_value * 100) if prev_value > 0 else 0
-                    
-                    # 准备indices表更新数据
-                    index_updates.append((new_value, change_pct, index_code))
-                    
-                    # 准备price_data表插入数据
-                    # 对于指数，open/high/low使用简化计算
-                    open_val = prev_value
-                    close_val = new_value
-                    high_val = max(open_val, close_val)
-                    low_val = min(open_val, close_val)
-                    
-                    price_data_inserts.append((
-                        'INDEX',
-                        index_code,
-                        timestamp_minute,
-                        datetime_str,
-                        round(open_val, 2),
-                        round(close_val, 2),
-                        round(high_val, 2),
-                        round(low_val, 2),
-                        0,  # volume
-                        0,  # turnover
-                        round(change_pct, 2)
-                    ))
-                    
-                    updated_count += 1
-            except Exception as e:
-                print(f"      ! Error calculating index {index_code}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-        
-        # 批量更新indices表
-        if index_updates:
-            cursor.executemany("""
-                UPDATE indices
-                SET current_value = ?,
-                    change_pct = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE code = ?
-            """, index_updates)
-        
-        # 批量插入price_data表
-        if price_data_inserts:
-            cursor.executemany("""
-                INSERT OR REPLACE INTO price_data (
-                    target_type, target_code, timestamp, datetime,
-                    open, close, high, low, volume, turnover, change_pct
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, price_data_inserts)
-        
-        conn.commit()
-        return updated_count
-        
-    finally:
-        conn.close()
+        get_simulation_engine().rebalance_indices()
+    except Exception as e:
+        print(f"[!] Error in rebalance_indices_job: {e}")
+        import traceback
+        traceback.print_exc()
 
 
 def setup_scheduler() -> AsyncIOScheduler:
@@ -354,43 +212,94 @@ def setup_scheduler() -> AsyncIOScheduler:
     # 创建异步调度器
     scheduler = AsyncIOScheduler()
     
-    # 添加价格生成任务（每3秒执行一次，符合A股行情习惯）
+    # 内存市场状态写回任务
     scheduler.add_job(
-        generate_prices_job,
-        trigger=IntervalTrigger(seconds=3),
-        id='generate_prices',
-        name='Generate Prices and Calculate Indices',
+        flush_market_arena,
+        trigger=IntervalTrigger(seconds=settings.MARKET_ARENA_FLUSH_INTERVAL),
+        id='flush_market_arena',
+        name='Flush Market Arena to Database',
         replace_existing=True,
-        max_instances=1,  # 防止并发执行
+        max_instances=1,
     )
     
+    # 指数成分股定期调整任务
+    if settings.INDEX_REBALANCE_INTERVAL_MINUTES > 0:
+        scheduler.add_job(
+            rebalance_indices_job,
+            trigger=IntervalTrigger(minutes=settings.INDEX_REBALANCE_INTERVAL_MINUTES),
+            id='rebalance_indices',
+            name='Rebalance Index Constituents',
+            replace_existing=True,
+            max_instances=1,
+        )
+    
     print("[+] Scheduler configured successfully")
-    print("    - Job: generate_prices (interval: 3 seconds)")
+    print(f"    - Tick clock: generate_prices (interval: {settings.TICK_INTERVAL_SECONDS} seconds, "
+          f"catch-up: {settings.TICK_CATCHUP_POLICY})")
+    print(f"    - Job: flush_market_arena (interval: {settings.MARKET_ARENA_FLUSH_INTERVAL} seconds)")
+    if settings.INDEX_REBALANCE_INTERVAL_MINUTES > 0:
+        print(f"    - Job: rebalance_indices (interval: {settings.INDEX_REBALANCE_INTERVAL_MINUTES} minutes)")
     
     return scheduler
 
 
+def get_tick_clock() -> TickClock:
+    """获取价格 tick 时钟 (未创建时按配置创建)"""
+    global tick_clock
+    
+    if tick_clock is None:
+        tick_clock = TickClock(
+            interval=settings.TICK_INTERVAL_SECONDS,
+            policy=settings.TICK_CATCHUP_POLICY,
+            max_catchup=settings.TICK_MAX_CATCHUP_STEPS,
+        )
+    
+    return tick_clock
+
+
 def start_scheduler():
-    """启动调度器"""
-    global scheduler
+    """启动调度器和价格 tick 时钟 (需在事件循环中调用)"""
+    global scheduler, tick_task
     
     if scheduler is None:
         scheduler = setup_scheduler()
     
+    get_persistence_writer().start()
+    
     if not scheduler.running:
         scheduler.start()
         print("[+] Scheduler started")
     else:
         print("[*] Scheduler already running")
+    
+    if tick_task is None or tick_task.done():
+        clock = get_tick_clock()
+        clock.start()
+        tick_task = asyncio.get_running_loop().create_task(clock.run(generate_prices_job))
+        print("[+] Tick clock started")
 
 
 def shutdown_scheduler():
     """关闭调度器"""
-    global scheduler
+    global scheduler, tick_task
+    
+    if tick_task is not None:
+        tick_clock.stop()
+        tick_task.cancel()
+        tick_task = None
+        print(f"[+] Tick clock stopped: {tick_clock.metrics()}")
     
     if scheduler and scheduler.running:
         scheduler.shutdown(wait=True)
         print("[+] Scheduler shut down")
+        
+        # 关闭前提交进行中的分钟K线和最后一次内存状态, 等待写入线程写完
+        arena = get_market_arena()
+        writer = get_persistence_writer()
+        get_simulation_engine().flush_bars()
+        writer.submit_snapshot(arena.snapshot(), arena.mark_flushed)
+        writer.stop()
+        print(f"[+] Persistence writer drained: {writer.metrics()}")
     else:
         print("[*] Scheduler not running")
 
@@ -0,0 +1,124 @@
+"""
+快进模拟市场 (Fast-forward simulation)
+
+用 PriceGeneratorV2.simulate 在几秒内生成数天的分钟K线,
+按块写入 price_data, 用于压测和演示。
+
+用法:
+    python scripts/simulate_market.py --start 2025-01-06 --end 2025-01-11
+    python scripts/simulate_market.py --start "2025-01-06 09:30" --end "2025-01-06 15:00" --seed 42
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.db_manager_sqlite import DatabaseManager
+from lib.market_arena import MarketArena
+from lib.minute_bar import write_bars
+from lib.price_generator_v2 import PriceGeneratorV2
+from lib.rng import init_rng_service
+
+
+def parse_time(value: str) -> datetime:
+    """解析 'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM'"""
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"invalid time: {value}")
+
+
+def simulate_market(
+    start: datetime,
+    end: datetime,
+    step_seconds: int = 3,
+    chunk_bars: int = 30,
+    update_stocks: bool = False,
+) -> int:
+    """
+    快进模拟并写入 price_data
+
+    Args:
+        start: 开始时间
+        end: 结束时间 (不含)
+        step_seconds: tick 间隔(秒)
+        chunk_bars: 每次写入的分钟数
+        update_stocks: 结束后把最终价格写回 stocks 表
+
+    Returns:
+        写入的K线行数
+    """
+    db_manager = DatabaseManager()
+    arena = MarketArena(db_manager)
+    arena.load()
+    generator = PriceGeneratorV2(db_manager)
+
+    total_rows = 0
+    last_chunk = None
+    started = time.perf_counter()
+
+    for chunk in generator.simulate(
+        start,
+        end,
+        step_seconds=step_seconds,
+        current_prices=arena.prices,
+        previous_closes=arena.previous_closes,
+        betas=arena.betas,
+        sector_indices=arena.stock_sector_ids,
+        volatilities=arena.volatilities,
+        chunk_bars=chunk_bars,
+    ):
+        total_rows += write_bars(db_manager, 'STOCK', arena.symbols, chunk)
+        last_chunk = chunk
+
+        first = datetime.fromtimestamp(int(chunk['timestamps'][0]))
+        print(f"  {first.strftime('%Y-%m-%d %H:%M')} [{chunk['state']}] "
+              f"{len(chunk['timestamps'])} bars -> {total_rows} rows")
+
+    elapsed = time.perf_counter() - started
+
+    if update_stocks and last_chunk is not None:
+        closes = last_chunk['close'][-1]
+        previous_closes = last_chunk['previous_close']
+        arena.apply_tick({
+            'close': closes,
+            'previous_close': previous_closes,
+            'change_value': closes - previous_closes,
+            'change_pct': last_chunk['change_pct'][-1],
+        })
+        arena.flush()
+        print(f"[+] Updated {arena.size} stocks")
+
+    print(f"[+] Simulated {arena.size} stocks, {total_rows} bars in {elapsed:.2f}s")
+    return total_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fast-forward market simulation')
+    parser.add_argument('--start', type=parse_time, required=True, help='开始时间')
+    parser.add_argument('--end', type=parse_time, required=True, help='结束时间 (不含)')
+    parser.add_argument('--step-seconds', type=int, default=3, help='tick 间隔(秒)')
+    parser.add_argument('--chunk-bars', type=int, default=30, help='每次写入的分钟数')
+    parser.add_argument('--seed', type=int, default=None, help='随机数根种子')
+    parser.add_argument('--update-stocks', action='store_true', help='结束后更新 stocks 表')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        init_rng_service(args.seed)
+
+    print("=" * 80)
+    print(f"快进模拟: {args.start} -> {args.end} (step={args.step_seconds}s)")
+    print("=" * 80)
+
+    simulate_market(
+        args.start,
+        args.end,
+        step_seconds=args.step_seconds,
+        chunk_bars=args.chunk_bars,
+        update_stocks=args.update_stocks,
+    )
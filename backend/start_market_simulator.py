@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Market Simulator Process
+
+独立运行市场模拟器 (tick 循环), 与 API 服务器分离:
+- 加载内存市场状态并创建常驻模拟引擎, 运行 scheduler/jobs.py 中的价格生成和写回任务
+- 每个tick把行情发布到 Redis (market:stocks / market:stock:* / market:arena)
+- 订阅 market:control, 执行 API 转发的冲击注入命令
+
+API 进程设置 EMBEDDED_SIMULATOR=False 后不再运行调度器, 只订阅 market:arena,
+因此可以运行多个 API worker:
+
+    python start_market_simulator.py
+    EMBEDDED_SIMULATOR=False uvicorn main:app --workers 4
+"""
+
+import asyncio
+import os
+import signal
+import sys
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lib.db_manager_sqlite import get_db_manager
+from lib.market_arena import get_market_arena
+from lib.market_feed import CONTROL_CHANNEL, handle_control_message
+from lib.redis_pubsub import get_redis_pubsub, close_redis_pubsub
+from lib.simulation_engine import get_simulation_engine
+from scheduler.jobs import start_scheduler, shutdown_scheduler
+
+
+async def run_simulator():
+    """运行模拟器直到收到 SIGINT/SIGTERM"""
+    db_manager = get_db_manager()
+    db_manager.initialize()
+
+    print("[*] Loading market arena...")
+    get_market_arena().load()
+
+    # 常驻模拟引擎: 跨 tick 保持板块/元数据/市场状态缓存
+    get_simulation_engine()
+
+    try:
+        pubsub = await get_redis_pubsub()
+        await pubsub.subscribe(CONTROL_CHANNEL, handle_control_message)
+        print("[+] Redis Pub/Sub connected, listening for control commands")
+    except Exception as e:
+        print(f"[!] Failed to connect to Redis, prices will not be published: {e}")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: 依赖 KeyboardInterrupt
+            pass
+
+    start_scheduler()
+    print("[+] Market simulator running")
+
+    try:
+        await stop_event.wait()
+    finally:
+        print("[*] Stopping market simulator...")
+        shutdown_scheduler()
+        await close_redis_pubsub()
+        db_manager.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_simulator())
+    except KeyboardInterrupt:
+        print("[*] Market simulator stopped by user")
+        sys.exit(0)
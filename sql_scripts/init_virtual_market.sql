@@ -103,6 +103,7 @@ CREATE TABLE IF NOT EXISTS indices (
     turnover BIGINT,
     constituent_count INTEGER DEFAULT 0,
     calculation_method VARCHAR(50) DEFAULT 'FREE_FLOAT_MKT_CAP',
+    divisor DOUBLE PRECISION,  -- 除数: 点位 = Σ(价格 × 指数份额) / 除数
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -138,6 +139,7 @@ CREATE TABLE IF NOT EXISTS index_constituents (
     index_code VARCHAR(20) NOT NULL REFERENCES indices(code) ON DELETE CASCADE,
     stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol) ON DELETE CASCADE,
     weight NUMERIC(6, 4) NOT NULL CHECK (weight >= 0.0001 AND weight <= 0.1000),
+    index_shares DOUBLE PRECISION,  -- 指数份额: 调整时按 权重 × S / 价格 折算
     rank INTEGER,
     join_date DATE DEFAULT CURRENT_DATE,
     is_active BOOLEAN DEFAULT TRUE,
@@ -152,6 +154,23 @@ CREATE INDEX IF NOT EXISTS idx_constituents_stock ON index_constituents(stock_sy
 CREATE INDEX IF NOT EXISTS idx_constituents_weight ON index_constituents(weight DESC);
 CREATE INDEX IF NOT EXISTS idx_constituents_active ON index_constituents(is_active);
 
+-- 成分股版本: 每个版本在 [effective_from, effective_to) 内生效 (Unix 秒, effective_to 为 NULL 表示当前版本)
+CREATE TABLE IF NOT EXISTS index_constituent_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    index_code VARCHAR(20) NOT NULL REFERENCES indices(code) ON DELETE CASCADE,
+    stock_symbol VARCHAR(10) NOT NULL,
+    weight NUMERIC(8, 6) NOT NULL,
+    index_shares DOUBLE PRECISION,
+    divisor DOUBLE PRECISION,  -- 该版本的指数除数
+    rank INTEGER,
+    effective_from BIGINT NOT NULL,
+    effective_to BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(index_code, stock_symbol, effective_from)
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshots_effective ON index_constituent_snapshots(index_code, effective_from);
+
 -- ============================================================================
 -- 6. 价格数据表 (Price Data)
 -- ============================================================================
@@ -95,6 +95,7 @@ CREATE TABLE IF NOT EXISTS indices (
     turnover INTEGER,
     constituent_count INTEGER DEFAULT 0,
     calculation_method TEXT DEFAULT 'FREE_FLOAT_MKT_CAP',
+    divisor REAL,  -- 除数: 点位 = Σ(价格 × 指数份额) / 除数, NULL 表示尚未编制
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     updated_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
@@ -128,6 +129,7 @@ CREATE TABLE IF NOT EXISTS index_constituents (
     index_code TEXT NOT NULL,
     stock_symbol TEXT NOT NULL,
     weight REAL NOT NULL CHECK (weight >= 0.0001 AND weight <= 0.1000),
+    index_shares REAL,  -- 指数份额: 调整时按 权重 × S / 价格 折算
     rank INTEGER,
     join_date TEXT DEFAULT (date('now')),
     is_active INTEGER DEFAULT 1,
@@ -143,6 +145,23 @@ CREATE INDEX IF NOT EXISTS idx_constituents_stock ON index_constituents(stock_sy
 CREATE INDEX IF NOT EXISTS idx_constituents_weight ON index_constituents(weight DESC);
 CREATE INDEX IF NOT EXISTS idx_constituents_active ON index_constituents(is_active);
 
+-- 成分股版本: 每个版本在 [effective_from, effective_to) 内生效 (Unix 秒, effective_to 为 NULL 表示当前版本)
+CREATE TABLE IF NOT EXISTS index_constituent_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    index_code TEXT NOT NULL,
+    stock_symbol TEXT NOT NULL,
+    weight REAL NOT NULL,
+    index_shares REAL,
+    divisor REAL,  -- 该版本的指数除数
+    rank INTEGER,
+    effective_from INTEGER NOT NULL,
+    effective_to INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(index_code, stock_symbol, effective_from)
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshots_effective ON index_constituent_snapshots(index_code, effective_from);
+
 -- ============================================================================
 -- 6. 价格数据表 (Price Data)
 -- ============================================================================